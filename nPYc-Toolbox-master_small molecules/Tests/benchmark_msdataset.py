@@ -0,0 +1,388 @@
+"""
+Timing benchmarks for MSDataset operations that scale with the number of features.
+
+Benchmarks are not collected by ``unittest discover``, run them explicitly with::
+
+	python -m unittest benchmark_msdataset
+"""
+
+import numpy
+import os
+import pandas
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append("..")
+import nPYc
+from generateTestDataset import generateTestDataset
+
+
+def _timeit(function, repeats=3):
+	"""
+	Best wall-clock time of *repeats* calls to *function*.
+	"""
+	times = list()
+	for i in range(repeats):
+		start = time.perf_counter()
+		function()
+		times.append(time.perf_counter() - start)
+
+	return min(times)
+
+
+class benchmark_artifactual_linkage(unittest.TestCase):
+	"""
+	Generation of the artifactual linkage matrix for 1k to 100k UPLC-MS like features.
+	"""
+
+	def test_generateArtifactualLinkageMatrix_scaling(self):
+
+		for noFeat in [1000, 10000, 100000]:
+			msData = generateTestDataset(10, noFeat, dtype='MSDataset')
+			msData.featureMetadata['m/z'] = numpy.random.uniform(50, 1200, size=noFeat)
+			msData.featureMetadata['Retention Time'] = numpy.random.uniform(30, 720, size=noFeat)
+			msData.featureMetadata['Peak Width'] = numpy.random.uniform(1, 10, size=noFeat)
+
+			msData.Attributes['featureFilters']['artifactualFilter'] = True
+			msData.Attributes['filterParameters']['deltaMzArtifactual'] = 0.005
+			msData.Attributes['filterParameters']['overlapThresholdArtifactual'] = 50
+			msData.Attributes['filterParameters']['corrThresholdArtifactual'] = 0.9
+
+			elapsed = _timeit(msData.updateArtifactualLinkageMatrix)
+
+			print('Artifactual linkage, %i features, %i candidate pairs: %.3f s' % (noFeat, msData._tempArtifactualLinkageMatrix.shape[0], elapsed))
+
+
+	def test_artifactualLinkage_excludeSamples(self):
+
+		msData = generateTestDataset(1000, 20000, dtype='MSDataset')
+		msData.featureMetadata['m/z'] = numpy.random.uniform(50, 1200, size=20000)
+		msData.featureMetadata['Retention Time'] = numpy.random.uniform(30, 720, size=20000)
+		msData.featureMetadata['Peak Width'] = numpy.random.uniform(1, 10, size=20000)
+
+		msData.Attributes['featureFilters']['artifactualFilter'] = True
+		msData.Attributes['filterParameters']['deltaMzArtifactual'] = 0.05
+		msData.Attributes['filterParameters']['overlapThresholdArtifactual'] = 50
+		msData.Attributes['filterParameters']['corrThresholdArtifactual'] = 0.9
+		msData.updateArtifactualLinkageMatrix()
+
+		def excludeSamples():
+			msData.sampleMask[:10] = False
+			msData.applyMasks()
+
+		elapsed = _timeit(excludeSamples)
+
+		print('Artifactual linkage refresh after excluding 10 samples, %i candidate pairs: %.3f s' % (msData._tempArtifactualLinkageMatrix.shape[0], elapsed))
+
+
+	def test_artifactualFilter(self):
+
+		msData = generateTestDataset(10, 50000, dtype='MSDataset')
+		msData.featureMetadata['m/z'] = numpy.random.uniform(50, 500, size=50000)
+		msData.featureMetadata['Retention Time'] = numpy.random.uniform(30, 720, size=50000)
+		msData.featureMetadata['Peak Width'] = numpy.random.uniform(1, 10, size=50000)
+
+		msData.Attributes['featureFilters']['artifactualFilter'] = True
+		msData.Attributes['filterParameters']['deltaMzArtifactual'] = 0.5
+		msData.Attributes['filterParameters']['overlapThresholdArtifactual'] = 50
+		msData.Attributes['filterParameters']['corrThresholdArtifactual'] = -1
+		msData.updateArtifactualLinkageMatrix()
+
+		featMask = numpy.random.uniform(size=50000) > 0.2
+
+		elapsed = _timeit(lambda: msData.artifactualFilter(featMask=featMask))
+		print('artifactualFilter, %i links: %.3f s' % (msData.artifactualLinkageMatrix.shape[0], elapsed))
+
+
+class benchmark_exclusions(unittest.TestCase):
+	"""
+	Excluding 20k of 40k features by name.
+	"""
+
+	def test_excludeFeatures(self):
+
+		msData = generateTestDataset(10, 40000, dtype='MSDataset')
+		featureList = msData.featureMetadata['Feature Name'].values[::2].tolist()
+
+		elapsed = _timeit(lambda: msData.excludeFeatures(featureList, message='Artifactual'), repeats=1)
+		print('excludeFeatures, %i features: %.3f s' % (len(featureList), elapsed))
+
+
+class benchmark_get_features(unittest.TestCase):
+	"""
+	Repeated getFeatures calls on 40k features.
+	"""
+
+	def test_getFeatures(self):
+
+		msData = generateTestDataset(100, 40000, dtype='MSDataset')
+		featureNames = msData.featureMetadata['Feature Name'].values
+		queries = [featureNames[numpy.random.randint(0, featureNames.shape[0], size=10)].tolist() for i in range(1000)]
+
+		def run():
+			for query in queries:
+				msData.getFeatures(query, by='Feature Name')
+
+		elapsed = _timeit(run, repeats=1)
+		print('getFeatures, %i queries of 10 features: %.3f s' % (len(queries), elapsed))
+
+
+class benchmark_role_masks(unittest.TestCase):
+	"""
+	Building the SS, SP, ER and LR masks of 10k samples.
+	"""
+
+	def test_roleMasks(self):
+
+		from nPYc.enumerations import AssayRole, SampleType
+
+		msData = generateTestDataset(10000, 10, dtype='MSDataset')
+		combinations = [(SampleType.StudySample, AssayRole.Assay), (SampleType.StudyPool, AssayRole.PrecisionReference),
+						(SampleType.ExternalReference, AssayRole.PrecisionReference), (SampleType.StudyPool, AssayRole.LinearityReference)]
+
+		def compare():
+			for (sampleType, assayRole) in combinations:
+				(msData.sampleMetadata['SampleType'].values == sampleType) & (msData.sampleMetadata['AssayRole'].values == assayRole)
+
+		def cached():
+			roleMasks = msData.roleMasks
+			for key in combinations:
+				roleMasks[key]
+
+		elapsed = _timeit(compare, repeats=10)
+		print('Four role masks by comparison: %.5f s' % (elapsed))
+
+		elapsed = _timeit(cached, repeats=10)
+		print('Four role masks from roleMasks: %.5f s' % (elapsed))
+
+
+class benchmark_rsd(unittest.TestCase):
+	"""
+	RSDs of 1000 samples by 20k features.
+	"""
+
+	def test_rsd(self):
+
+		from nPYc.enumerations import AssayRole, SampleType
+		from nPYc.utilities import groupStatistics, rsd
+
+		msData = generateTestDataset(1000, 20000, dtype='MSDataset')
+		masks = [msData.roleMasks[SampleType.StudySample, AssayRole.Assay], msData.roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference],
+				 msData.roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]]
+
+		elapsed = _timeit(lambda: [rsd(msData.intensityData[mask, :]) for mask in masks], repeats=1)
+		print('rsd of three groups separately: %.3f s' % (elapsed))
+
+		elapsed = _timeit(lambda: groupStatistics(msData.intensityData, masks), repeats=1)
+		print('groupStatistics of three groups: %.3f s' % (elapsed))
+
+		def readRSDs():
+			for i in range(40):
+				msData.rsdSP
+
+		elapsed = _timeit(readRSDs, repeats=1)
+		print('40 reads of rsdSP: %.3f s' % (elapsed))
+
+
+class benchmark_correlation_to_dilution(unittest.TestCase):
+	"""
+	Spearman correlation to dilution of 50k features, over one and three dilution series.
+	"""
+
+	def test_correlateToDilution(self):
+
+		from nPYc.enumerations import AssayRole, SampleType
+
+		msData = generateTestDataset(100, 50000, dtype='MSDataset')
+		msData.sampleMetadata['SampleType'] = SampleType.StudyPool
+		msData.sampleMetadata['AssayRole'] = AssayRole.LinearityReference
+		msData.sampleMetadata['Dilution'] = numpy.tile([1, 20, 40, 60, 80, 100, 100, 80, 60, 40], 10)
+
+		elapsed = _timeit(lambda: msData._MSDataset__correlateToDilution(method='spearman'), repeats=1)
+		print('Spearman correlation to dilution, 50k features: %.3f s' % (elapsed))
+
+		msData.sampleMetadata['Dilution Series'] = numpy.repeat([1, 2, 3, 4], 25)
+		elapsed = _timeit(lambda: msData._MSDataset__correlateToDilution(method='spearman'), repeats=1)
+		print('Spearman correlation to dilution, 50k features, 4 series: %.3f s' % (elapsed))
+
+
+class benchmark_threshold_sweep(unittest.TestCase):
+	"""
+	Numbers of 50k features passing over the 10 x 11 RSD and correlation threshold grid of the feature selection report.
+	"""
+
+	def test_thresholdSweep(self):
+
+		from nPYc.utilities import ThresholdSweep
+
+		noFeat = 50000
+		msData = generateTestDataset(10, noFeat, dtype='MSDataset')
+		msData.featureMetadata['m/z'] = numpy.random.uniform(50, 500, size=noFeat)
+		msData.featureMetadata['Retention Time'] = numpy.random.uniform(30, 720, size=noFeat)
+		msData.featureMetadata['Peak Width'] = numpy.random.uniform(1, 10, size=noFeat)
+		msData.Attributes['featureFilters']['artifactualFilter'] = True
+		msData.Attributes['filterParameters']['deltaMzArtifactual'] = 0.5
+		msData.Attributes['filterParameters']['overlapThresholdArtifactual'] = 50
+		msData.Attributes['filterParameters']['corrThresholdArtifactual'] = -1
+		msData.updateArtifactualLinkageMatrix()
+
+		rsdVals = numpy.arange(5, 55, 5)
+		rVals = numpy.arange(0.5, 1.01, 0.05)
+		correlation = numpy.random.uniform(0, 1, size=noFeat)
+		rsdSP = numpy.random.uniform(0, 60, size=noFeat)
+
+		elapsed = _timeit(lambda: msData.artifactualFilter(featMask=(correlation >= rVals[0]) & (rsdSP <= rsdVals[-1])), repeats=1)
+		print('artifactualFilter, one cell of %i, %i links: %.3f s' % (len(rsdVals) * len(rVals), msData.artifactualLinkageMatrix.shape[0], elapsed))
+
+		sweep = ThresholdSweep(correlation, rsdSP, linkage=msData.artifactualLinkageMatrix)
+		elapsed = _timeit(lambda: sweep.count(rsdVals, rVals), repeats=1)
+		print('ThresholdSweep, whole grid: %.3f s' % (elapsed))
+
+		elapsed = _timeit(lambda: sweep.count(rsdVals, rVals, withArtifactualFiltering=True), repeats=1)
+		print('ThresholdSweep with artifactual filtering, whole grid: %.3f s' % (elapsed))
+
+
+class benchmark_fill_batches(unittest.TestCase):
+	"""
+	Batch and dilution series inference over 10k injections.
+	"""
+
+	def test_fillBatches(self):
+
+		from nPYc.enumerations import AssayRole, SampleType
+
+		noSamp = 10000
+		msData = generateTestDataset(noSamp, 10, dtype='MSDataset')
+		names = numpy.array(['Study_P1W%02i' % (i) for i in range(96)] + ['Study_B%iS%i_SR' % (i, j) for i in range(1, 5) for j in range(1, 6)])
+		msData.sampleMetadata['Sample File Name'] = names[numpy.random.randint(0, names.shape[0], size=noSamp)]
+		msData.sampleMetadata['Run Order'] = numpy.random.permutation(noSamp)
+		msData.sampleMetadata.loc[::20, 'AssayRole'] = AssayRole.LinearityReference
+		msData.sampleMetadata.loc[::50, 'SampleType'] = SampleType.ProceduralBlank
+
+		elapsed = _timeit(msData._fillBatches, repeats=1)
+		print('_fillBatches, %i injections: %.3f s' % (noSamp, elapsed))
+
+
+class benchmark_filename_parsing(unittest.TestCase):
+	"""
+	Sample metadata from 20k filenames.
+	"""
+
+	def test_getSampleMetadataFromFilename(self):
+
+		import json
+
+		with open(os.path.join('..', 'nPYc', 'StudyDesigns', 'SOP', 'GenericMS.json')) as sop:
+			filenameSpec = json.load(sop)['filenameSpec']
+
+		noSamp = 20000
+		msData = generateTestDataset(noSamp, 10, dtype='MSDataset')
+		names = ['_RPOS_ToF01_U%iW%02i' % (i, j) for i in range(1, 5) for j in range(96)] + \
+				['_RPOS_ToF01_P%iW%02i_SR' % (i, j) for i in range(1, 5) for j in range(10)] + \
+				['_RPOS_ToF01_P1SRD%02i' % (i) for i in range(1, 11)] + \
+				['_RPOS_ToF01_Blank%02i' % (i) for i in range(1, 5)] + \
+				['_RPOS_ToF01_B%iS%i_SR_x' % (i, j) for i in range(1, 5) for j in range(1, 6)]
+		msData.sampleMetadata['Sample File Name'] = ['Study%i%s' % (i, names[i % len(names)]) for i in range(noSamp)]
+		sampleMetadata = msData.sampleMetadata.copy()
+
+		def parse():
+			msData.sampleMetadata = sampleMetadata.copy()
+			msData._getSampleMetadataFromFilename(filenameSpec)
+
+		elapsed = _timeit(parse, repeats=3)
+		print('_getSampleMetadataFromFilename, %i injections: %.3f s' % (noSamp, elapsed))
+
+
+class benchmark_watersraw_metadata(unittest.TestCase):
+	"""
+	Reading acquisition parameters from 2,000 synthetic Waters .RAW folders, serially, in threads, and from a cache.
+	"""
+
+	def test_getSampleMetadataFromWatersRawFiles(self):
+
+		import warnings
+		from nPYc.utilities._getMetadataFromWatersRaw import getSampleMetadataFromWatersRawFiles
+
+		noSamp = 2000
+		extern = ''.join('%s\t\t%s\r\n' % (key, value) for (key, value) in [('Resolution', '13000'), ('Capillary (kV)', '1.0000'), ('Sampling Cone', '20.0000'),
+								('Source Temperature (°C)', '120'), ('Source Offset', '80'), ('Desolvation Temperature (°C)', '600'),
+								('Cone Gas Flow (L/Hr)', '150.0'), ('Desolvation Gas Flow (L/Hr)', '1000.0'), ('LM Resolution', '10.0'),
+								('HM Resolution', '15.0'), ('Collision Energy', '6.000'), ('Polarity', 'ES-'), ('Detector', '3299'),
+								('Scan Time (sec)', '0.150'), ('Interscan Time (sec)', '0.014'), ('Start Mass', '50.0'), ('End Mass', '1200.0'),
+								('Backing', '3.52e0'), ('Collision', '1.23e-2'), ('TOF', '5.27e-7')])
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			rawPath = os.path.join(tmpdirname, 'raw')
+			for i in range(noSamp):
+				path = os.path.join(rawPath, 'Batch%i' % (i // 500), 'Study_RPOS_ToF01_S1W%04i.raw' % (i))
+				os.makedirs(path)
+				with open(os.path.join(path, '_extern.inf'), 'w', encoding='latin-1', newline='') as f:
+					f.write(extern)
+				with open(os.path.join(path, '_HEADER.TXT'), 'w', encoding='latin-1', newline='') as f:
+					f.write('$$ Acquired Date: 27-Nov-2014\r\n$$ Acquired Time: %02i:%02i:00\r\n$$ Instrument: XEVO-G2SQTOF#YDA121\r\n' % (i // 60 % 24, i % 60))
+				with open(os.path.join(path, '_INLET.INF'), 'w', encoding='latin-1', newline='') as f:
+					f.write('ColumnType: ACQUITY UPLC HSS T3\r\nColumn Serial Number: 01573413615729\r\n')
+
+			cachePath = os.path.join(tmpdirname, 'cache.json')
+			with warnings.catch_warnings():
+				warnings.simplefilter('ignore')
+				for (label, kwargs) in [('serial', {}), ('parallelise=True', {'parallelise': True}),
+										('building cache', {'cachePath': cachePath}), ('from cache', {'cachePath': cachePath})]:
+					elapsed = _timeit(lambda: getSampleMetadataFromWatersRawFiles(rawPath, **kwargs), repeats=1)
+					print('Waters .RAW metadata, %i folders, %s: %.3f s' % (noSamp, label, elapsed))
+
+
+class benchmark_xcms_import(unittest.TestCase):
+	"""
+	Import of synthetic XCMS peakTable exports of 10k to 500k features.
+	"""
+
+	def test_loadXCMSDataset_scaling(self):
+
+		noSamp = 10
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			for noFeat in [10000, 100000, 500000]:
+				mz = numpy.random.uniform(50, 1200, size=noFeat)
+				rt = numpy.random.uniform(30, 720, size=noFeat)
+				table = pandas.DataFrame({'mz': mz, 'mzmin': mz - 0.01, 'mzmax': mz + 0.01, 'rt': rt, 'rtmin': rt - 2, 'rtmax': rt + 2,
+										  'npeaks': 1, 'isotopes': '', 'adduct': '', 'pcgroup': 1})
+				for i in range(noSamp):
+					table['Sample%02i.mzML' % (i)] = numpy.random.lognormal(size=noFeat)
+
+				path = os.path.join(tmpdirname, 'xcms_%i.csv' % (noFeat))
+				table.to_csv(path, index=False)
+
+				elapsed = _timeit(lambda: nPYc.MSDataset(path, fileType='XCMS', noFeatureParams=10), repeats=1)
+				print('XCMS peakTable import, %i features: %.3f s' % (noFeat, elapsed))
+
+				elapsed = _timeit(lambda: nPYc.MSDataset(path, fileType='XCMS', noFeatureParams=10, streaming=True), repeats=1)
+				print('XCMS peakTable streamed import, %i features: %.3f s' % (noFeat, elapsed))
+
+
+class benchmark_csv_export(unittest.TestCase):
+	"""
+	CSV export of 500 samples by 10k features.
+	"""
+
+	def test_exportCSV(self):
+
+		msData = generateTestDataset(500, 10000, dtype='MSDataset')
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			path = os.path.join(tmpdirname, 'benchmark')
+
+			elapsed = _timeit(lambda: numpy.savetxt(path + '_intensityData.csv', msData.intensityData, delimiter=','), repeats=1)
+			print('numpy.savetxt intensityData: %.3f s' % (elapsed))
+
+			for compression, parallelise in [(None, False), (None, True), ('gzip', True)]:
+				elapsed = _timeit(lambda: msData._exportCSV(path, compression=compression, parallelise=parallelise), repeats=1)
+				print('CSV export, compression=%s, parallelise=%s: %.3f s' % (compression, parallelise, elapsed))
+
+				elapsed = _timeit(lambda: msData._exportUnifiedCSV(path, compression=compression, parallelise=parallelise), repeats=1)
+				print('UnifiedCSV export, compression=%s, parallelise=%s: %.3f s' % (compression, parallelise, elapsed))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -8,6 +8,8 @@ import numpy
 import seaborn as sns
 import sys
 import unittest
+import unittest.mock
+import multiprocessing
 import os
 
 sys.path.append("..")
@@ -37,6 +39,161 @@ class test_rocorrection(unittest.TestCase):
 		numpy.testing.assert_array_almost_equal(correctedDataP.intensityData, correctedDataS.intensityData, err_msg="Serial and parallel corrected data not equal.")
 
 
+	def test_correctmsdataset_sharedmemory(self):
+		"""
+		Check that the shared memory code path returns exactly the same result as the pickled one.
+		"""
+		import multiprocessing
+
+		noSamp = numpy.random.randint(100, high=500, size=None)
+		noFeat = numpy.random.randint(50, high=100, size=None)
+
+		msData = generateTestDataset(noSamp, noFeat, dtype='MSDataset')
+
+		correctedDataP = nPYc.batchAndROCorrection.correctMSdataset(msData, parallelise=True, workers=2)
+
+		with self.subTest(msg='Pool per call'):
+			correctedDataSM = nPYc.batchAndROCorrection.correctMSdataset(msData, parallelise=True, sharedMemory=True, workers=2, chunkSize=7)
+
+			numpy.testing.assert_array_equal(correctedDataP.fit, correctedDataSM.fit, err_msg="Pickled and shared memory fits not equal.")
+			numpy.testing.assert_array_equal(correctedDataP.intensityData, correctedDataSM.intensityData, err_msg="Pickled and shared memory corrected data not equal.")
+
+		with self.subTest(msg='Persistent pool'):
+			with multiprocessing.Pool(processes=2) as pool:
+				correctedDataSM = nPYc.batchAndROCorrection.correctMSdataset(msData, sharedMemory=True, pool=pool)
+				correctedDataSM2 = nPYc.batchAndROCorrection.correctMSdataset(msData, sharedMemory=True, pool=pool)
+
+			numpy.testing.assert_array_equal(correctedDataP.intensityData, correctedDataSM.intensityData)
+			numpy.testing.assert_array_equal(correctedDataSM.intensityData, correctedDataSM2.intensityData)
+
+
+	def test_correctmsdataset_lowessbatched(self):
+		"""
+		Check that batched LOWESS fitting matches fitting features one at a time.
+		"""
+
+		noSamp = numpy.random.randint(100, high=500, size=None)
+		noFeat = numpy.random.randint(20, high=50, size=None)
+
+		msData = generateTestDataset(noSamp, noFeat, dtype='MSDataset')
+		# Missing reference values fall back to single feature fitting
+		msData._intensityData[0, 0] = numpy.nan
+
+		for align in ['median', 'mean']:
+			with self.subTest(msg='Aligning to ' + align):
+				correctedData = nPYc.batchAndROCorrection.correctMSdataset(msData, method='LOWESS', align=align, parallelise=False)
+				correctedDataB = nPYc.batchAndROCorrection.correctMSdataset(msData, method='LOWESS-batched', align=align, parallelise=False)
+
+				numpy.testing.assert_allclose(correctedData.fit, correctedDataB.fit, rtol=1e-7, err_msg="Per-feature and batched fits not equal.")
+				numpy.testing.assert_allclose(correctedData.intensityData, correctedDataB.intensityData, rtol=1e-7, err_msg="Per-feature and batched corrected data not equal.")
+
+		with self.subTest(msg='Parallel'):
+			correctedDataBP = nPYc.batchAndROCorrection.correctMSdataset(msData, method='LOWESS-batched', align=align, parallelise=True, workers=2)
+
+			numpy.testing.assert_array_equal(correctedDataB.intensityData, correctedDataBP.intensityData)
+
+
+	def test_correctmsdataset_incremental(self):
+		"""
+		Check that incremental correction matches correcting from scratch, and only refits changed batches.
+		"""
+
+		noSamp = numpy.random.randint(100, high=500, size=None)
+		noFeat = numpy.random.randint(20, high=50, size=None)
+
+		msData = generateTestDataset(noSamp, noFeat, dtype='MSDataset')
+		cache = nPYc.batchAndROCorrection.BatchCorrectionCache()
+
+		for align in ['median', 'mean']:
+			with self.subTest(msg='Aligning to ' + align):
+				cache.clear()
+
+				correctedData = nPYc.batchAndROCorrection.correctMSdataset(msData, align=align, parallelise=False)
+				correctedDataI = nPYc.batchAndROCorrection.correctMSdataset(msData, align=align, parallelise=False, cache=cache)
+
+				numpy.testing.assert_allclose(correctedData.fit, correctedDataI.fit, rtol=1e-10)
+				numpy.testing.assert_allclose(correctedData.intensityData, correctedDataI.intensityData, rtol=1e-10)
+				self.assertEqual(cache.misses, 2)
+				self.assertEqual(cache.hits, 0)
+
+		with self.subTest(msg='Unchanged batches reused'):
+			correctedDataI = nPYc.batchAndROCorrection.correctMSdataset(msData, align='mean', parallelise=False, cache=cache)
+
+			numpy.testing.assert_allclose(correctedData.intensityData, correctedDataI.intensityData, rtol=1e-10)
+			self.assertEqual(cache.misses, 2)
+			self.assertEqual(cache.hits, 2)
+
+		with self.subTest(msg='Changed batch refit'):
+			batchMask = msData.sampleMetadata['Correction Batch'].values == 2
+			msData._intensityData[batchMask, :] = msData._intensityData[batchMask, :] * 2
+
+			correctedData = nPYc.batchAndROCorrection.correctMSdataset(msData, align='mean', parallelise=False)
+			correctedDataI = nPYc.batchAndROCorrection.correctMSdataset(msData, align='mean', parallelise=False, cache=cache)
+
+			numpy.testing.assert_allclose(correctedData.fit, correctedDataI.fit, rtol=1e-10)
+			numpy.testing.assert_allclose(correctedData.intensityData, correctedDataI.intensityData, rtol=1e-10)
+			self.assertEqual(cache.misses, 3)
+			self.assertEqual(cache.hits, 3)
+			# The superseded fit of batch 2 is discarded
+			self.assertEqual(len(cache), 2)
+
+		with self.subTest(msg='Changed parameters'):
+			nPYc.batchAndROCorrection.correctMSdataset(msData, window=5, align='mean', parallelise=False, cache=cache)
+
+			self.assertEqual(cache.misses, 5)
+			self.assertEqual(len(cache), 2)
+
+		with self.subTest(msg='Bounded shared cache'):
+			cache = nPYc.batchAndROCorrection.BatchCorrectionCache(maxEntries=3)
+
+			nPYc.batchAndROCorrection.correctMSdataset(msData, align='mean', parallelise=False, cache=cache)
+			nPYc.batchAndROCorrection.correctMSdataset(msData, window=5, align='mean', parallelise=False, cache=cache)
+			self.assertEqual(len(cache), 3)
+
+			# Most recently used batches are kept
+			nPYc.batchAndROCorrection.correctMSdataset(msData, window=5, align='mean', parallelise=False, cache=cache)
+			self.assertEqual(cache.misses, 4)
+			self.assertEqual(cache.hits, 2)
+
+		with self.subTest(msg='maxEntries'):
+			self.assertRaises(TypeError, nPYc.batchAndROCorrection.BatchCorrectionCache, maxEntries=0)
+			self.assertRaises(TypeError, nPYc.batchAndROCorrection.BatchCorrectionCache, maxEntries=1.5)
+
+
+	def test_correctmsdataset_incremental_parallel(self):
+		"""
+		Check that parallel incremental correction matches serial, and fits all batches in a single pool.
+		"""
+
+		msData = generateTestDataset(numpy.random.randint(100, high=300, size=None), 20, dtype='MSDataset')
+
+		correctedData = nPYc.batchAndROCorrection.correctMSdataset(msData, parallelise=False, cache=nPYc.batchAndROCorrection.BatchCorrectionCache())
+
+		with unittest.mock.patch('multiprocessing.Pool', wraps=multiprocessing.Pool) as pool:
+			correctedDataP = nPYc.batchAndROCorrection.correctMSdataset(msData, parallelise=True, workers=2, cache=nPYc.batchAndROCorrection.BatchCorrectionCache())
+
+		self.assertEqual(pool.call_count, 1)
+		numpy.testing.assert_array_equal(correctedData.fit, correctedDataP.fit)
+		numpy.testing.assert_array_equal(correctedData.intensityData, correctedDataP.intensityData)
+
+
+	def test_correctmsdataset_parallelisation_raises(self):
+
+		msData = generateTestDataset(20, 5, dtype='MSDataset')
+
+		with self.subTest(msg='sharedMemory type'):
+			self.assertRaises(TypeError, nPYc.batchAndROCorrection.correctMSdataset, msData, sharedMemory=1)
+
+		with self.subTest(msg='workers value'):
+			self.assertRaises(TypeError, nPYc.batchAndROCorrection.correctMSdataset, msData, workers=0)
+
+		with self.subTest(msg='chunkSize type'):
+			self.assertRaises(TypeError, nPYc.batchAndROCorrection.correctMSdataset, msData, chunkSize=1.5)
+
+		with self.subTest(msg='cache type'):
+			self.assertRaises(TypeError, nPYc.batchAndROCorrection.correctMSdataset, msData, cache=dict())
+
+
 class test_rocorrection_sythetic(unittest.TestCase):
 
 	def setUp(self):
@@ -89,6 +246,32 @@ class test_rocorrection_sythetic(unittest.TestCase):
 		numpy.testing.assert_array_almost_equal(numpy.std(corrected), 0.)
 
 
+	def test_doLOESScorrectionBatched_synthetic(self):
+		"""
+		Batched fits of noisy features should match statsmodels fitting each feature in turn.
+		"""
+		noFeat = numpy.random.randint(5, high=20, size=None)
+		testD2 = self.testD[:, numpy.newaxis] + numpy.random.lognormal(size=(self.testD.shape[0], noFeat))
+
+		for window in [3, 11, 1000]:
+			with self.subTest(msg='Window of %i' % (window)):
+				(corrected, fit) = nPYc.batchAndROCorrection._batchAndROCorrection.doLOESScorrectionBatched(testD2[self.testSRmask, :],
+																										 self.testRO[self.testSRmask],
+																										 testD2,
+																										 self.testRO,
+																										 window=window)
+
+				for feature in range(noFeat):
+					(correctedS, fitS) = nPYc.batchAndROCorrection._batchAndROCorrection.doLOESScorrection(testD2[self.testSRmask, feature],
+																										   self.testRO[self.testSRmask],
+																										   testD2[:, feature],
+																										   self.testRO,
+																										   window=window)
+
+					numpy.testing.assert_allclose(fit[:, feature], fitS, rtol=1e-8)
+					numpy.testing.assert_allclose(corrected[:, feature], correctedS, rtol=1e-8)
+
+
 	def test_batchCorrection_sythetic(self):
 
 		# We need at least two features - pick which randomly
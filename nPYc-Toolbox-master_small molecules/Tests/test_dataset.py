@@ -2,6 +2,7 @@ import pandas
 import numpy
 import sys
 import unittest
+import unittest.mock
 from pandas.util.testing import assert_frame_equal
 import os
 import tempfile
@@ -9,7 +10,11 @@ import random
 import string
 import json
 import copy
+import gc
+import pickle
+import gzip
 import warnings
+import weakref
 
 sys.path.append("..")
 import nPYc
@@ -83,6 +88,108 @@ class test_dataset_synthetic(unittest.TestCase):
 			numpy.testing.assert_array_equal(self.data.intensityData, taNormaliser.normalise(self.data._intensityData))
 
 
+	def test_normalisation_cache(self):
+
+		from nPYc.utilities import normalisation
+
+		self.data.Normalisation = normalisation.ProbabilisticQuotientNormaliser()
+		pqnNormaliser = normalisation.ProbabilisticQuotientNormaliser()
+
+		with self.subTest(msg='Repeated reads are served from the cache'):
+			first = self.data.intensityData
+			second = self.data.intensityData
+
+			self.assertIs(first, second)
+			numpy.testing.assert_array_equal(first, pqnNormaliser.normalise(self.data._intensityData))
+			self.assertEqual(self.data.normalisationCacheInfo, {'hits': 1, 'misses': 1})
+
+		with self.subTest(msg='Setting intensityData'):
+			self.data.intensityData = self.data._intensityData * 2
+
+			numpy.testing.assert_array_equal(self.data.intensityData, pqnNormaliser.normalise(self.data._intensityData))
+			self.assertEqual(self.data.normalisationCacheInfo, {'hits': 1, 'misses': 2})
+
+		with self.subTest(msg='Reassigning _intensityData'):
+			self.data._intensityData = numpy.random.rand(self.noSamp, self.noFeat)
+
+			numpy.testing.assert_array_equal(self.data.intensityData, pqnNormaliser.normalise(self.data._intensityData))
+			self.assertEqual(self.data.normalisationCacheInfo, {'hits': 1, 'misses': 3})
+
+		with self.subTest(msg='Setting Normalisation'):
+			self.data.Normalisation = normalisation.TotalAreaNormaliser()
+			taNormaliser = normalisation.TotalAreaNormaliser()
+
+			numpy.testing.assert_array_equal(self.data.intensityData, taNormaliser.normalise(self.data._intensityData))
+			self.assertEqual(self.data.normalisationCacheInfo, {'hits': 1, 'misses': 4})
+
+		with self.subTest(msg='Applying masks'):
+			self.data.initialiseMasks()
+			self.data.sampleMask[0] = False
+			self.data.applyMasks()
+
+			numpy.testing.assert_array_equal(self.data.intensityData, taNormaliser.normalise(self.data._intensityData))
+			self.assertEqual(self.data.normalisationCacheInfo, {'hits': 1, 'misses': 5})
+
+		with self.subTest(msg='Null normalisation is not cached'):
+			self.data.Normalisation = normalisation.NullNormaliser()
+
+			self.assertIs(self.data.intensityData, self.data._intensityData)
+			self.assertEqual(self.data.normalisationCacheInfo, {'hits': 1, 'misses': 5})
+
+
+	def test_clone(self):
+
+		from nPYc.utilities import normalisation
+
+		self.data.initialiseMasks()
+		self.data.Normalisation = normalisation.TotalAreaNormaliser()
+		normalisedData = self.data.intensityData
+		originalData = numpy.copy(self.data._intensityData)
+		originalMetadata = self.data.sampleMetadata.copy()
+
+		cloned = self.data.clone()
+
+		with self.subTest(msg='Intensities are shared read-only'):
+			self.assertTrue(numpy.shares_memory(cloned._intensityData, self.data._intensityData))
+			self.assertFalse(cloned._intensityData.flags.writeable)
+			self.assertTrue(self.data._intensityData.flags.writeable)
+			with self.assertRaises(ValueError):
+				cloned._intensityData[0, 0] = 0
+
+		with self.subTest(msg='Cached normalised intensities are shared'):
+			self.assertTrue(numpy.shares_memory(cloned.intensityData, normalisedData))
+			self.assertEqual(cloned.normalisationCacheInfo['misses'], self.data.normalisationCacheInfo['misses'])
+
+		with self.subTest(msg='Masking the clone leaves the original intact'):
+			cloned.sampleMask[0] = False
+			cloned.featureMask[1] = False
+			cloned.sampleMetadata['Sample File Name'] = 'Changed'
+			cloned.applyMasks()
+
+			self.assertEqual(cloned.noSamples, self.noSamp - 1)
+			self.assertEqual(cloned.noFeatures, self.noFeat - 1)
+			self.assertTrue(all(self.data.sampleMask))
+			numpy.testing.assert_array_equal(self.data._intensityData, originalData)
+			pandas.testing.assert_frame_equal(self.data.sampleMetadata, originalMetadata)
+
+		with self.subTest(msg='Replacing intensityData in the clone'):
+			cloned = self.data.clone()
+			cloned.intensityData = numpy.zeros((self.noSamp, self.noFeat))
+
+			numpy.testing.assert_array_equal(self.data._intensityData, originalData)
+
+		with self.subTest(msg='Independent copy'):
+			cloned = self.data.clone(shareData=False)
+
+			self.assertFalse(numpy.shares_memory(cloned._intensityData, self.data._intensityData))
+			self.assertTrue(cloned._intensityData.flags.writeable)
+
+
+	def test_clone_raises(self):
+
+		self.assertRaises(TypeError, self.data.clone, shareData='True')
+
+
 	def test_normalisation_raises(self):
 
 		with self.assertRaises(TypeError):
@@ -94,6 +201,81 @@ class test_dataset_synthetic(unittest.TestCase):
 		self.assertEqual(self.data.noSamples, self.noSamp)
 
 
+	def test_rolemasks(self):
+
+		from nPYc.enumerations import AssayRole, SampleType
+
+		sampleTypes = numpy.random.choice(numpy.array(list(SampleType) + [numpy.nan], dtype=object), self.noSamp)
+		assayRoles = numpy.random.choice(numpy.array(list(AssayRole) + ['Not an enum'], dtype=object), self.noSamp)
+		self.data.sampleMetadata['SampleType'] = sampleTypes
+		self.data.sampleMetadata['AssayRole'] = assayRoles
+
+		def expected(sampleType, assayRole):
+			mask = numpy.ones(self.noSamp, dtype=bool)
+			if sampleType is not None:
+				mask &= self.data.sampleMetadata['SampleType'].values == sampleType
+			if assayRole is not None:
+				mask &= self.data.sampleMetadata['AssayRole'].values == assayRole
+			return mask
+
+		with self.subTest(msg='Each combination'):
+			roleMasks = self.data.roleMasks
+			for sampleType in list(SampleType) + [None]:
+				for assayRole in list(AssayRole) + ['Not an enum', None]:
+					numpy.testing.assert_array_equal(roleMasks[sampleType, assayRole], expected(sampleType, assayRole))
+
+		with self.subTest(msg='Cached while unchanged'):
+			roleMasks = self.data.roleMasks
+			self.assertIs(self.data.roleMasks, roleMasks)
+
+			# Masks returned are copies
+			mask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+			mask[:] = True
+			numpy.testing.assert_array_equal(roleMasks[SampleType.StudySample, AssayRole.Assay], expected(SampleType.StudySample, AssayRole.Assay))
+
+		with self.subTest(msg='Edits in place refreshed by assigning the table back'):
+			roleMasks = self.data.roleMasks
+			self.data.sampleMetadata.loc[0, 'SampleType'] = SampleType.ProceduralBlank
+			self.data.sampleMetadata.at[1, 'AssayRole'] = AssayRole.LinearityReference
+			self.data.sampleMetadata['SampleType'].values[2] = SampleType.MethodReference
+			self.data.sampleMetadata = self.data.sampleMetadata
+
+			self.assertIsNot(self.data.roleMasks, roleMasks)
+			numpy.testing.assert_array_equal(self.data.roleMasks[SampleType.ProceduralBlank, None], expected(SampleType.ProceduralBlank, None))
+			numpy.testing.assert_array_equal(self.data.roleMasks[None, AssayRole.LinearityReference], expected(None, AssayRole.LinearityReference))
+			numpy.testing.assert_array_equal(self.data.roleMasks[SampleType.MethodReference, None], expected(SampleType.MethodReference, None))
+
+		with self.subTest(msg='Rebuilt by addSampleInfo'):
+			def matchBasicCSV(filePath):
+				self.data.sampleMetadata.loc[3, 'SampleType'] = SampleType.ExternalReference
+
+			roleMasks = self.data.roleMasks
+			with unittest.mock.patch.object(self.data, '_matchBasicCSV', side_effect=matchBasicCSV):
+				self.data.addSampleInfo(descriptionFormat='Basic CSV', filePath='')
+
+			self.assertIsNot(self.data.roleMasks, roleMasks)
+			numpy.testing.assert_array_equal(self.data.roleMasks[SampleType.ExternalReference, None], expected(SampleType.ExternalReference, None))
+
+		with self.subTest(msg='Rebuilt when samples are added in place'):
+			self.data.roleMasks
+			self.data.sampleMetadata.loc[self.noSamp, ['SampleType', 'AssayRole']] = [SampleType.StudyPool, AssayRole.PrecisionReference]
+			self.noSamp += 1
+
+			numpy.testing.assert_array_equal(self.data.roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference], expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+
+		with self.subTest(msg='Rebuilt when replaced'):
+			self.data.sampleMetadata = self.data.sampleMetadata.iloc[1:, :]
+			self.noSamp -= 1
+
+			numpy.testing.assert_array_equal(self.data.roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference], expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+
+		with self.subTest(msg='Missing columns'):
+			self.data.sampleMetadata = self.data.sampleMetadata.drop(columns='AssayRole')
+
+			numpy.testing.assert_array_equal(self.data.roleMasks[SampleType.StudyPool, None], expected(SampleType.StudyPool, None))
+			self.assertRaises(KeyError, self.data.roleMasks.__getitem__, (SampleType.StudyPool, AssayRole.PrecisionReference))
+
+
 	def test__repr__(self):
 
 		pointer = id(self.data)
@@ -173,6 +355,118 @@ class test_dataset_synthetic(unittest.TestCase):
 			numpy.testing.assert_array_equal(expectedDataset.sampleMask, maskedDataset.sampleMask)
 
 
+	def test_applymasks_repeated(self):
+		"""
+		Check metadata tables superseded by repeated exclusions are rebuilt, and not kept in memory.
+		"""
+		self.data.initialiseMasks()
+		originalFeatureMetadata = weakref.ref(self.data.featureMetadata)
+
+		expectedSampleMetadata = list()
+		expectedFeatureMetadata = list()
+		for i in range(3):
+			self.data.sampleMask[i] = False
+			expectedSampleMetadata.append(self.data.sampleMetadata.loc[~self.data.sampleMask, :])
+			expectedFeatureMetadata.append(self.data.featureMetadata.copy())
+			self.data.applyMasks()
+
+			self.data.featureMask[[i, i + 1]] = False
+			expectedFeatureMetadata.append(self.data.featureMetadata.loc[~self.data.featureMask, :])
+			expectedSampleMetadata.append(self.data.sampleMetadata.copy())
+			self.data.applyMasks()
+
+			# Edits between exclusions are recorded in the next version saved
+			self.data.featureMetadata['Iteration'] = i
+
+		gc.collect()
+		self.assertIsNone(originalFeatureMetadata())
+
+		for dataset in [self.data, copy.deepcopy(self.data)]:
+			self.assertIsInstance(dataset.featureMetadataExcluded, list)
+			self.assertEqual(len(dataset.featureMetadataExcluded), 6)
+			for i in range(6):
+				with self.subTest(exclusion=i):
+					pandas.util.testing.assert_frame_equal(expectedSampleMetadata[i], dataset.sampleMetadataExcluded[i])
+					pandas.util.testing.assert_frame_equal(expectedFeatureMetadata[i], dataset.featureMetadataExcluded[i])
+					pandas.util.testing.assert_frame_equal(expectedFeatureMetadata[i], list(dataset.featureMetadataExcluded)[i])
+
+
+	def test_applymasks_history_frozen(self):
+		"""
+		Check editing the current metadata tables does not alter those saved by earlier exclusions.
+		"""
+		self.data.initialiseMasks()
+
+		self.data.sampleMask[0] = False
+		self.data.applyMasks()
+		self.data.featureMask[1] = False
+		self.data.applyMasks()
+
+		expectedSampleMetadata = [table.copy() for table in self.data.sampleMetadataExcluded]
+		expectedFeatureMetadata = [table.copy() for table in self.data.featureMetadataExcluded]
+
+		self.data.featureMetadata['rsdSP'] = 99.0
+		self.data.featureMetadata.loc[0, 'Feature Name'] = 'renamed'
+		self.data.sampleMetadata.loc[0, 'Sample File Name'] = 'renamed'
+		self.data.sampleMetadata.drop(columns='Sample File Name', inplace=True)
+
+		for i in range(2):
+			with self.subTest(exclusion=i):
+				pandas.util.testing.assert_frame_equal(expectedSampleMetadata[i], self.data.sampleMetadataExcluded[i])
+				pandas.util.testing.assert_frame_equal(expectedFeatureMetadata[i], self.data.featureMetadataExcluded[i])
+
+		# And after a further exclusion supersedes the edited tables
+		self.data.featureMask[0] = False
+		self.data.applyMasks()
+
+		for i in range(2):
+			with self.subTest(exclusion=i):
+				pandas.util.testing.assert_frame_equal(expectedSampleMetadata[i], self.data.sampleMetadataExcluded[i])
+				pandas.util.testing.assert_frame_equal(expectedFeatureMetadata[i], self.data.featureMetadataExcluded[i])
+
+
+	def test_applymasks_pickled(self):
+		"""
+		Check the tables saved by repeated exclusions stay compact when pickled, and are restored unchanged.
+		"""
+		noSamp = 20
+		noFeat = 2000
+		data = nPYc.Dataset()
+		data.intensityData = numpy.random.rand(noSamp, noFeat)
+		data.sampleMetadata = pandas.DataFrame({'Sample File Name': ['Sample %i' % (i) for i in range(noSamp)]})
+		data.featureMetadata = pandas.DataFrame({'Feature Name': ['Feature %i' % (i) for i in range(noFeat)],
+												 'm/z': numpy.random.rand(noFeat), 'Retention Time': numpy.random.rand(noFeat)})
+		data.initialiseMasks()
+
+		for i in range(4):
+			data.sampleMask[i] = False
+			data.applyMasks()
+			data.featureMask[i] = False
+			data.applyMasks()
+
+		ledger = data.featureMetadataExcluded
+		pickled = pickle.dumps(ledger)
+		self.assertLess(len(pickled), len(pickle.dumps(list(ledger))) / 2)
+
+		unpickled = pickle.loads(pickled)
+		self.assertIsInstance(unpickled, type(ledger))
+		self.assertEqual(len(unpickled), len(ledger))
+		for i in range(len(ledger)):
+			with self.subTest(exclusion=i):
+				pandas.util.testing.assert_frame_equal(ledger[i], unpickled[i])
+
+		# Still compact when pickled again
+		self.assertEqual(len(pickle.dumps(unpickled)), len(pickled))
+
+		# A restored dataset can be excluded from further
+		restored = pickle.loads(pickle.dumps(data))
+		restored.sampleMask[0] = False
+		expected = restored.featureMetadata.copy()
+		restored.applyMasks()
+		pandas.util.testing.assert_frame_equal(expected, restored.featureMetadataExcluded[-1])
+		pandas.util.testing.assert_frame_equal(ledger[0], restored.featureMetadataExcluded[0])
+
+
 	def test_updateMasks_raises(self):
 
 		self.data.initialiseMasks()
@@ -834,6 +1128,43 @@ class test_dataset_synthetic(unittest.TestCase):
 		pandas.util.testing.assert_frame_equal(self.data.sampleMetadata, sampleMetadata, check_dtype=False)
 
 
+	def test_exportcsv_blocks(self):
+		"""
+		Check text written in blocks, compressed, or in parallel matches the tables written in one go.
+		"""
+		self.data.intensityData[0, 0] = numpy.nan
+		self.data.intensityData[1, 1] = numpy.inf
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			projectName = os.path.join(tmpdirname, 'tempFile')
+			numpy.savetxt(projectName + '_expected.csv', self.data.intensityData, delimiter=',')
+			with open(projectName + '_expected.csv', newline='') as f:
+				expectedIntensityData = f.read()
+
+			tmpXCombined = pandas.concat([self.data.featureMetadata.transpose(), pandas.DataFrame(self.data.intensityData)], axis=0)
+			expectedCombined = pandas.concat([self.data.sampleMetadata, tmpXCombined], axis=1).reindex(tmpXCombined.index, axis=0)
+			expectedCombined = expectedCombined.to_csv(None, date_format=self.data._timestampFormat)
+
+			for (compression, parallelise) in [(None, False), (None, True), ('gzip', False)]:
+				with self.subTest(compression=compression, parallelise=parallelise):
+					self.data._exportCSV(projectName, compression=compression, parallelise=parallelise, workers=2)
+					self.data._exportUnifiedCSV(projectName, escapeDelimiters=False, compression=compression, parallelise=parallelise, workers=2)
+
+					if compression == 'gzip':
+						with gzip.open(projectName + '_intensityData.csv.gz', 'rt', newline='') as f:
+							intensityData = f.read()
+						with gzip.open(projectName + '_combinedData.csv.gz', 'rt', newline='') as f:
+							combinedData = f.read()
+					else:
+						with open(projectName + '_intensityData.csv', newline='') as f:
+							intensityData = f.read()
+						with open(projectName + '_combinedData.csv', newline='') as f:
+							combinedData = f.read()
+
+					self.assertEqual(intensityData, expectedIntensityData)
+					self.assertEqual(combinedData, expectedCombined)
+
+
 	def test_exportdataset_withexclusions(self):
 		"""
 		Test that csv files saved with exclusions match the dataset generated after exclusions are applied.
@@ -943,6 +1274,13 @@ class test_dataset_synthetic(unittest.TestCase):
 
 		self.assertRaises(TypeError, self.data.exportDataset, filterMetadata='no')
 
+		self.assertRaises(TypeError, self.data.exportDataset, parallelise='no')
+
+		self.assertRaises(TypeError, self.data.exportDataset, workers=0)
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			self.assertRaises(ValueError, self.data.exportDataset, destinationPath=tmpdirname, saveFormat='CSV', withExclusions=False, compression='bz2')
+
 
 	def test_print_log(self):
 		"""
@@ -1038,6 +1376,26 @@ class test_dataset_synthetic(unittest.TestCase):
 		self.assertEqual(missingFeatures, ['Not a feature in the list'])
 
 
+	def test_exclude_exclusiondetails(self):
+
+		self.data.initialiseMasks()
+		self.data.sampleMetadata['Exclusion Details'] = ['Earlier', None] + [''] * (self.noSamp - 2)
+		sampleIDs = self.data.sampleMetadata['Sample File Name'].values
+
+		missingSamples = self.data.excludeSamples([sampleIDs[0], sampleIDs[1], numpy.nan, sampleIDs[1], 'Not a sample'], on='Sample File Name', message='Test Excluded')
+
+		self.assertEqual(missingSamples, [numpy.nan, 'Not a sample'])
+		self.assertEqual(self.data.sampleMetadata['Exclusion Details'].tolist(), ['Earlier AND Test Excluded', 'Test Excluded AND Test Excluded'] + [''] * (self.noSamp - 2))
+		numpy.testing.assert_array_equal(self.data.sampleMask, numpy.arange(self.noSamp) > 1)
+
+		featureIDs = self.data.featureMetadata['Feature Name'].values
+		missingFeatures = self.data.excludeFeatures([featureIDs[2]], on='Feature Name', message='Test Excluded')
+
+		self.assertEqual(missingFeatures, [])
+		self.assertEqual(self.data.featureMetadata.loc[2, 'Exclusion Details'], 'Test Excluded')
+		numpy.testing.assert_array_equal(self.data.featureMask, numpy.arange(self.noFeat) != 2)
+
+
 	def test_exclude_features_spectral(self):
 
 		noSamp = numpy.random.randint(5, high=10, size=None)
@@ -1171,6 +1529,103 @@ class test_dataset_synthetic(unittest.TestCase):
 			pandas.util.testing.assert_frame_equal(data.featureMetadata.iloc[startIndex:endIndex+1], features)
 
 
+	def test_get_features_index(self):
+
+		noFeat = 500
+		data = nPYc.Dataset()
+		data.intensityData = numpy.random.rand(10, noFeat)
+		data.sampleMetadata = pandas.DataFrame(numpy.arange(10), columns=['Sample File Name']).astype(str)
+		data.featureMetadata = pandas.DataFrame(numpy.linspace(10, -1, num=noFeat), columns=['ppm'])
+		data.VariableType = nPYc.enumerations.VariableType.Spectral
+		data.initialiseMasks()
+
+		def expected(ranges, useMasks=True):
+			mask = numpy.zeros(noFeat, dtype=bool)
+			for featureRange in ranges:
+				mask |= (data.featureMetadata['ppm'].values >= min(featureRange)) & (data.featureMetadata['ppm'].values <= max(featureRange))
+			if useMasks:
+				mask &= data.featureMask
+			return mask
+
+		with self.subTest(msg='Descending ppm, returns views'):
+			features, measuments = data.getFeatures((2, 4), by='ppm')
+
+			mask = expected([(2, 4)])
+			pandas.util.testing.assert_frame_equal(data.featureMetadata.loc[mask], features)
+			numpy.testing.assert_array_equal(data.intensityData[:, mask], measuments)
+			self.assertTrue(numpy.shares_memory(measuments, data.intensityData))
+
+		with self.subTest(msg='Overlapping and disjoint ranges'):
+			ranges = [(5, 3), (4, 4.5), (-0.5, 0.5)]
+			features, measuments = data.getFeatures(ranges, by='ppm')
+
+			mask = expected(ranges)
+			pandas.util.testing.assert_frame_equal(data.featureMetadata.loc[mask], features)
+			numpy.testing.assert_array_equal(data.intensityData[:, mask], measuments)
+
+		with self.subTest(msg='Masked features'):
+			data.featureMask[100:120] = False
+			features, measuments = data.getFeatures((8, 5), by='ppm')
+
+			mask = expected([(8, 5)])
+			pandas.util.testing.assert_frame_equal(data.featureMetadata.loc[mask], features)
+			numpy.testing.assert_array_equal(data.intensityData[:, mask], measuments)
+			data.featureMask[:] = True
+
+		with self.subTest(msg='Column reassigned'):
+			data.getFeatures((2, 4), by='ppm')
+			data.featureMetadata['ppm'] = numpy.random.permutation(data.featureMetadata['ppm'].values)
+			features, measuments = data.getFeatures((2, 4), by='ppm')
+
+			mask = expected([(2, 4)])
+			pandas.util.testing.assert_frame_equal(data.featureMetadata.loc[mask], features)
+			numpy.testing.assert_array_equal(data.intensityData[:, mask], measuments)
+
+		with self.subTest(msg='Table replaced'):
+			data.featureMetadata = pandas.DataFrame(numpy.linspace(-1, 10, num=noFeat), columns=['ppm'])
+			features, measuments = data.getFeatures((2, 4), by='ppm')
+
+			mask = expected([(2, 4)])
+			pandas.util.testing.assert_frame_equal(data.featureMetadata.loc[mask], features)
+			numpy.testing.assert_array_equal(data.intensityData[:, mask], measuments)
+
+		with self.subTest(msg='Interior value edited in place'):
+			data.getFeatures((2, 4), by='ppm')
+			inside = numpy.flatnonzero(expected([(2, 4)]))
+			data.featureMetadata.loc[inside[len(inside) // 2], 'ppm'] = 100
+			features, measuments = data.getFeatures((2, 4), by='ppm')
+
+			mask = expected([(2, 4)])
+			self.assertFalse(mask[inside[len(inside) // 2]])
+			pandas.util.testing.assert_frame_equal(data.featureMetadata.loc[mask], features)
+			numpy.testing.assert_array_equal(data.intensityData[:, mask], measuments)
+
+		with self.subTest(msg='Discrete IDs after renaming'):
+			data.VariableType = nPYc.enumerations.VariableType.Discrete
+			data.featureMetadata['Feature Name'] = ['Feature %i' % (i) for i in range(noFeat)]
+			features, measuments = data.getFeatures(['Feature 7', 'Feature 3'], by='Feature Name')
+
+			numpy.testing.assert_array_equal(data.intensityData[:, [7, 3]], measuments)
+
+			data.featureMetadata['Feature Name'] = ['Renamed %i' % (i) for i in range(noFeat)]
+			features, measuments = data.getFeatures(['Renamed 7'], by='Feature Name')
+
+			numpy.testing.assert_array_equal(data.intensityData[:, [7]], measuments)
+			self.assertRaises(IndexError, data.getFeatures, 'Feature 7', by='Feature Name')
+
+		with self.subTest(msg='Discrete ID edited in place'):
+			data.getFeatures(['Renamed 7'], by='Feature Name')
+			data.featureMetadata.loc[2, 'Feature Name'] = 'Renamed 7'
+			features, measuments = data.getFeatures(['Renamed 7'], by='Feature Name')
+
+			numpy.testing.assert_array_equal(data.intensityData[:, [2]], measuments)
+
+			data.featureMetadata.loc[2, 'Feature Name'] = 'Edited 2'
+			features, measuments = data.getFeatures(['Edited 2', 'Renamed 7'], by='Feature Name')
+
+			numpy.testing.assert_array_equal(data.intensityData[:, [2, 7]], measuments)
+
+
 	def test_get_features_autofeaturename(self):
 		self.data.initialiseMasks()
 		featureNames = ''.join(random.choice(string.ascii_letters + string.digits) for i in range(numpy.random.randint(3,15)))
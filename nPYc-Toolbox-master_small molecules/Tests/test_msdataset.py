@@ -15,6 +15,7 @@ from nPYc.enumerations import AssayRole
 from nPYc.enumerations import VariableType
 from generateTestDataset import generateTestDataset
 import tempfile
+import time
 from isatools import isatab
 
 
@@ -89,6 +90,51 @@ class test_msdataset_synthetic(unittest.TestCase):
 				msData.rsdSP
 
 
+	def test_rsd_cache(self):
+
+		from generateTestDataset import generateTestDataset
+
+		msData = generateTestDataset(numpy.random.randint(50, high=100), numpy.random.randint(10, high=50), dtype='MSDataset')
+
+		def expected(sampleType, assayRole):
+			mask = (msData.sampleMetadata['SampleType'].values == sampleType) & (msData.sampleMetadata['AssayRole'].values == assayRole)
+			return nPYc.utilities.rsd(msData._intensityData[mask & msData.sampleMask, :])
+
+		with self.subTest(msg='Calculated'):
+			numpy.testing.assert_allclose(msData.rsdSP, expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+			numpy.testing.assert_allclose(msData.rsdSS, expected(SampleType.StudySample, AssayRole.Assay))
+
+		with self.subTest(msg='Returns copies'):
+			msData.rsdSP[:] = 0
+			numpy.testing.assert_allclose(msData.rsdSP, expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+
+		with self.subTest(msg='Sample mask changed'):
+			spPositions = numpy.flatnonzero(msData.sampleMetadata['SampleType'].values == SampleType.StudyPool)
+			msData.sampleMask[spPositions[0]] = False
+			numpy.testing.assert_allclose(msData.rsdSP, expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+
+		with self.subTest(msg='Roles changed'):
+			msData.sampleMetadata.loc[spPositions[1], 'AssayRole'] = AssayRole.Assay
+			msData.sampleMetadata = msData.sampleMetadata
+			numpy.testing.assert_allclose(msData.rsdSP, expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+
+		with self.subTest(msg='Intensities replaced'):
+			msData.intensityData = msData.intensityData * numpy.random.rand(*msData.intensityData.shape)
+			numpy.testing.assert_allclose(msData.rsdSP, expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+
+			msData._intensityData = msData._intensityData[:, ::-1]
+			numpy.testing.assert_allclose(msData.rsdSS, expected(SampleType.StudySample, AssayRole.Assay))
+
+		with self.subTest(msg='Intensities replaced directly, with a reused id'):
+			shape = msData._intensityData.shape
+			for i in range(5):
+				msData.rsdSP
+				msData._intensityData = None
+				msData._intensityData = numpy.empty(shape)
+				msData._intensityData[:] = numpy.random.lognormal(size=shape)
+				numpy.testing.assert_allclose(msData.rsdSP, expected(SampleType.StudyPool, AssayRole.PrecisionReference))
+
+
 	def test_getsamplemetadatafromfilename(self):
 		"""
 		Test we are parsing NPC MS filenames correctly (PCSOP.081).
@@ -788,6 +834,14 @@ class test_msdataset_synthetic(unittest.TestCase):
 
 			numpy.testing.assert_array_almost_equal(correlations, _vcorrcoef(dataset.intensityData, dataset.sampleMetadata['Dilution'].values))
 
+		with self.subTest(msg='Checking dilution series'):
+			dataset.sampleMetadata['Dilution Series'] = numpy.arange(noSamp) % 3
+			series = [dataset.sampleMetadata['Dilution Series'].values == i for i in range(3)]
+
+			expected = numpy.mean([_vcorrcoef(dataset.intensityData, dataset.sampleMetadata['Dilution'].values, method='spearman', sampleMask=mask) for mask in series], axis=0)
+
+			numpy.testing.assert_array_almost_equal(dataset._MSDataset__correlateToDilution(method='spearman'), expected)
+
 
 	def test_correlateToDilution_raises(self):
 
@@ -1353,6 +1407,31 @@ class test_msdataset_batch_inference(unittest.TestCase):
 
 		assert_series_equal(self.msData.sampleMetadata['Correction Batch'], correctionBatch)
 
+	def test_fillbatches_dilutionseries(self):
+
+		# Two series before the final SRD, the first with a blank run amongst it
+		self.msData.sampleMetadata.loc[[0, 1, 2, 3, 4, 9, 10, 11, 12], 'AssayRole'] = AssayRole.LinearityReference
+		self.msData.sampleMetadata.loc[2, 'SampleType'] = SampleType.ProceduralBlank
+		# Batches are inferred in run order, not table order
+		self.msData.sampleMetadata = self.msData.sampleMetadata.iloc[::-1]
+
+		self.msData._fillBatches()
+
+		dilutionSeries = pandas.Series([1.0, 1.0, numpy.nan, 1.0, 1.0, numpy.nan, numpy.nan, numpy.nan, numpy.nan, 2.0, 2.0, 2.0,
+										2.0, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan,
+										numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, 3.0],
+										name='Dilution Series',
+										dtype='float')
+		correctionBatch = pandas.Series([numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, 1.0, 1.0, 1.0, 1.0, numpy.nan, numpy.nan, numpy.nan,
+										numpy.nan, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 3.0, 3.0, 3.0,
+										3.0, 3.0, 3.0, 3.0, 3.0, 3.0, 3.0, 3.0, numpy.nan],
+										name='Correction Batch',
+										dtype='float')
+
+		assert_series_equal(self.msData.sampleMetadata['Dilution Series'].sort_index(), dilutionSeries)
+		assert_series_equal(self.msData.sampleMetadata['Correction Batch'].sort_index(), correctionBatch)
+
+
 
 	def test_fillbatches_warns(self):
 
@@ -1747,6 +1826,165 @@ class test_msdataset_import_xcms(unittest.TestCase):
 		self.assertRaises(ValueError, nPYc.MSDataset, path, fileType='XCMS', noFeatureParams=9)
 
 
+class test_msdataset_import_streaming(unittest.TestCase):
+	"""
+	Streamed imports of synthetic QI and XCMS exports match the standard import
+	"""
+
+	def setUp(self):
+		self.noSamp = numpy.random.randint(5, high=20, size=None)
+		self.noFeat = numpy.random.randint(50, high=200, size=None)
+
+		self.intensities = numpy.random.lognormal(size=(self.noFeat, self.noSamp))
+		self.intensities[0, 1] = numpy.nan
+		self.sampleNames = ['UnitTest_Sample%02i' % (i) for i in range(self.noSamp)]
+
+		self.mz = numpy.random.uniform(100, 1000, size=self.noFeat)
+		self.rt = numpy.random.uniform(30, 600, size=self.noFeat)
+
+		self.tmpDir = tempfile.TemporaryDirectory()
+
+
+	def tearDown(self):
+		self.tmpDir.cleanup()
+
+
+	def writeXCMS(self, peakTable):
+		parameters = pandas.DataFrame({'mz': self.mz, 'mzmin': self.mz - 0.01, 'mzmax': self.mz + 0.01,
+									   'rt': self.rt, 'rtmin': self.rt - 2, 'rtmax': self.rt + 2, 'npeaks': 1})
+		if not peakTable:
+			parameters.insert(0, 'name', ['M%iT%i' % (mz, rt) for mz, rt in zip(self.mz, self.rt)])
+			parameters.rename(columns={'mz': 'mzmed', 'rt': 'rtmed'}, inplace=True)
+		values = pandas.DataFrame(self.intensities, columns=[name + '.mzML' for name in self.sampleNames])
+
+		path = os.path.join(self.tmpDir.name, 'xcms.csv')
+		pandas.concat([parameters, values], axis=1).to_csv(path, index=False)
+
+		return path, parameters.shape[1]
+
+
+	def writeQI(self):
+		path = os.path.join(self.tmpDir.name, 'qi.csv')
+		parameters = ['Compound', 'm/z', 'Retention time (min)', 'Chromatographic peak width (min)', 'Isotope Distribution', 'Adducts']
+
+		with open(path, 'w') as fid:
+			fid.write(','.join([''] * len(parameters) + ['Normalised abundance'] + [''] * (self.noSamp - 1) + ['Raw abundance'] + [''] * (self.noSamp - 1)) + '\n')
+			fid.write(','.join([''] * len(parameters) + ['Condition'] * (2 * self.noSamp)) + '\n')
+			fid.write(','.join(parameters + self.sampleNames * 2) + '\n')
+			for i in range(self.noFeat):
+				row = ['%.2f_%.4fm/z' % (self.rt[i] / 60, self.mz[i]), repr(self.mz[i]), repr(self.rt[i] / 60), '0.05', '100 - 12.5', 'M+H' if i % 2 else '']
+				row += [repr(x) for x in self.intensities[i, :] / 2] + ['' if numpy.isnan(x) else repr(x) for x in self.intensities[i, :]]
+				fid.write(','.join(row) + '\n')
+
+		return path
+
+
+	def assertImportsMatch(self, expected, streamed):
+
+		numpy.testing.assert_array_equal(streamed.intensityData, expected.intensityData)
+		for column in expected.featureMetadata.columns:
+			assert_series_equal(streamed.featureMetadata[column], expected.featureMetadata[column], check_dtype=False)
+		for column in ['m/z', 'Retention Time']:
+			self.assertEqual(streamed.featureMetadata[column].dtype, float)
+		assert_frame_equal(streamed.sampleMetadata, expected.sampleMetadata)
+
+
+	def test_xcms_streaming(self):
+
+		for peakTable in [False, True]:
+			with self.subTest(peakTable=peakTable):
+				path, noFeatureParams = self.writeXCMS(peakTable)
+
+				expected = nPYc.MSDataset(path, fileType='XCMS', noFeatureParams=noFeatureParams)
+				streamed = nPYc.MSDataset(path, fileType='XCMS', noFeatureParams=noFeatureParams, streaming=True, chunkSize=7)
+
+				self.assertImportsMatch(expected, streamed)
+
+
+	def test_qi_streaming(self):
+
+		path = self.writeQI()
+
+		expected = nPYc.MSDataset(path, fileType='QI')
+		streamed = nPYc.MSDataset(path, fileType='QI', streaming=True, chunkSize=7)
+
+		self.assertImportsMatch(expected, streamed)
+
+
+	def test_streaming_float32_memmap(self):
+
+		path, noFeatureParams = self.writeXCMS(False)
+		memmapPath = os.path.join(self.tmpDir.name, 'intensities.npy')
+
+		msData = nPYc.MSDataset(path, fileType='XCMS', noFeatureParams=noFeatureParams, streaming=True, dtype=numpy.float32, memmapPath=memmapPath)
+
+		self.assertEqual(msData.intensityData.dtype, numpy.float32)
+		numpy.testing.assert_array_equal(msData.intensityData, self.intensities.T.astype(numpy.float32))
+		numpy.testing.assert_array_equal(numpy.load(memmapPath), self.intensities.T.astype(numpy.float32))
+
+
+	def test_xcmsFeatureNames(self):
+
+		rt = numpy.concatenate([self.rt, [0., 180., 2.675, 1e-05, numpy.nan]])
+		mz = numpy.concatenate([self.mz, [100., 1.00005, 0.125, 1e16, 200.]])
+
+		expected = [str(round(rt[i], 2)) + '_' + str(round(mz[i], 4)) + 'm/z' for i in range(len(rt))]
+
+		self.assertEqual(nPYc.MSDataset._xcmsFeatureNames(rt, mz), expected)
+
+
+	def test_streaming_raises(self):
+
+		path, noFeatureParams = self.writeXCMS(False)
+
+		self.assertRaises(TypeError, nPYc.MSDataset, path, fileType='XCMS', noFeatureParams=noFeatureParams, streaming=True, dtype=int)
+		self.assertRaises(TypeError, nPYc.MSDataset, path, fileType='XCMS', noFeatureParams=noFeatureParams, streaming=True, chunkSize=1.5)
+		self.assertRaises(ValueError, nPYc.MSDataset, path, fileType='XCMS', noFeatureParams=noFeatureParams, streaming=True, chunkSize=0)
+
+
+class test_msdataset_import_xcms_peaktable_scaling(unittest.TestCase):
+	"""
+	Import of a large synthetic XCMS peakTable export, without a name column, names features as the per-row formatting did and completes in bounded time
+
+	Set the environment variable NPYC_SKIP_TIMING to skip the time bound on slow machines.
+	"""
+
+	def test_xcms_peaktable_names(self):
+
+		noSamp = 5
+		noFeat = 50000
+
+		rt = numpy.random.uniform(30, 720, size=noFeat)
+		mz = numpy.random.uniform(50, 1200, size=noFeat)
+		rt[:3] = [0., 180., 2.675]
+		mz[:3] = [100., 1.00005, 0.125]
+
+		parameters = pandas.DataFrame({'mz': mz, 'mzmin': mz - 0.01, 'mzmax': mz + 0.01, 'rt': rt, 'rtmin': rt - 2, 'rtmax': rt + 2, 'npeaks': 1})
+		values = pandas.DataFrame(numpy.random.lognormal(size=(noFeat, noSamp)), columns=['Sample%02i.mzML' % (i) for i in range(noSamp)])
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			path = os.path.join(tmpdirname, 'xcms_peakTable.csv')
+			pandas.concat([parameters, values], axis=1).to_csv(path, index=False)
+
+			# Values as written to and read back from the csv
+			parameters = pandas.read_csv(path, index_col=False, usecols=list(range(parameters.shape[1])))
+			expected = [str(round(x, 2)) + '_' + str(round(y, 4)) + 'm/z' for x, y in zip(parameters['rt'].values, parameters['mz'].values)]
+
+			for streaming in [False, True]:
+				with self.subTest(streaming=streaming):
+					start = time.perf_counter()
+					msData = nPYc.MSDataset(path, fileType='XCMS', noFeatureParams=parameters.shape[1], streaming=streaming)
+					elapsed = time.perf_counter() - start
+
+					self.assertEqual(msData.featureMetadata['Feature Name'].tolist(), expected)
+					numpy.testing.assert_array_equal(msData.featureMetadata['m/z'].values.astype(float), parameters['mz'].values)
+					numpy.testing.assert_array_equal(msData.featureMetadata['Retention Time'].values.astype(float), parameters['rt'].values / 60.0)
+					self.assertEqual(msData.intensityData.shape, (noSamp, noFeat))
+
+					if not os.environ.get('NPYC_SKIP_TIMING'):
+						self.assertLess(elapsed, 60)
+
+
 class test_msdataset_import_csvimport_discrete(unittest.TestCase):
 	"""
 	Test import from NPC csv files
@@ -2528,6 +2766,141 @@ class test_msdataset_artifactual_filtering(unittest.TestCase):
 		assert_frame_equal(self.msData5._tempArtifactualLinkageMatrix, featMaskRes_tempArtifactualLinkageMatrix)
 
 
+class test_msdataset_artifactual_linkage_synthetic(unittest.TestCase):
+	"""
+	Compare artifactual linkage candidates against an exhaustive comparison of every pair of features
+	"""
+
+	def setUp(self):
+		noFeat = numpy.random.randint(500, high=1500, size=None)
+
+		self.msData = generateTestDataset(20, noFeat, dtype='MSDataset')
+		# Crowd features so that plenty overlap, with some exact m/z ties
+		self.msData.featureMetadata['m/z'] = numpy.round(numpy.random.uniform(100, 100.5, size=noFeat), 3)
+		self.msData.featureMetadata['Retention Time'] = numpy.random.uniform(0, 10, size=noFeat)
+		self.msData.featureMetadata['Peak Width'] = numpy.random.uniform(0.01, 0.5, size=noFeat)
+		self.msData.featureMetadata.loc[0, 'm/z'] = numpy.nan
+
+		self.msData.Attributes['featureFilters']['artifactualFilter'] = True
+		self.msData.Attributes['filterParameters']['deltaMzArtifactual'] = 0.01
+		self.msData.Attributes['filterParameters']['overlapThresholdArtifactual'] = 50
+		self.msData.Attributes['filterParameters']['corrThresholdArtifactual'] = 0.0
+
+
+	def test_generateArtifactualLinkageMatrix(self):
+
+		mz = self.msData.featureMetadata['m/z'].values
+		rt = self.msData.featureMetadata['Retention Time'].values
+		width = self.msData.featureMetadata['Peak Width'].values
+
+		expected = list()
+		for i in range(self.msData.noFeatures):
+			for j in range(i + 1, self.msData.noFeatures):
+				halfWidth = (width[i] + width[j]) / 2
+				if (abs(rt[i] - rt[j]) <= halfWidth) & (abs(mz[i] - mz[j]) <= 0.01):
+					if ((halfWidth - abs(rt[i] - rt[j])) / halfWidth) * 100 >= 50:
+						expected.append([i, j])
+		expected = pandas.DataFrame(expected, columns=['node1', 'node2'], dtype=numpy.int64)
+
+		self.msData.updateArtifactualLinkageMatrix()
+
+		assert_frame_equal(self.msData._tempArtifactualLinkageMatrix, expected)
+
+
+	def expectedLinkage(self):
+		# correlate each candidate pair on its own
+		candidates = self.msData._tempArtifactualLinkageMatrix
+		linkCorr = numpy.zeros(candidates.shape[0])
+		for i in range(candidates.shape[0]):
+			linkCorr[i] = numpy.corrcoef(self.msData._intensityData[:, candidates.loc[i, 'node1']], self.msData._intensityData[:, candidates.loc[i, 'node2']])[0, 1]
+
+		return candidates.loc[linkCorr >= self.msData.Attributes['filterParameters']['corrThresholdArtifactual'], ]
+
+
+	def test_artifactualLinkageCorrelation(self):
+
+		self.msData._intensityData[:, 1] = 3
+		self.msData.Attributes['filterParameters']['corrThresholdArtifactual'] = 0.1
+
+		self.msData.updateArtifactualLinkageMatrix()
+
+		assert_frame_equal(self.msData._artifactualLinkageMatrix, self.expectedLinkage())
+
+
+	def test_artifactualLinkageCorrelation_excludeSamples(self):
+
+		self.msData._intensityData[:, 1] = 3
+		self.msData._intensityData[3, 2] = numpy.nan
+		self.msData.Attributes['filterParameters']['corrThresholdArtifactual'] = 0.1
+		self.msData.updateArtifactualLinkageMatrix()
+
+		with self.subTest(msg='Downdated'):
+			self.msData.sampleMask[[0, 5, 6]] = False
+			self.msData.applyMasks()
+
+			assert_frame_equal(self.msData._artifactualLinkageMatrix, self.expectedLinkage())
+
+		with self.subTest(msg='Removing non-finite values'):
+			self.msData.sampleMask[0] = False
+			self.msData.applyMasks()
+
+			assert_frame_equal(self.msData._artifactualLinkageMatrix, self.expectedLinkage())
+
+		with self.subTest(msg='Downdated again'):
+			self.msData.sampleMask[[1, 2]] = False
+			self.msData.applyMasks()
+
+			assert_frame_equal(self.msData._artifactualLinkageMatrix, self.expectedLinkage())
+
+
+	def test_thresholdSweep(self):
+
+		self.msData.sampleMetadata.loc[[1, 2, 3, 4, 6, 7], 'SampleType'] = SampleType.StudyPool
+		self.msData.sampleMetadata.loc[[1, 2, 3, 4, 6, 7], 'AssayRole'] = AssayRole.LinearityReference
+		self.msData.Attributes['corrMethod'] = 'spearman'
+		self.msData.Attributes['filterParameters']['corrThresholdArtifactual'] = 0.1
+		self.msData.updateArtifactualLinkageMatrix()
+
+		sweep = self.msData.thresholdSweep(withArtifactualFiltering=True)
+
+		rsdThresholds = [10, 30, 50]
+		corrThresholds = [-0.5, 0, 0.5]
+		counts = sweep.count(rsdThresholds, corrThresholds, varianceRatio=1.1, withArtifactualFiltering=True)
+
+		for (i, rsdThreshold) in enumerate(rsdThresholds):
+			for (j, corrThreshold) in enumerate(corrThresholds):
+				featMask = (self.msData.rsdSP <= rsdThreshold) & (self.msData.correlationToDilution >= corrThreshold) & ((self.msData.rsdSP * 1.1) <= self.msData.rsdSS)
+
+				self.assertEqual(counts[i, j], sum(self.msData.artifactualFilter(featMask=featMask)))
+
+
+	def test_artifactualFilter(self):
+
+		import networkx
+
+		self.msData.updateArtifactualLinkageMatrix()
+		# Tie features 4 and 5 in intensity, and give 6 a missing value
+		self.msData._intensityData[:, 5] = self.msData._intensityData[:, 4]
+		self.msData._intensityData[0, 6] = numpy.nan
+
+		linkage = self.msData.artifactualLinkageMatrix
+		meanIntensity = self.msData._intensityData.mean(axis=0)
+
+		for threshold in [0, 0.2, 0.5]:
+			with self.subTest(threshold=threshold):
+				featMask = numpy.random.uniform(size=self.msData.noFeatures) >= threshold
+
+				# Keep the most intense feature of each cluster of linked features, the first by index if tied
+				expected = numpy.copy(featMask)
+				graph = networkx.from_pandas_edgelist(linkage[featMask[linkage['node1'].values] & featMask[linkage['node2'].values]], source='node1', target='node2')
+				for cluster in networkx.connected_components(graph):
+					cluster = sorted(cluster)
+					expected[cluster] = False
+					expected[cluster[numpy.argmax(meanIntensity[cluster])]] = True
+
+				numpy.testing.assert_array_equal(self.msData.artifactualFilter(featMask=featMask), expected)
+
+
 class test_msdataset_ISATAB(unittest.TestCase):
 
 	def test_exportISATAB(self):
@@ -2630,5 +3003,100 @@ class test_msdataset_initialiseFromCSV(unittest.TestCase):
 			self.assertEqual(rebuiltData.name, dataset.name)
 
 
+class test_msdataset_hdf5(unittest.TestCase):
+
+	def setUp(self):
+
+		self.noSamp = numpy.random.randint(20, high=50, size=None)
+		self.noFeat = numpy.random.randint(200, high=400, size=None)
+
+		self.dataset = generateTestDataset(self.noSamp, self.noFeat, dtype='MSDataset', sop='GenericMS')
+		self.dataset.name = 'Testing'
+		self.dataset.fit = numpy.random.rand(self.noSamp, self.noFeat)
+		self.dataset.sampleMetadata['Metadata'] = [{'key': i} if i % 2 else numpy.nan for i in range(self.noSamp)]
+		self.dataset.featureMetadata.loc[0, 'Exclusion Details'] = 'Excluded'
+		self.dataset.sampleMask[1] = False
+		self.dataset.featureMask[2] = False
+		self.dataset.Normalisation = nPYc.utilities.normalisation.ProbabilisticQuotientNormaliser()
+
+
+	def test_roundtrip(self):
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			self.dataset.exportDataset(destinationPath=tmpdirname, saveFormat='HDF5', withExclusions=False)
+
+			rebuiltData = nPYc.MSDataset(os.path.join(tmpdirname, 'Testing.h5'), fileType='HDF5')
+
+		numpy.testing.assert_array_equal(rebuiltData._intensityData, self.dataset._intensityData)
+		numpy.testing.assert_array_equal(rebuiltData.intensityData, self.dataset.intensityData)
+		numpy.testing.assert_array_equal(rebuiltData.fit, self.dataset.fit)
+		numpy.testing.assert_array_equal(rebuiltData.sampleMask, self.dataset.sampleMask)
+		numpy.testing.assert_array_equal(rebuiltData.featureMask, self.dataset.featureMask)
+		assert_frame_equal(rebuiltData.sampleMetadata, self.dataset.sampleMetadata)
+		assert_frame_equal(rebuiltData.featureMetadata, self.dataset.featureMetadata)
+		self.assertIsInstance(rebuiltData.Normalisation, nPYc.utilities.normalisation.ProbabilisticQuotientNormaliser)
+		# Log up to the export is restored
+		self.assertEqual(rebuiltData.Attributes['Log'][:len(self.dataset.Attributes['Log']) - 1], self.dataset.Attributes['Log'][:-1])
+		self.assertEqual(rebuiltData.Attributes['featureFilters'], self.dataset.Attributes['featureFilters'])
+		self.assertEqual(rebuiltData.VariableType, self.dataset.VariableType)
+		self.assertEqual(rebuiltData.name, self.dataset.name)
+
+
+	def test_partialLoad(self):
+
+		samples = numpy.random.rand(self.noSamp) > 0.5
+		features = [self.noFeat - 1, 5, 0, 17]
+		sortedFeatures = sorted(features)
+
+		for compression in [None, 'gzip']:
+			with self.subTest(msg='Compression %s' % (compression)):
+				with tempfile.TemporaryDirectory() as tmpdirname:
+					self.dataset.exportDataset(destinationPath=tmpdirname, saveFormat='HDF5', withExclusions=False, compression=compression)
+
+					rebuiltData = nPYc.MSDataset(os.path.join(tmpdirname, 'Testing.h5'), fileType='HDF5', samples=samples, features=features)
+
+				numpy.testing.assert_array_equal(rebuiltData._intensityData, self.dataset._intensityData[samples, :][:, sortedFeatures])
+				numpy.testing.assert_array_equal(rebuiltData.fit, self.dataset.fit[samples, :][:, sortedFeatures])
+				numpy.testing.assert_array_equal(rebuiltData.sampleMask, self.dataset.sampleMask[samples])
+				numpy.testing.assert_array_equal(rebuiltData.featureMask, self.dataset.featureMask[sortedFeatures])
+				assert_frame_equal(rebuiltData.sampleMetadata, self.dataset.sampleMetadata.loc[samples].reset_index(drop=True))
+				assert_frame_equal(rebuiltData.featureMetadata, self.dataset.featureMetadata.loc[sortedFeatures].reset_index(drop=True))
+
+
+	def test_mmap(self):
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			self.dataset.exportDataset(destinationPath=tmpdirname, saveFormat='HDF5', withExclusions=False)
+			path = os.path.join(tmpdirname, 'Testing.h5')
+
+			rebuiltData = nPYc.MSDataset(path, fileType='HDF5', mmap=True)
+
+			self.assertIsInstance(rebuiltData._intensityData, numpy.memmap)
+			numpy.testing.assert_array_equal(rebuiltData._intensityData, self.dataset._intensityData)
+
+			# Copy-on-write, the file is unchanged
+			rebuiltData._intensityData[0, 0] = -1
+			reloadedData = nPYc.MSDataset(path, fileType='HDF5')
+			self.assertEqual(reloadedData._intensityData[0, 0], self.dataset._intensityData[0, 0])
+
+			del rebuiltData
+
+
+	def test_hdf5_raises(self):
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			self.assertRaises(ValueError, self.dataset.exportDataset, destinationPath=tmpdirname, saveFormat='HDF5', compression='bz2')
+
+			self.dataset.exportDataset(destinationPath=tmpdirname, saveFormat='HDF5', compression='gzip')
+			path = os.path.join(tmpdirname, 'Testing.h5')
+
+			self.assertRaises(ValueError, nPYc.MSDataset, path, fileType='HDF5', mmap=True)
+			self.assertRaises(TypeError, nPYc.MSDataset, path, fileType='HDF5', mmap='True')
+			self.assertRaises(ValueError, nPYc.MSDataset, path, fileType='HDF5', samples=[True, False])
+			self.assertRaises(ValueError, nPYc.MSDataset, path, fileType='HDF5', features=[self.noFeat])
+			self.assertRaises(TypeError, nPYc.MSDataset, path, fileType='HDF5', features=['a'])
+			self.assertRaises(ValueError, nPYc.NMRDataset, path, fileType='HDF5')
+
+
 if __name__ == '__main__':
 	unittest.main()
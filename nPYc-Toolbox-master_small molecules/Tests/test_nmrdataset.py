@@ -538,5 +538,26 @@ class test_nmrdataset_initialiseFromCSV(unittest.TestCase):
 			self.assertEqual(rebuitData.name, dataset.name)
 
 
+class test_nmrdataset_hdf5(unittest.TestCase):
+
+	def test_roundtrip(self):
+
+		noSamp = numpy.random.randint(5, high=10, size=None)
+		noFeat = numpy.random.randint(500, high=1000, size=None)
+
+		dataset = generateTestDataset(noSamp, noFeat, dtype='NMRDataset', variableType=nPYc.enumerations.VariableType.Spectral, sop='GenericNMRurine')
+		dataset.name = 'Testing'
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			dataset.exportDataset(destinationPath=tmpdirname, saveFormat='HDF5', withExclusions=False)
+
+			rebuiltData = nPYc.NMRDataset(os.path.join(tmpdirname, 'Testing.h5'), fileType='HDF5', features=range(10, 20))
+
+		numpy.testing.assert_array_equal(rebuiltData.intensityData, dataset.intensityData[:, 10:20])
+		numpy.testing.assert_array_equal(rebuiltData._scale, dataset.featureMetadata['ppm'].values[10:20])
+		pandas.testing.assert_frame_equal(rebuiltData.sampleMetadata, dataset.sampleMetadata)
+		self.assertEqual(rebuiltData.VariableType, nPYc.enumerations.VariableType.Spectral)
+
+
 if __name__ == '__main__':
 	unittest.main()
@@ -8,6 +8,7 @@ import unittest.mock
 import tempfile
 import os
 import copy
+import gzip
 import json
 from datetime import datetime
 sys.path.append("..")
@@ -983,6 +984,8 @@ class test_targeteddataset_synthetic(unittest.TestCase):
 			numpy.testing.assert_array_equal(concatenatedDataset._intensityData, expectedDataset._intensityData)
 			# Checking expectedConcentration:
 			pandas.testing.assert_frame_equal(concatenatedDataset.expectedConcentration.reindex(sorted(concatenatedDataset.expectedConcentration), axis=1),expectedDataset.expectedConcentration.reindex(sorted(expectedDataset.expectedConcentration), axis=1))
+			# Checking cached role masks are not carried over:
+			numpy.testing.assert_array_equal(concatenatedDataset.roleMasks[SampleType.StudySample, AssayRole.Assay], expectedDataset.roleMasks[SampleType.StudySample, AssayRole.Assay])
 			# Checking Attributes:
 			# same Attributes
 			self.assertEqual(concatenatedDataset.Attributes.keys(), expectedDataset.Attributes.keys())
@@ -5308,10 +5311,30 @@ class test_targeteddataset_exportdataset(unittest.TestCase):
 				# warning
 				self.targeted.exportDataset(destinationPath=targetFolder, saveFormat='CSV')
 
+	def test_exportdataset_compressed_parallel(self):
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			for saveFormat, suffix in [('CSV', '_intensityData.csv'), ('UnifiedCSV', '_combinedData.csv')]:
+				with self.subTest(saveFormat=saveFormat):
+					self.targeted.exportDataset(destinationPath=os.path.join(tmpdirname, 'plain'), saveFormat=saveFormat)
+					self.targeted.exportDataset(destinationPath=os.path.join(tmpdirname, 'gzip'), saveFormat=saveFormat, compression='gzip', parallelise=True, workers=2)
+
+					with open(os.path.join(tmpdirname, 'plain', self.targeted.name + suffix), newline='') as f:
+						expected = f.read()
+					with gzip.open(os.path.join(tmpdirname, 'gzip', self.targeted.name + suffix + '.gz'), 'rt', newline='') as f:
+						exported = f.read()
+
+					self.assertIn('<LLOQ', exported)
+					self.assertEqual(expected, exported)
+
 	def test_exportdataset_ISATAB_raise_notimplemented(self):
 		with tempfile.TemporaryDirectory() as tmpdirname:
 			self.assertRaises(NotImplementedError, self.targeted.exportDataset, destinationPath=tmpdirname, saveFormat='ISATAB')
 
+	def test_exportdataset_HDF5_raise_valueerror(self):
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			self.assertRaises(ValueError, self.targeted.exportDataset, destinationPath=tmpdirname, saveFormat='HDF5')
+			self.assertEqual(os.listdir(tmpdirname), [])
+
 
 class test_targeteddataset_import_undefined(unittest.TestCase):
 	"""
@@ -85,6 +85,46 @@ class test_utilities_internal(unittest.TestCase):
 			numpy.testing.assert_allclose(pearson, pearson_scipy, err_msg='Pearson Correlation output does not equal scipy.')
 
 
+	def test_correlation_ties_chunks(self):
+		"""
+		Check ranking of tied and missing values, and that chunking and grouping do not change _vcorrcoef output.
+		"""
+
+		from nPYc.utilities._internal import _rankColumns, _vcorrcoef, _vcorrcoefByGroup
+
+		xdim = numpy.random.randint(10,50)
+		ydim = numpy.random.randint(70,300)
+
+		X = numpy.random.randint(0, 4, size=(xdim, ydim)).astype(float)
+		Y = numpy.random.randint(0, 4, size=xdim)
+
+		with self.subTest(msg='Ranking ties'):
+			ranks = numpy.column_stack([scipy.stats.rankdata(X[:,i]) for i in range(ydim)])
+			numpy.testing.assert_array_equal(_rankColumns(X), ranks)
+
+		with self.subTest(msg='Spearman with ties'):
+			spearman_scipy = numpy.array([scipy.stats.spearmanr(X[:,i], Y)[0] for i in range(ydim)])
+			spearman_scipy[numpy.isnan(spearman_scipy)] = 0
+			numpy.testing.assert_allclose(_vcorrcoef(X, Y, method='spearman'), spearman_scipy, atol=1e-12)
+
+		with self.subTest(msg='Chunking'):
+			for method in ['pearson', 'spearman']:
+				numpy.testing.assert_allclose(_vcorrcoef(X, Y, method=method, chunkSize=xdim * 3), _vcorrcoef(X, Y, method=method))
+
+		with self.subTest(msg='Grouped'):
+			masks = [numpy.arange(xdim) % 2 == 0, numpy.arange(xdim) % 2 == 1]
+			grouped = _vcorrcoefByGroup(X, Y, masks, method='spearman', chunkSize=xdim * 5)
+			for (index, mask) in enumerate(masks):
+				numpy.testing.assert_allclose(grouped[index, :], _vcorrcoef(X, Y, method='spearman', sampleMask=mask))
+
+		with self.subTest(msg='NaN'):
+			X[0, 1] = numpy.nan
+			ranks = _rankColumns(X)
+			self.assertTrue(numpy.all(numpy.isnan(ranks[:, 1])))
+			self.assertFalse(numpy.any(numpy.isnan(ranks[:, 0])))
+			self.assertEqual(_vcorrcoef(X, Y, method='spearman')[1], 0)
+
+
 	def test_copybackingfiles(self):
 		"""
 		Check files are copied to the location specified (we trust the shutil.copy call to preserve contents).
@@ -137,6 +177,40 @@ class test_utilities_ms(unittest.TestCase):
 		numpy.testing.assert_allclose(testResultsWithNaNs, [0, 0, numpy.finfo(numpy.float64).max], err_msg='RSD calculation not handling NaNs correctly.')
 
 
+	def test_groupStatistics(self):
+
+		noSamp = numpy.random.randint(50, high=200)
+		noFeat = numpy.random.randint(10, high=50)
+		data = numpy.random.lognormal(size=(noSamp, noFeat)) * 100
+		data[:, 0] = 5
+
+		masks = [numpy.random.rand(noSamp) < fraction for fraction in (0.2, 0.5, 0.9)]
+		masks.append(numpy.ones(noSamp, dtype=bool))
+
+		# Use small blocks, so moments are merged across blocks
+		for blockSize in [2**20, noFeat * 7]:
+			with self.subTest(msg='Block size %i' % (blockSize)):
+				(means, stds, rsds) = nPYc.utilities.groupStatistics(data, masks, blockSize=blockSize)
+
+				self.assertEqual(means.shape, (len(masks), noFeat))
+				for (i, mask) in enumerate(masks):
+					numpy.testing.assert_allclose(means[i], numpy.mean(data[mask, :], axis=0))
+					numpy.testing.assert_allclose(stds[i, 1:], numpy.std(data[mask, 1:], axis=0))
+					numpy.testing.assert_allclose(rsds[i, 1:], nPYc.utilities.ms.rsd(data[mask, 1:]))
+					self.assertAlmostEqual(rsds[i, 0], 0)
+
+		with self.subTest(msg='Empty group'):
+			(means, stds, rsds) = nPYc.utilities.groupStatistics(data, [numpy.zeros(noSamp, dtype=bool)])
+
+			self.assertTrue(numpy.all(numpy.isnan(means)))
+			numpy.testing.assert_array_equal(rsds, numpy.finfo(numpy.float64).max)
+
+		with self.subTest(msg='No groups'):
+			(means, stds, rsds) = nPYc.utilities.groupStatistics(data, [])
+
+			self.assertEqual(rsds.shape, (0, noFeat))
+
+
 	def test_sequentialPrecision(self):
 		# Fix the random seed for reproducible results
 		numpy.random.seed(seed=200)
@@ -239,6 +313,144 @@ class test_utilities_ms(unittest.TestCase):
 		self.assertRaises(KeyError, nPYc.utilities.rsdsBySampleType, nPYc.Dataset(), useColumn='Not There')
 
 
+class test_utilities_thresholdsweep(unittest.TestCase):
+
+	def setUp(self):
+		noFeat = numpy.random.randint(200, high=500)
+
+		self.correlation = numpy.round(numpy.random.uniform(0, 1, size=noFeat), 2)
+		self.rsdSP = numpy.round(numpy.random.uniform(0, 60, size=noFeat))
+		self.rsdSS = numpy.random.uniform(0, 80, size=noFeat)
+		self.rsdSP[1] = numpy.nan
+		self.correlation[2] = numpy.nan
+		self.featureMask = numpy.random.uniform(size=noFeat) > 0.1
+		self.blankLevels = (numpy.random.uniform(1, 10, size=noFeat), numpy.random.uniform(0, 10, size=noFeat))
+		self.linkage = pandas.DataFrame(numpy.random.randint(0, noFeat, size=(noFeat, 2)), columns=['node1', 'node2'])
+
+		self.rsdThresholds = [30, 5, 10, 20, 20, 50]
+		self.corrThresholds = numpy.arange(0.5, 1.01, 0.05)
+
+
+	def expectedCount(self, rsdThreshold, corrThreshold, varianceRatio=None, blankThreshold=None, withArtifactualFiltering=False):
+
+		import networkx
+
+		mask = self.featureMask & (self.rsdSP <= rsdThreshold) & (self.correlation >= corrThreshold)
+		if varianceRatio is not None:
+			mask &= (self.rsdSP * varianceRatio) <= self.rsdSS
+		if blankThreshold is not None:
+			mask &= self.blankLevels[0] >= (self.blankLevels[1] * blankThreshold)
+
+		if not withArtifactualFiltering:
+			return sum(mask)
+
+		# Count each connected group of features passing once
+		graph = networkx.Graph()
+		graph.add_nodes_from(numpy.flatnonzero(mask))
+		links = self.linkage[mask[self.linkage['node1'].values] & mask[self.linkage['node2'].values]]
+		graph.add_edges_from(links.values.tolist())
+
+		return networkx.number_connected_components(graph)
+
+
+	def test_count(self):
+
+		from nPYc.utilities import ThresholdSweep
+
+		sweep = ThresholdSweep(self.correlation, self.rsdSP, rsdSS=self.rsdSS, featureMask=self.featureMask, blankLevels=self.blankLevels, linkage=self.linkage)
+
+		for withArtifactualFiltering in [False, True]:
+			with self.subTest(msg='Grid', withArtifactualFiltering=withArtifactualFiltering):
+				counts = sweep.count(self.rsdThresholds, self.corrThresholds, varianceRatio=[1, 1.5], blankThreshold=[2.0], withArtifactualFiltering=withArtifactualFiltering)
+
+				self.assertEqual(counts.shape, (len(self.rsdThresholds), len(self.corrThresholds), 2, 1))
+				for (i, rsdThreshold) in enumerate(self.rsdThresholds):
+					for (j, corrThreshold) in enumerate(self.corrThresholds):
+						for (k, varianceRatio) in enumerate([1, 1.5]):
+							self.assertEqual(counts[i, j, k, 0], self.expectedCount(rsdThreshold, corrThreshold, varianceRatio, 2.0, withArtifactualFiltering))
+
+			with self.subTest(msg='Single thresholds', withArtifactualFiltering=withArtifactualFiltering):
+				count = sweep.count(20, 0.7, withArtifactualFiltering=withArtifactualFiltering)
+
+				self.assertEqual(numpy.ndim(count), 0)
+				self.assertEqual(count, self.expectedCount(20, 0.7, withArtifactualFiltering=withArtifactualFiltering))
+
+
+	def test_count_raises(self):
+
+		from nPYc.utilities import ThresholdSweep
+
+		sweep = ThresholdSweep(self.correlation, self.rsdSP)
+
+		self.assertRaises(ValueError, sweep.count, 20, 0.7, varianceRatio=1.1)
+		self.assertRaises(ValueError, sweep.count, 20, 0.7, blankThreshold=2.0)
+		self.assertRaises(ValueError, sweep.count, 20, 0.7, withArtifactualFiltering=True)
+		self.assertRaises(ValueError, ThresholdSweep, self.correlation[1:], self.rsdSP)
+
+
+class test_utilities_filenameparser(unittest.TestCase):
+
+	def setUp(self):
+		import json
+
+		from nPYc.enumerations import AssayRole, SampleType
+
+		with open(os.path.join('..', 'nPYc', 'StudyDesigns', 'SOP', 'GenericMS.json')) as sop:
+			self.filenameSpec = json.load(sop)['filenameSpec']
+
+		self.dilutionMap = {'SRD01': 1.0, 'SRD02': 10.0}
+
+		self.fileNames = pandas.Series(['Test1_RPOS_ToF02_U1W03',
+										'Test1_RPOS_ToF02_P1W10_SR',
+										'Test1_RPOS_ToF02_P1W11_LTR_x',
+										'Test1_RPOS_ToF02_S1W12_MR',
+										'Test1_RPOS_ToF02_B2S3_SR',
+										'Test1_RPOS_ToF02_P1SRD02',
+										'Test1_RPOS_ToF02_Blank02',
+										'Test1_RPOS_ToF02_EIC01',
+										'Not a parsable name'])
+
+		self.expected = pandas.DataFrame({'AssayRole': [AssayRole.Assay, AssayRole.PrecisionReference, AssayRole.PrecisionReference, AssayRole.PrecisionReference, AssayRole.PrecisionReference, AssayRole.LinearityReference, AssayRole.LinearityReference, AssayRole.Assay, AssayRole.Assay],
+										  'SampleType': [SampleType.StudySample, SampleType.StudyPool, SampleType.ExternalReference, SampleType.MethodReference, SampleType.StudyPool, SampleType.StudyPool, SampleType.ProceduralBlank, SampleType.StudyPool, SampleType.StudySample],
+										  'Skipped': [False, False, True, False, False, False, False, False, False],
+										  'Matrix': ['U', 'P', 'P', 'S', '', 'P', '', '', ''],
+										  'Well': [3, 10, 11, 12, 3, 2, -1, -1, numpy.nan],
+										  'Batch': [numpy.nan, numpy.nan, numpy.nan, numpy.nan, 2, numpy.nan, numpy.nan, numpy.nan, numpy.nan],
+										  'Dilution': [numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan, 10.0, numpy.nan, numpy.nan, numpy.nan]})
+
+
+	def test_parseFilenames(self):
+
+		from nPYc.utilities._filenameParser import _parseFilenames
+
+		fileNameParts = _parseFilenames(self.fileNames, self.filenameSpec, self.dilutionMap)
+
+		self.assertEqual(len(fileNameParts), len(self.fileNames))
+		assert_frame_equal(fileNameParts[self.expected.columns], self.expected, check_dtype=False)
+
+
+	def test_mergeFilenameMetadata(self):
+
+		from nPYc.utilities._filenameParser import _parseFilenames, _mergeFilenameMetadata
+
+		sampleMetadata = pandas.DataFrame({'Sample File Name': self.fileNames[::-1].values,
+										   'AssayRole': numpy.nan,
+										   'Batch': 1,
+										   'Acquired Time': numpy.arange(len(self.fileNames))})
+
+		fileNameParts = _parseFilenames(pandas.Series(self.fileNames.values), self.filenameSpec, self.dilutionMap)
+		merged = _mergeFilenameMetadata(sampleMetadata, fileNameParts)
+
+		# Rows keep their order, parsed columns replace those already present
+		self.assertEqual(merged['Sample File Name'].tolist(), sampleMetadata['Sample File Name'].tolist())
+		numpy.testing.assert_array_equal(merged['Acquired Time'].values, sampleMetadata['Acquired Time'].values)
+		self.assertEqual(list(merged.columns).count('Batch'), 1)
+		assert_frame_equal(merged.loc[1:, self.expected.columns].reset_index(drop=True), self.expected[-2::-1].reset_index(drop=True), check_dtype=False)
+
+		# Names that can not be parsed are left without metadata
+		self.assertTrue(merged.loc[0, ['AssayRole', 'SampleType', 'Matrix']].isnull().all())
+
+
 class test_utilities_conditionaljoin(unittest.TestCase):
 
 	def test_utilities_conditionaljoin_assertstring(self):
@@ -946,12 +1158,57 @@ class test_utilities_nmr(unittest.TestCase):
 			numpy.testing.assert_allclose(target, result, atol=1e-3)
 
 
+	def test_interpolateSpectrum_stack(self):
+		from scipy.interpolate import interp1d
+
+		noSpectra = numpy.random.randint(5, 50)
+		# Descending scales as read from Bruker data, several spectra sharing each calibration shift
+		ppm = numpy.linspace(12, -2, numpy.random.randint(1000, 2000))
+		scales = numpy.array([ppm - (i % 3) * 1e-3 for i in range(noSpectra)])
+		target = numpy.linspace(10, -0.5, numpy.random.randint(500, 1000))
+		target[0] = ppm[10]
+
+		spectra = numpy.random.lognormal(size=(noSpectra, ppm.size))
+		spectra[1, 100] = numpy.nan
+		spectra[2, 200] = numpy.inf
+
+		expected = numpy.zeros((noSpectra, target.size))
+		for i in range(noSpectra):
+			expected[i, :] = interp1d(scales[i, :], spectra[i, :])(target)
+
+		with self.subTest(msg='Stack of scales'):
+			result = nPYc.utilities._nmr.interpolateSpectrum(spectra, scales, target)
+
+			numpy.testing.assert_array_equal(result, expected)
+
+		with self.subTest(msg='Shared scale, into out'):
+			out = numpy.zeros((noSpectra, target.size))
+			result = nPYc.utilities._nmr.interpolateSpectrum(spectra[::3, :], scales[0, :], target, out=out[::3, :])
+
+			numpy.testing.assert_array_equal(out[::3, :], expected[::3, :])
+			numpy.testing.assert_array_equal(result, expected[::3, :])
+
+		with self.subTest(msg='Integer spectrum'):
+			result = nPYc.utilities._nmr.interpolateSpectrum(numpy.arange(ppm.size), ppm, target)
+
+			numpy.testing.assert_array_equal(result, interp1d(ppm, numpy.arange(ppm.size))(target))
+
+
 	def test_interpolateSpectrum_raises(self):
 
 		threeD = numpy.empty((3,3,3))
 
 		self.assertRaises(ValueError, nPYc.utilities._nmr.interpolateSpectrum, threeD, None, None)
 
+		with self.subTest(msg='Mismatched scales'):
+			spectra = numpy.zeros((4, 10))
+			self.assertRaises(ValueError, nPYc.utilities._nmr.interpolateSpectrum, spectra, numpy.zeros((3, 10)), numpy.zeros(5))
+			self.assertRaises(ValueError, nPYc.utilities._nmr.interpolateSpectrum, spectra, numpy.zeros(9), numpy.zeros(5))
+
+		with self.subTest(msg='Out of range'):
+			self.assertRaises(ValueError, nPYc.utilities._nmr.interpolateSpectrum, numpy.zeros(10), numpy.arange(10), [-1])
+			self.assertRaises(ValueError, nPYc.utilities._nmr.interpolateSpectrum, numpy.zeros(10), numpy.arange(10), [10])
+
 
 	def test_generateBaseName(self):
 		from nPYc.utilities._nmr import generateBaseName
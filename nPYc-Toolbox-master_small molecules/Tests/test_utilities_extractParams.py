@@ -11,6 +11,7 @@ from pandas.util.testing import assert_frame_equal
 import os
 import tempfile
 import inspect
+from datetime import datetime
 
 sys.path.append("..")
 import nPYc
@@ -308,3 +309,101 @@ class test_utilities_extractParams(unittest.TestCase):
 				obtained = extractBrukerparams(filePath, queryItems, acqTimeRE)
 
 			self.assertEqual(obtained['Warnings'][:15], 'Unable to open ')
+
+
+class test_utilities_extractParams_synthetic(unittest.TestCase):
+	"""
+	Parallel and cached reading of Waters .RAW parameters, from folders written to a temporary directory.
+	"""
+
+	def setUp(self):
+		self.tmpdir = tempfile.TemporaryDirectory()
+		self.rawPath = self.tmpdir.name
+
+		noSamp = numpy.random.randint(8, high=20)
+		for i in range(noSamp):
+			path = os.path.join(self.rawPath, 'Batch%i' % (i % 2), 'Test_RPOS_ToF01_S1W%02i.raw' % (i))
+			os.makedirs(path)
+
+			with open(os.path.join(path, '_extern.inf'), 'w', encoding='latin-1', newline='') as f:
+				f.write('LM Resolution\t\t10.0\r\nResolution\t\t13000\r\nDetector\t\t%i\r\nBacking\t\t3.52e0\r\n' % (3000 + i))
+			if i != 3:
+				with open(os.path.join(path, '_HEADER.TXT'), 'w', encoding='latin-1', newline='') as f:
+					f.write('$$ Acquired Date: %02i-Nov-2014\r\n$$ Acquired Time: 13:%02i:48\r\n$$ Instrument: XEVO-G2SQTOF#YDA121\r\n' % (i + 1, i))
+			with open(os.path.join(path, '_INLET.INF'), 'w', encoding='latin-1', newline='') as f:
+				f.write('ColumnType: ACQUITY UPLC\r\nColumn Serial Number: 01573413615729\r\n')
+
+		self.noSamp = noSamp
+
+
+	def tearDown(self):
+		self.tmpdir.cleanup()
+
+
+	def test_extractParams_waters_parallel(self):
+		from nPYc.utilities._getMetadataFromWatersRaw import getSampleMetadataFromWatersRawFiles
+
+		with self.assertWarnsRegex(UserWarning, 'Unable to open '):
+			expected = getSampleMetadataFromWatersRawFiles(self.rawPath)
+
+		self.assertEqual(expected.shape[0], self.noSamp)
+		self.assertEqual(expected.loc[expected['Sample File Name'] == 'Test_RPOS_ToF01_S1W03', 'Acquired Time'].isnull().all(), True)
+		self.assertEqual(expected.loc[expected['Sample File Name'] == 'Test_RPOS_ToF01_S1W04', 'Acquired Time'].tolist(), [datetime(2014, 11, 5, 13, 4, 48)])
+
+		with self.assertWarnsRegex(UserWarning, 'Unable to open '):
+			obtained = getSampleMetadataFromWatersRawFiles(self.rawPath, parallelise=True, workers=3)
+
+		assert_frame_equal(obtained, expected)
+
+
+	def test_extractParams_waters_cache(self):
+		from nPYc.utilities.extractParams import extractParams
+
+		cachePath = os.path.join(self.rawPath, 'cache.json')
+
+		with self.assertWarnsRegex(UserWarning, 'Unable to open '):
+			expected = extractParams(self.rawPath, 'Waters .raw')
+
+		with self.subTest(msg='Building cache'):
+			with self.assertWarnsRegex(UserWarning, 'Unable to open '):
+				obtained = extractParams(self.rawPath, 'Waters .raw', cachePath=cachePath)
+
+			self.assertTrue(os.path.exists(cachePath))
+			assert_frame_equal(obtained, expected)
+
+		with self.subTest(msg='Reading from cache'):
+			with self.assertWarnsRegex(UserWarning, 'Unable to open '):
+				obtained = extractParams(self.rawPath, 'Waters .raw', cachePath=cachePath)
+
+			assert_frame_equal(obtained, expected)
+
+		# Rewrite a file in place, keeping its size and modification time, cached values are used
+		path = os.path.join(self.rawPath, 'Batch0', 'Test_RPOS_ToF01_S1W00.raw', '_extern.inf')
+		stat = os.stat(path)
+		with open(path, 'w', encoding='latin-1', newline='') as f:
+			f.write('LM Resolution\t\t10.0\r\nResolution\t\t13000\r\nDetector\t\t4000\r\nBacking\t\t3.52e0\r\n')
+		os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+		with self.subTest(msg='Unchanged file'):
+			with self.assertWarnsRegex(UserWarning, 'Unable to open '):
+				obtained = extractParams(self.rawPath, 'Waters .raw', cachePath=cachePath)
+
+			self.assertEqual(obtained.loc[obtained['Sample File Name'] == 'Test_RPOS_ToF01_S1W00', 'Detector'].tolist(), [3000])
+
+		# Changing its size, the folder is read again
+		with open(path, 'w', encoding='latin-1', newline='') as f:
+			f.write('LM Resolution\t\t10.0\r\nResolution\t\t13000\r\nDetector\t\t40000\r\nBacking\t\t3.52e0\r\n')
+		os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+		with self.subTest(msg='Changed file'):
+			with self.assertWarnsRegex(UserWarning, 'Unable to open '):
+				obtained = extractParams(self.rawPath, 'Waters .raw', cachePath=cachePath)
+
+			self.assertEqual(obtained.loc[obtained['Sample File Name'] == 'Test_RPOS_ToF01_S1W00', 'Detector'].tolist(), [40000])
+
+
+	def test_extractParams_raises(self):
+		from nPYc.utilities.extractParams import extractParams
+
+		self.assertRaises(TypeError, extractParams, self.rawPath, 'Waters .raw', parallelise=True, workers=0)
+		self.assertRaises(TypeError, extractParams, self.rawPath, 'Waters .raw', parallelise=True, workers=1.5)
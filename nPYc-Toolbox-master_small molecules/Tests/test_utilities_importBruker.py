@@ -62,6 +62,31 @@ class test_utilities_importBruker(unittest.TestCase):
 			numpy.testing.assert_allclose(deltaPPM, expectedDeltaPPM)
 
 
+	def test_importBrukerSpectrum_synthetic(self):
+		from nPYc.utilities._importBrukerSpectrum import importBrukerSpectrum
+
+		noPoints = numpy.random.randint(1000, high=5000, size=None)
+		points = numpy.random.randint(-2**31, high=2**31 - 1, size=noPoints, dtype=numpy.int64).astype(numpy.int32)
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			path = os.path.join(tmpdirname, '1r')
+
+			for bytordp, machine_format in [(0, '<i4'), (1, '>i4')]:
+				for nc_proc in [-4, 0, 2]:
+					with self.subTest(bytordp=bytordp, nc_proc=nc_proc):
+						# A trailing partial point should be ignored
+						with open(path, 'wb') as fid:
+							fid.write(points.astype(machine_format).tobytes() + b'\x01\x02')
+
+						expected = numpy.fromfile(path, dtype=machine_format) * pow(2, nc_proc)
+
+						intensityData, ppm = importBrukerSpectrum(path, 10, 6000, nc_proc, 600, noPoints, bytordp)
+
+						numpy.testing.assert_array_equal(intensityData, expected)
+						self.assertEqual(intensityData.dtype, expected.dtype)
+						self.assertNotIsInstance(intensityData, numpy.memmap)
+
+
 	def test_importBrukerSpectrum_raises(self):
 		from nPYc.utilities._importBrukerSpectrum import importBrukerSpectrum
 
@@ -244,6 +269,44 @@ class test_utilities_importBruker(unittest.TestCase):
 		numpy.testing.assert_allclose(metadata.loc[0, 'ERETIC Integral'], expectedERETIC)
 
 
+	def test_importBrukerSpectra_parallel(self):
+		from nPYc.utilities._importBrukerSpectrum import importBrukerSpectra
+
+		Attributes = dict()
+		Attributes['variableSize'] = 5000
+		Attributes['bounds'] = [-0.5, 10]
+		Attributes['alignTo'] = 'singlet'
+		Attributes['calibrateTo'] = 0
+		Attributes['ppmSearchRange'] = [-0.3, 0.3]
+		Attributes['LWpeakRange'] = [-0.3, 0.3]
+		Attributes['LWpeakMultiplicity'] = 'singlet'
+		Attributes['LWpeakIntesityFraction'] = 1e-4
+
+		with tempfile.TemporaryDirectory() as tmpdirname:
+			_writeSyntheticBrukerExperiments(tmpdirname, 4)
+
+			with warnings.catch_warnings():
+				warnings.simplefilter("ignore")
+				serialData, serialPPM, serialMetadata = importBrukerSpectra(tmpdirname, 'noesygppr1d', 1, Attributes)
+
+			with self.assertWarnsRegex(UserWarning, 'Error parsing `QuantFactorSample`'):
+				parallelData, parallelPPM, parallelMetadata = importBrukerSpectra(tmpdirname, 'noesygppr1d', 1, Attributes, parallelise=True, workers=3)
+
+		numpy.testing.assert_array_equal(parallelData, serialData)
+		numpy.testing.assert_array_equal(parallelPPM, serialPPM)
+		assert_frame_equal(parallelMetadata, serialMetadata)
+
+		metadata = serialMetadata.set_index('Sample File Name')
+		self.assertEqual(metadata.loc['Synthetic/10', 'Warnings'], 'Error loading file')
+		self.assertEqual(metadata.loc['Synthetic/20', 'Warnings'], 'Error calculating ERETIC integral')
+		self.assertEqual(metadata.loc['Synthetic/30', 'Warnings'], '')
+		self.assertEqual(metadata.loc['Synthetic/30', 'ERETIC Concentration (mM)'], 10.0)
+		self.assertTrue(numpy.all(numpy.isfinite(metadata.loc['Synthetic/30', ['Delta PPM', 'ERETIC Integral', 'Line Width (Hz)']].values.astype(float))))
+		numpy.testing.assert_allclose(serialData[metadata.index.get_loc('Synthetic/10'), :], 0)
+
+		self.assertRaises(TypeError, importBrukerSpectra, '.', 'noesygppr1d', 1, Attributes, parallelise=True, workers=0)
+
+
 	def test_parseQuantFactorSample(self):
 		from nPYc.utilities._importBrukerSpectrum import parseQuantFactorSample
 
@@ -266,3 +329,58 @@ class test_utilities_importBruker(unittest.TestCase):
 			obtained = parseQuantFactorSample(path)
 
 			self.assertEqual(obtained, (15.0, 0.75, 10.0))
+
+
+def _writeSyntheticBrukerExperiments(path, noExperiments):
+	"""
+	Write *noExperiments* expnos of 1D Bruker data, each a 16k point spectrum of two Lorentzian singlets and an ERETIC signal at 12 ppm, under *path*/Synthetic.
+
+	Expno 10 has an empty *1r* file, and expno 20 a malformed *QuantFactorSample.xml*.
+	"""
+	noPoints = 16384
+	sf = 600.0
+	offset = 14.0
+	swp = 16.0 * sf
+	localPPM = numpy.arange(offset, offset - swp / sf, -swp / sf / noPoints)[:noPoints]
+
+	for i in range(noExperiments):
+		expno = str((i + 1) * 10)
+		pdataPath = os.path.join(path, 'Synthetic', expno, 'pdata', '1')
+		os.makedirs(pdataPath)
+
+		with open(os.path.join(path, 'Synthetic', expno, 'acqus'), 'w') as fid:
+			fid.write('##TITLE= Parameter file\n'
+					  '##OWNER= nmr\n'
+					  '$$ 2016-01-19 %02i:00:00.000 +0000  nmr@computer\n'
+					  '##$PULPROG= <noesygppr1d>\n'
+					  '##$RG= 90.5\n##$SW= 20.0\n##$SFO1= 600.0\n##$TD= 65536\n##$PROBHD= <5 mm probe>\n'
+					  '##$BF1= 600.0\n##$O1= 2820.0\n##$P= (0..63)\n1 10 12\n##$AUNM= <au_zg>\n##$NS= 32\n'
+					  '##END=\n' % (i))
+
+		with open(os.path.join(pdataPath, 'procs'), 'w') as fid:
+			fid.write('##TITLE= Parameter file\n'
+					  '##$OFFSET= %f\n##$SW_p= %f\n##$NC_proc= -2\n##$SF= %f\n##$SI= %i\n##$BYTORDP= %i\n##$XDIM= 0\n'
+					  '##END=\n' % (offset, swp, sf, noPoints, i % 2))
+
+		shift = numpy.random.uniform(-0.05, 0.05)
+		hwhm = numpy.random.uniform(0.5, 1.5) / sf
+		spectrum = numpy.zeros(noPoints)
+		for position, height in [(shift, 1e6), (3.0 + shift, 4e5), (12.0 + shift, 2e5)]:
+			spectrum += height * hwhm**2 / ((localPPM - position)**2 + hwhm**2)
+		spectrum += numpy.random.normal(scale=10, size=noPoints)
+
+		if expno == '10':
+			open(os.path.join(pdataPath, '1r'), 'wb').close()
+		else:
+			spectrum.astype('<i4' if i % 2 == 0 else '>i4').tofile(os.path.join(pdataPath, '1r'))
+
+		if expno == '20':
+			with open(os.path.join(path, 'Synthetic', expno, 'QuantFactorSample.xml'), 'w') as fid:
+				fid.write('<Quant><Eretic_Methods></Eretic_Methods></Quant>')
+		else:
+			with open(os.path.join(path, 'Synthetic', expno, 'QuantFactorSample.xml'), 'w') as fid:
+				fid.write('<Quant><Eretic_Methods><Eretic>'
+						  '<Artificial_Eretic_Position>12.0</Artificial_Eretic_Position>'
+						  '<Artificial_Eretic_Line_Width>1.0</Artificial_Eretic_Line_Width>'
+						  '<Artificial_Eretic_Concentration>10.0</Artificial_Eretic_Concentration>'
+						  '</Eretic></Eretic_Methods></Quant>')
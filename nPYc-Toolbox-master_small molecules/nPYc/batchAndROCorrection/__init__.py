@@ -1,5 +1,5 @@
 """
 """
-from ._batchAndROCorrection import correctMSdataset
+from ._batchAndROCorrection import correctMSdataset, BatchCorrectionCache
 
-__all__ = ['correctMSdataset']
+__all__ = ['correctMSdataset', 'BatchCorrectionCache']
@@ -3,6 +3,7 @@
 
 import types
 import numpy
+from hashlib import sha1
 import scipy
 import warnings
 from scipy.signal import savgol_filter
@@ -13,12 +14,14 @@ from scipy.signal import savgol_filter
 import time
 import sys
 import copy
+import functools
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from ..objects._msDataset import MSDataset
 from ..enumerations import AssayRole, SampleType
 
 
-def correctMSdataset(data, window=11, method='LOWESS', align='median', parallelise=True, excludeFailures=True):
+def correctMSdataset(data, window=11, method='LOWESS', align='median', parallelise=True, excludeFailures=True, sharedMemory=False, workers=None, chunkSize=None, pool=None, cache=None):
 	"""
 	Conduct run-order correction and batch alignment on the :py:class:`~nPYc.objects.MSDataset` instance *data*, returning a new instance with corrected intensity values.
 
@@ -27,14 +30,22 @@ def correctMSdataset(data, window=11, method='LOWESS', align='median', paralleli
 	:param data: MSDataset object with measurements to be corrected
 	:type data: MSDataset
 	:param int window: When calculating trends, consider this many reference samples, centred on the current position
-	:param str method: Correction method, one of 'LOWESS' (default), 'SavitzkyGolay' or None for no correction
+	:param str method: Correction method, one of 'LOWESS' (default), 'LOWESS-batched', 'SavitzkyGolay' or None for no correction. 'LOWESS-batched' fits all features in a correction batch together, sharing neighbourhood weights calculated once from the reference sample run-order
 	:param str align: Average calculation of batch and feature intensity for correction, one of 'median' (default) or 'mean'
 	:param bool parallelise: If ``True``, use multiple cores
 	:param bool excludeFailures: If ``True``, remove features where a correct fit could not be calculated from the dataset
+	:param bool sharedMemory: If ``True`` (and *parallelise* is ``True``), hold the intensity matrix and results in shared memory, so that workers read features and write corrected values in place rather than being sent a pickled copy of the whole dataset
+	:param workers: Number of worker processes to use when *parallelise* is ``True``, if ``None`` use one less than the number of CPU cores
+	:type workers: None or int
+	:param chunkSize: When *sharedMemory* is ``True``, number of features passed to a worker at a time, if ``None`` split features evenly between workers
+	:type chunkSize: None or int
+	:param pool: Existing :py:class:`multiprocessing.pool.Pool` to run correction in, the pool is left open so that it may be reused across calls
+	:type pool: None or multiprocessing.pool.Pool
+	:param cache: If provided, correct incrementally, reusing the fits for any *'Correction Batch'* whose contents and parameters are unchanged since an earlier call with the same cache, and only fitting new or modified batches
+	:type cache: None or BatchCorrectionCache
 	:return: Duplicate of *data*, with run-order correction applied
 	:rtype: MSDataset
 	"""
-	import copy
 
 	# Check inputs
 	if not isinstance(data, MSDataset):
@@ -42,28 +53,48 @@ def correctMSdataset(data, window=11, method='LOWESS', align='median', paralleli
 	if not isinstance(window, int) & (window>0):
 		raise TypeError('window must be a positive integer')
 	if method is not None:
-		if not isinstance(method, str) & (method in {'LOWESS', 'SavitzkyGolay'}):
-			raise ValueError('method must be == LOWESS or SavitzkyGolay')
+		if not isinstance(method, str) & (method in {'LOWESS', 'LOWESS-batched', 'SavitzkyGolay'}):
+			raise ValueError('method must be == LOWESS, LOWESS-batched or SavitzkyGolay')
 	if not isinstance(align, str) & (align in {'mean', 'median'}):
 		raise ValueError('align must be == mean or median')
 	if not isinstance(parallelise, bool):
 		raise TypeError("parallelise must be a boolean")
 	if not isinstance(excludeFailures, bool):
 		raise TypeError("excludeFailures must be a boolean")
+	if not isinstance(sharedMemory, bool):
+		raise TypeError("sharedMemory must be a boolean")
+	if workers is not None:
+		if not (isinstance(workers, int) and (workers > 0)):
+			raise TypeError('workers must be a positive integer')
+	if chunkSize is not None:
+		if not (isinstance(chunkSize, int) and (chunkSize > 0)):
+			raise TypeError('chunkSize must be a positive integer')
+	if cache is not None:
+		if not isinstance(cache, BatchCorrectionCache):
+			raise TypeError('cache must be a BatchCorrectionCache instance')
+
+	if cache is None:
+		correctionFunction = _batchCorrectionHead
+	else:
+		correctionFunction = functools.partial(_incrementalBatchCorrection, cache=cache)
 
 	with warnings.catch_warnings():
 		warnings.simplefilter('ignore', category=RuntimeWarning)
 
-		correctedP = _batchCorrectionHead(data.intensityData,
+		correctedP = correctionFunction(data.intensityData,
 									 data.sampleMetadata['Run Order'].values,
-									 (data.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (data.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference),
+									 data.roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference],
 									 data.sampleMetadata['Correction Batch'].values,
 									 window=window,
 									 method=method,
 									 align=align,
-									 parallelise=parallelise)
+									 parallelise=parallelise,
+									 sharedMemory=sharedMemory,
+									 workers=workers,
+									 chunkSize=chunkSize,
+									 pool=pool)
 
-	correctedData = copy.deepcopy(data)
+	correctedData = data.clone()
 	correctedData.intensityData = correctedP[0]
 	correctedData.fit = correctedP[1]
 	correctedData.Attributes['Log'].append([datetime.now(),'Batch and run order correction applied'])
@@ -71,7 +102,7 @@ def correctMSdataset(data, window=11, method='LOWESS', align='median', paralleli
 	return correctedData
 
 
-def _batchCorrectionHead(data, runOrder, referenceSamples, batchList, window=11, method='LOWESS', align='median', parallelise=True, savePlots=False):
+def _batchCorrectionHead(data, runOrder, referenceSamples, batchList, window=11, method='LOWESS', align='median', parallelise=True, savePlots=False, sharedMemory=False, workers=None, chunkSize=None, pool=None):
 	"""
 	Conduct run-order correction and batch alignment.
 
@@ -84,8 +115,18 @@ def _batchCorrectionHead(data, runOrder, referenceSamples, batchList, window=11,
 	:param batchList: *n* item list of correction batch, defines sample groupings into discrete batches for correction
 	:type batchList: numpy.series
 	:param int window: When calculating trends, use a consider this many reference samples, centred on the current position
-	:param str method: Correction method, one of 'LOWESS' (default), 'SavitzkyGolay' or None for no correction
+	:param str method: Correction method, one of 'LOWESS' (default), 'LOWESS-batched', 'SavitzkyGolay' or None for no correction
 	:param str align: Average calculation of batch and feature intensity for correction, one of 'median' (default) or 'mean'
+	:param bool parallelise: If ``True``, use multiple cores
+	:param bool sharedMemory: If ``True`` (and *parallelise* is ``True``), workers read from and write to shared memory blocks instead of pickling *data* and the results
+	:param workers: Number of worker processes, if ``None`` use one less than the number of CPU cores
+	:type workers: None or int
+	:param chunkSize: Number of features passed to a worker at a time in shared memory mode, if ``None`` split features evenly between workers
+	:type chunkSize: None or int
+	:param pool: Existing pool to run in, left open on return
+	:type pool: None or multiprocessing.pool.Pool
+	:return: Tuple of corrected data and fits
+	:rtype: tuple(numpy.array, numpy.array)
 	"""
 	# Validate inputs
 	if not isinstance(data, numpy.ndarray):
@@ -99,14 +140,22 @@ def _batchCorrectionHead(data, runOrder, referenceSamples, batchList, window=11,
 	if not isinstance(window, int) & (window>0):
 		raise TypeError('window must be a positive integer')
 	if method is not None:
-		if not isinstance(method, str) & (method in {'LOWESS', 'SavitzkyGolay'}):
-			raise ValueError('method must be == LOWESS or SavitzkyGolay')	
+		if not isinstance(method, str) & (method in {'LOWESS', 'LOWESS-batched', 'SavitzkyGolay'}):
+			raise ValueError('method must be == LOWESS, LOWESS-batched or SavitzkyGolay')	
 	if not isinstance(align, str) & (align in {'mean', 'median'}):
 			raise ValueError('align must be == mean or median')
 	if not isinstance(parallelise, bool):
 		raise TypeError('parallelise must be True or False')
 	if not isinstance(savePlots, bool):
 		raise TypeError('savePlots must be True or False')
+	if not isinstance(sharedMemory, bool):
+		raise TypeError('sharedMemory must be True or False')
+	if workers is not None:
+		if not (isinstance(workers, int) and (workers > 0)):
+			raise TypeError('workers must be a positive integer')
+	if chunkSize is not None:
+		if not (isinstance(chunkSize, int) and (chunkSize > 0)):
+			raise TypeError('chunkSize must be a positive integer')
 
 	# Store paramaters in a dict to avoid arg lists going out of control
 	parameters = dict()
@@ -119,35 +168,48 @@ def _batchCorrectionHead(data, runOrder, referenceSamples, batchList, window=11,
 		import multiprocessing
 		
 		# Generate an index and set up pool
-		# Use one less workers than CPU cores
-		if multiprocessing.cpu_count()-1 <= 0:
-			cores = 1
-		else: 
-			cores = multiprocessing.cpu_count()-1
-
-		pool = multiprocessing.Pool(processes=cores)
-
-		instances = range(0, cores)
-
-		# Break features into no cores chunks
-		featureIndex = _chunkMatrix(range(0, data.shape[1]), cores)
+		cores = _poolSize(workers)
 
-		# run _batchCorection
-		##
-		# At present pickle args and returns and reassemble  after - possiblly share memory in the future.
-		##
-		results2 = [pool.apply_async(_batchCorrection, args=(data, runOrder, referenceSamples, batchList, featureIndex, parameters, w)) for w in instances]
-
-		results2 = [p.get(None) for p in results2]
-
-		results = list()
-		# Unpack results
-		for instanceOutput in results2:
-			for item in instanceOutput:
-				results.append(item)
+		if pool is None:
+			runPool = multiprocessing.Pool(processes=cores)
+		else:
+			runPool = pool
 
-		# Shut down the pool
-		pool.close()
+		try:
+			if sharedMemory:
+				# Workers attach to the data and write results in place
+				return _sharedMemoryBatchCorrection(runPool,
+													data,
+													runOrder,
+													referenceSamples,
+													batchList,
+													parameters,
+													cores,
+													chunkSize=chunkSize)
+
+			instances = range(0, cores)
+
+			# Break features into no cores chunks
+			featureIndex = _chunkMatrix(range(0, data.shape[1]), cores)
+
+			# run _batchCorection
+			##
+			# Pickle args and returns and reassemble after - see _sharedMemoryBatchCorrection for the shared memory path.
+			##
+			results2 = [runPool.apply_async(_batchCorrection, args=(data, runOrder, referenceSamples, batchList, featureIndex, parameters, w)) for w in instances]
+
+			results2 = [p.get(None) for p in results2]
+
+			results = list()
+			# Unpack results
+			for instanceOutput in results2:
+				for item in instanceOutput:
+					results.append(item)
+
+		finally:
+			# Shut down the pool, unless it belongs to the caller
+			if pool is None:
+				runPool.close()
 
 
 	else:
@@ -172,6 +234,187 @@ def _batchCorrectionHead(data, runOrder, referenceSamples, batchList, window=11,
 	return (correctedData, fits)
 
 
+def _poolSize(workers):
+	"""
+	Number of worker processes to start, one less than the number of CPU cores, unless told otherwise.
+	"""
+	import multiprocessing
+
+	if workers is not None:
+		return workers
+	elif multiprocessing.cpu_count()-1 <= 0:
+		return 1
+	else:
+		return multiprocessing.cpu_count()-1
+
+
+class BatchCorrectionCache(object):
+	"""
+	Holds per-batch run-order correction results between calls to :py:func:`correctMSdataset`, so that when batches are appended to a study only the new or changed batches need to be fitted.
+
+	Entries are keyed on the intensities, run-order and reference samples of each *'Correction Batch'*, and the correction parameters. A cache may be pickled to reuse it across sessions::
+
+		cache = nPYc.batchAndROCorrection.BatchCorrectionCache()
+		datasetCorrected = nPYc.batchAndROCorrection.correctMSdataset(dataset, cache=cache)
+
+	:py:attr:`hits` and :py:attr:`misses` count the batches reused from, and fitted and added to, the cache.
+
+	By default the cache only holds the batches of the dataset most recently corrected, entries not used in a call are discarded at its end. To share one cache between several datasets, set *maxEntries*, and the least recently used entries beyond that number are discarded instead.
+
+	:param maxEntries: Number of batches to hold, if ``None`` hold only those used in the last call
+	:type maxEntries: None or int
+	:raises TypeError: if *maxEntries* is not ``None`` or a positive integer
+	"""
+
+	def __init__(self, maxEntries=None):
+
+		if maxEntries is not None:
+			if not (isinstance(maxEntries, int) and (maxEntries > 0)):
+				raise TypeError('maxEntries must be a positive integer')
+
+		self.maxEntries = maxEntries
+		self._entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+
+	def __len__(self):
+		return len(self._entries)
+
+
+	def clear(self):
+		"""
+		Discard all cached batches.
+		"""
+		self._entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+
+	def _prune(self, usedKeys):
+		"""
+		Discard entries not in *usedKeys*, or if :py:attr:`maxEntries` is set, the least recently used entries beyond it.
+		"""
+		if self.maxEntries is None:
+			for key in [key for key in self._entries if key not in usedKeys]:
+				del self._entries[key]
+		else:
+			while len(self._entries) > self.maxEntries:
+				self._entries.popitem(last=False)
+
+
+	@staticmethod
+	def _key(data, runOrder, referenceSamples, parameters):
+		"""
+		Digest of the contents of one batch and the correction *parameters*.
+		"""
+		hash = sha1(str(data.shape).encode())
+		hash.update(numpy.ascontiguousarray(data))
+		hash.update(numpy.ascontiguousarray(runOrder))
+		hash.update(numpy.ascontiguousarray(referenceSamples))
+		hash.update(repr(sorted(parameters.items())).encode())
+
+		return hash.hexdigest()
+
+
+def _incrementalBatchCorrection(data, runOrder, referenceSamples, batchList, cache, window=11, method='LOWESS', align='median', parallelise=True, workers=None, pool=None, **kwargs):
+	"""
+	Conduct run-order correction and batch alignment, reusing batches already held in *cache*.
+
+	Each batch is corrected on its own, and aligned to its own reference average, with :py:func:`_batchCorrectionHead`, only batches missing from *cache* are fitted. All batches are then realigned to the overall feature average.
+
+	When *parallelise* is ``True``, a single pool is started the first time a batch must be fitted, unless *pool* is provided, and is shared by all batches fitted in the call.
+
+	Additional keyword arguments are passed to :py:func:`_batchCorrectionHead`.
+
+	:param BatchCorrectionCache cache: Per-batch results from previous calls
+	:param bool parallelise: If ``True``, fit batches using multiple cores
+	:param workers: Number of worker processes, if ``None`` use one less than the number of CPU cores
+	:type workers: None or int
+	:param pool: Existing pool to run in, left open on return
+	:type pool: None or multiprocessing.pool.Pool
+	:return: Tuple of corrected data and fits
+	:rtype: tuple(numpy.array, numpy.array)
+	"""
+	parameters = dict()
+	parameters['window'] = window
+	parameters['method'] = method
+	parameters['align'] = align
+
+	# Samples outside of a correction batch are returned as is
+	correctedData = numpy.array(data, copy=True)
+	fits = numpy.empty_like(data)
+	fits.fill(numpy.nan)
+
+	# Get overall average intensity
+	if align == 'mean':
+		featureAverage = numpy.mean(data[referenceSamples, :], axis=0)
+	else:
+		featureAverage = numpy.median(data[referenceSamples, :], axis=0)
+
+	runPool = pool
+	usedKeys = set()
+	try:
+		# Iterate over batches.
+		for batch in list(set(batchList)):
+			# Skip the NaN batch
+			if numpy.isnan(batch):
+				continue
+
+			batchMask = numpy.squeeze(numpy.asarray(batchList == batch, 'bool'))
+
+			key = BatchCorrectionCache._key(data[batchMask, :], runOrder[batchMask], referenceSamples[batchMask], parameters)
+			usedKeys.add(key)
+
+			if key in cache._entries:
+				cache._entries.move_to_end(key)
+				cache.hits += 1
+
+			else:
+				batchData = data[batchMask, :]
+				batchReferences = referenceSamples[batchMask]
+
+				if parallelise and (runPool is None):
+					import multiprocessing
+					runPool = multiprocessing.Pool(processes=_poolSize(workers))
+
+				(batchCorrected, batchFits) = _batchCorrectionHead(batchData,
+																   runOrder[batchMask],
+																   batchReferences,
+																   batchList[batchMask],
+																   window=window,
+																   method=method,
+																   align=align,
+																   parallelise=parallelise,
+																   workers=workers,
+																   pool=runPool,
+																   **kwargs)
+
+				# Average the batch was aligned to
+				if align == 'mean':
+					batchAverage = numpy.mean(batchData[batchReferences, :], axis=0)
+				else:
+					batchAverage = numpy.median(batchData[batchReferences, :], axis=0)
+
+				cache._entries[key] = (batchCorrected, batchFits, batchAverage)
+				cache.misses += 1
+
+			(batchCorrected, batchFits, batchAverage) = cache._entries[key]
+
+			# Realign from the batch average to the overall feature average
+			correctedData[batchMask, :] = numpy.multiply(batchCorrected, numpy.divide(featureAverage, batchAverage))
+			fits[batchMask, :] = batchFits
+
+	finally:
+		# Shut down the pool, unless it belongs to the caller
+		if (pool is None) and (runPool is not None):
+			runPool.close()
+
+	cache._prune(usedKeys)
+
+	return (correctedData, fits)
+
+
 def _batchCorrection(data, runOrder, QCsamples, batchList, featureIndex, parameters, w):
 	"""
 	Break the dataset into batches to be corrected together.
@@ -183,6 +426,10 @@ def _batchCorrection(data, runOrder, QCsamples, batchList, featureIndex, paramet
 	else:
 		featureList = range(0, len(featureIndex))
 
+	# Batched fitting works on all features in featureList at once
+	if parameters['method'] == 'LOWESS-batched':
+		return _batchCorrectionBatched(data, runOrder, QCsamples, batchList, featureList, parameters)
+
 	# add results to this list:
 	results = list()
 	
@@ -246,6 +493,118 @@ def _batchCorrection(data, runOrder, QCsamples, batchList, featureIndex, paramet
 	return results
 
 
+def _sharedMemoryBatchCorrection(pool, data, runOrder, referenceSamples, batchList, parameters, cores, chunkSize=None):
+	"""
+	Run :py:func:`_batchCorrection` in *pool*, with *data*, the corrected values and fits held in shared memory blocks.
+
+	Features are dispatched in chunks of *chunkSize* columns, and workers write their output straight into the shared result arrays.
+	"""
+	from multiprocessing import shared_memory
+
+	noFeatures = data.shape[1]
+	if chunkSize is None:
+		chunkSize = max(1, int(numpy.ceil(noFeatures / float(cores))))
+
+	# Input, corrected values, fits
+	blocks = [shared_memory.SharedMemory(create=True, size=max(1, data.nbytes)) for i in range(3)]
+	views = None
+	try:
+		views = [numpy.ndarray(data.shape, dtype=data.dtype, buffer=block.buf) for block in blocks]
+		views[0][:] = data
+
+		names = [block.name for block in blocks]
+		chunks = [range(i, min(i + chunkSize, noFeatures)) for i in range(0, noFeatures, chunkSize)]
+
+		jobs = [pool.apply_async(_batchCorrectionShared, args=(names, data.shape, data.dtype, runOrder, referenceSamples, batchList, chunk, parameters)) for chunk in chunks]
+
+		for job in jobs:
+			job.get(None)
+
+		correctedData = views[1].copy()
+		fits = views[2].copy()
+
+	finally:
+		# Views must be released before the blocks can be closed
+		views = None
+		for block in blocks:
+			block.close()
+			block.unlink()
+
+	return (correctedData, fits)
+
+
+def _batchCorrectionShared(names, shape, dtype, runOrder, QCsamples, batchList, featureList, parameters):
+	"""
+	Shared memory worker, correct the features in *featureList* and write corrected values and fits into the blocks named in *names*.
+	"""
+	from multiprocessing import shared_memory
+
+	blocks = [shared_memory.SharedMemory(name=name) for name in names]
+	views = None
+	try:
+		views = [numpy.ndarray(shape, dtype=dtype, buffer=block.buf) for block in blocks]
+
+		results = _batchCorrection(views[0], runOrder, QCsamples, batchList, [featureList], parameters, 0)
+
+		for (w, feature, fit) in results:
+			views[1][:, w] = feature
+			views[2][:, w] = fit
+
+	finally:
+		views = None
+		for block in blocks:
+			block.close()
+
+	return len(featureList)
+
+
+def _batchCorrectionBatched(data, runOrder, QCsamples, batchList, featureList, parameters):
+	"""
+	As :py:func:`_batchCorrection`, but correct every feature in *featureList* together, one batch at a time, with :py:func:`doLOESScorrectionBatched`.
+	"""
+	featureList = list(featureList)
+
+	if data.ndim == 1:
+		features = numpy.array(data, copy=True)[:, numpy.newaxis]
+	else:
+		features = data[:, featureList].copy()
+	fits = numpy.empty_like(features)
+	fits.fill(numpy.nan)
+
+	# Get overall average intensity
+	if parameters['align'] == 'mean':
+		featureAverage = numpy.mean(features[QCsamples, :], axis=0)
+	else:
+		featureAverage = numpy.median(features[QCsamples, :], axis=0)
+
+	# Iterate over batches.
+	for batch in list(set(batchList)):
+		# Skip the NaN batch
+		if not numpy.isnan(batch):
+
+			batchMask = numpy.squeeze(numpy.asarray(batchList == batch, 'bool'))
+
+			batchData = features[batchMask, :]
+			batchRunOrder = runOrder[batchMask]
+			batchQC = QCsamples[batchMask]
+
+			(features[batchMask, :], fits[batchMask, :]) = doLOESScorrectionBatched(batchData[batchQC, :],
+																				   batchRunOrder[batchQC],
+																				   batchData,
+																				   batchRunOrder,
+																				   window=parameters['window'])
+
+			# Correct batch average to overall feature average
+			if parameters['align'] == 'mean':
+				batchMean = numpy.mean(features[batchMask & QCsamples, :], axis=0)
+			else:
+				batchMean = numpy.median(features[batchMask & QCsamples, :], axis=0)
+
+			features[batchMask, :] = numpy.multiply(numpy.divide(features[batchMask, :], batchMean), featureAverage)
+
+	return [(i, features[:, j], fits[:, j]) for (j, i) in enumerate(featureList)]
+
+
 def runOrderCompensation(data, runOrder, referenceSamples, parameters):
 	"""
 	Model and remove longitudinal effects.
@@ -306,6 +665,177 @@ def doLOESScorrection(QCdata, QCrunorder, data, runorder, window=11):
 	return (corrected, fit)
 
 
+def doLOESScorrectionBatched(QCdata, QCrunorder, data, runorder, window=11, iterations=3):
+	"""
+	Fit LOWESS regressions to every column of *QCdata* at once.
+
+	Equivalent to calling :py:func:`doLOESScorrection` on each column, but as the reference samples share a run-order, the tricube neighbourhood weights are calculated once and the local regressions for all features solved together. Columns with missing reference values have their own neighbourhoods and are fitted one at a time.
+
+	:param QCdata: *q* × *m* array of reference sample measurements
+	:param QCrunorder: *q* item run-order of the reference samples
+	:param data: *n* × *m* array of measurements to correct
+	:param runorder: *n* item run-order of *data*
+	:param int window: Number of reference samples in each neighbourhood
+	:param int iterations: Number of robustifying iterations
+	:return: Tuple of corrected data and fits
+	:rtype: tuple(numpy.array, numpy.array)
+	"""
+	noSamples = QCrunorder.shape[0]
+
+	if noSamples == 0:
+
+		fit = numpy.zeros(shape=data.shape)
+		corrected = data
+
+	else:
+		frac = window / float(noSamples)
+		frac = min([1, frac])
+
+		fit = numpy.empty(data.shape)
+
+		finite = numpy.all(numpy.isfinite(QCdata), axis=0) & numpy.all(numpy.isfinite(QCrunorder))
+
+		for feature in numpy.where(~finite)[0]:
+			(_, fit[:, feature]) = doLOESScorrection(QCdata[:, feature], QCrunorder, data[:, feature], runorder, window=window)
+
+		if numpy.any(finite):
+			sortedRO = numpy.argsort(QCrunorder)
+			QCrunorderSorted = QCrunorder[sortedRO].astype(float)
+
+			z = _lowessBatched(QCdata[sortedRO, :][:, finite], QCrunorderSorted, frac=frac, iterations=iterations)
+
+			fit[:, finite] = _interpBatched(runorder, QCrunorderSorted, z)
+
+		# Fit can go negative if too many adjacent QC samples == 0; set any negative fit values to zero
+		fit[fit < 0] = 0
+
+		corrected = numpy.divide(data, fit)
+		corrected = numpy.multiply(corrected, numpy.median(QCdata, axis=0))
+
+	return (corrected, fit)
+
+
+def _lowessBatched(Y, x, frac=2./3., iterations=3):
+	"""
+	Robust LOWESS smoothing of each column of *Y* against the sorted values in *x*, following the algorithm of :py:func:`statsmodels.nonparametric.lowess`.
+	"""
+	noPoints = x.shape[0]
+
+	k = int(frac * noPoints + 1e-10)
+	k = min(max(k, 2), noPoints)
+
+	# Tricube weights of the k-nearest neighbours of each point, shared by all columns, held as a band of k weights per point starting at leftEnds
+	weights = numpy.zeros((noPoints, k))
+	leftEnds = numpy.zeros(noPoints, dtype=int)
+	leftEnd = 0
+	rightEnd = k
+	with numpy.errstate(divide='ignore', invalid='ignore'):
+		for i in range(noPoints):
+			while (rightEnd < noPoints) and (x[i] > (x[leftEnd] + x[rightEnd]) / 2.0):
+				leftEnd += 1
+				rightEnd += 1
+			radius = max(x[i] - x[leftEnd], x[rightEnd-1] - x[i])
+			weights[i, :] = (1.0 - (numpy.abs(x[leftEnd:rightEnd] - x[i]) / radius) ** 3) ** 3
+			leftEnds[i] = leftEnd
+	neighbours = leftEnds[:, numpy.newaxis] + numpy.arange(k)[numpy.newaxis, :]
+
+	# Distances relative to each fitted point, keeps the weighted moments well conditioned
+	distance = x[neighbours] - x[:, numpy.newaxis]
+	weightsD = weights * distance
+	weightsD2 = weightsD * distance
+	nonZero = (weights > 0).astype(float)
+
+	# Columns are independent, work through blocks small enough to stay in cache
+	blockSize = max(1, 32768 // noPoints)
+	fitted = numpy.empty(Y.shape)
+	for start in range(0, Y.shape[1], blockSize):
+		block = slice(start, start + blockSize)
+		fitted[:, block] = _lowessBlock(numpy.ascontiguousarray(Y[:, block]), weights, weightsD, weightsD2, nonZero, neighbours, iterations)
+
+	return fitted
+
+
+def _lowessBlock(Y, weights, weightsD, weightsD2, nonZero, neighbours, iterations):
+	"""
+	Robustified local regressions of the columns of *Y* for :py:func:`_lowessBatched`, given the banded neighbourhood weights.
+	"""
+	residualWeights = numpy.ones_like(Y)
+	for iteration in range(iterations + 1):
+
+		weightedY = residualWeights * Y
+
+		(sumWeights, sumWeightsD, sumWeightsD2, sumWeightedY, sumWeightedXY, noNonZero) = _bandedSums(weights, weightsD, weightsD2, nonZero, neighbours, residualWeights, weightedY)
+
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			mean = sumWeightsD / sumWeights
+			variance = numpy.maximum(sumWeightsD2 / sumWeights - mean ** 2, 1e-12)
+			weightedMeanY = sumWeightedY / sumWeights
+			weightedMeanXY = sumWeightedXY / sumWeights
+
+			fitted = weightedMeanY - mean * (weightedMeanXY - mean * weightedMeanY) / variance
+
+		# Too few points with weight to regress on, take the observed value
+		regressionOK = noNonZero >= 2
+		fitted = numpy.where(regressionOK, fitted, Y)
+
+		if iteration < iterations:
+			residuals = numpy.abs(Y - fitted)
+			medianResidual = numpy.median(residuals, axis=0)
+
+			with numpy.errstate(divide='ignore', invalid='ignore'):
+				scaled = numpy.where(medianResidual == 0, (residuals > 0).astype(float), residuals / (6.0 * medianResidual))
+			scaled = numpy.minimum(scaled, 1.0)
+
+			residualWeights = (1.0 - scaled ** 2) ** 2
+
+	return fitted
+
+
+def _bandedSums(weights, weightsD, weightsD2, nonZero, neighbours, residualWeights, weightedY):
+	"""
+	Weighted sums over the neighbourhood of each point for :py:func:`_lowessBatched`, the products of the banded weight matrices, with columns at positions *neighbours*, and *residualWeights* or *weightedY*.
+
+	Summed one band offset at a time with elementwise operations rather than matrix products, so that each column of the result is exact to the same bit whatever the other columns, and does not depend on how features are chunked between workers.
+	"""
+	sums = [numpy.zeros(residualWeights.shape) for i in range(6)]
+
+	for offset in range(weights.shape[1]):
+		rows = neighbours[:, offset]
+		residualWeightsN = residualWeights[rows, :]
+		weightedYN = weightedY[rows, :]
+		weightsN = weights[:, offset, numpy.newaxis]
+		weightsDN = weightsD[:, offset, numpy.newaxis]
+
+		sums[0] += weightsN * residualWeightsN
+		sums[1] += weightsDN * residualWeightsN
+		sums[2] += weightsD2[:, offset, numpy.newaxis] * residualWeightsN
+		sums[3] += weightsN * weightedYN
+		sums[4] += weightsDN * weightedYN
+		sums[5] += nonZero[:, offset, numpy.newaxis] * (residualWeightsN > 0)
+
+	return sums
+
+
+def _interpBatched(x, xp, fp):
+	"""
+	:py:func:`numpy.interp` of each column of *fp*, sharing the bracketing indices between columns.
+	"""
+	x = numpy.asarray(x, dtype=float)
+
+	if xp.shape[0] == 1:
+		return numpy.repeat(fp, x.shape[0], axis=0)
+
+	index = numpy.clip(numpy.searchsorted(xp, x, side='right') - 1, 0, xp.shape[0] - 2)
+
+	slope = (fp[index + 1, :] - fp[index, :]) / (xp[index + 1] - xp[index])[:, numpy.newaxis]
+	out = slope * (x - xp[index])[:, numpy.newaxis] + fp[index, :]
+
+	out[x <= xp[0], :] = fp[0, :]
+	out[x >= xp[-1], :] = fp[-1, :]
+
+	return out
+
+
 def doSavitzkyGolayCorrection(QCdata, QCrunorder, data, runorder, window=11, polyOrder=3):
 	"""
 	Fit a Savitzky-Golay curve to the data.
@@ -2,7 +2,6 @@ from pyChemometrics.ChemometricsPCA import ChemometricsPCA
 from pyChemometrics.ChemometricsScaler import ChemometricsScaler
 
 from nPYc.objects._dataset import Dataset
-import copy
 
 
 def exploratoryAnalysisPCA(npycDataset, scaling=1, maxComponents=10, minQ2=0.05, withExclusions=False, **kwargs):
@@ -41,7 +40,7 @@ def exploratoryAnalysisPCA(npycDataset, scaling=1, maxComponents=10, minQ2=0.05,
 
         # Parse the dara for the cases with exclusion = True and False
         if withExclusions:
-            npycDatasetmaskApplied = copy.deepcopy(npycDataset)
+            npycDatasetmaskApplied = npycDataset.clone()
             npycDatasetmaskApplied.applyMasks()
             data = npycDatasetmaskApplied.intensityData			
 
@@ -14,6 +14,10 @@ import copy
 from ..utilities import removeDuplicateColumns
 from ..utilities import normalisation
 from ..utilities.normalisation._normaliserABC import Normaliser
+from ..utilities._exclusionLedger import ExclusionLedger
+from ..utilities._featureIndex import FeatureIndex, asSlice
+from ..utilities._roleMasks import RoleMasks
+from ..utilities.ms import groupStatistics
 import warnings
 
 
@@ -38,6 +42,12 @@ class Dataset:
 		from .. import __version__
 
 		self._intensityData = numpy.array(None)
+		self._intensityDataVersion = 0
+		self._normalisedIntensityData = None
+		self._normalisationCacheInfo = {'hits': 0, 'misses': 0}
+		self._featureIndex = None
+		self._roleMasks = None
+		self._roleStatisticsCache = None
 
 		self.featureMetadata = pandas.DataFrame(None, columns=['Feature Name'])
 		"""
@@ -55,28 +65,6 @@ class Dataset:
 											   columns=['Sample ID', 'AssayRole', 'SampleType', 'Sample File Name',
 														'Sample Base Name', 'Dilution', 'Batch', 'Correction Batch',
 														'Acquired Time', 'Run Order', 'Exclusion Details', 'Metadata Available'])
-		"""
-		:math:`n` × :math:`p` dataframe of sample identifiers and metadata.
-
-		The sampleMetadata table can include any datatype that can be placed in a pandas cell, However the toolbox assumes certain prerequisites on the following columns in order to function:
-
-		================== ========================================= ============
-		Column             dtype                                     Usage
-		================== ========================================= ============
-		Sample ID          str                                       ID of the :term:`sampling event` generating this sample
-		AssayRole          :py:class:`~nPYc.enumerations.AssayRole`  Defines the role of this assay
-		SampleType         :py:class:`~nPYc.enumerations.SampleType` Defines the type of sample acquired
-		Sample File Name   str                                       :term:`Unique file name<Sample File Name>` for the analytical data
-		Sample Base Name   str                                       :term:`Common identifier<Sample Base Name>` that links analytical data to the *Sample ID*
-		Dilution           float                                     Where *AssayRole* is :py:attr:`~nPYc.enumerations.AssayRole.LinearityReference`, the expected abundance is indicated here
-		Batch              int                                       Acquisition batch
-		Correction Batch   int                                       When detecting and correcting for :term:`batch<Batch Effects>` and :term:`Run-Order<Run-Order Effects>` effects, run-order effects are characterised within samples sharing the same *Correction Batch*, while batch effects are detected between distinct values
-		Acquired Time      datetime.datetime                         Date and time of acquisition of raw data
-		Run order          int                                       Order of sample acquisition
-		Exclusion Details  str                                       Details of reasoning if marked for exclusion
-		Metadata Available bool                                      Records which samples had metadata provided with the .addSampleInfo() method
-		================== ========================================= ============
-		"""
 		self.featureMask = numpy.array(None, dtype=bool)
 		""":math:`m` element vector, with ``True`` representing features to be included in analysis, and ``False`` those to be excluded"""
 		self.sampleMask = numpy.array(None, dtype=bool)
@@ -117,13 +105,45 @@ class Dataset:
 	def intensityData(self):
 		"""
 		:math:`n` × :math:`m` numpy matrix of measurements
+
+		The normalised matrix is cached, and only recalculated after :py:attr:`intensityData` or :py:attr:`Normalisation` are set, or :py:meth:`applyMasks` is called. If the underlying matrix is modified in place, assign it back to :py:attr:`intensityData` to refresh the cache.
 		"""
-		return self.Normalisation.normalise(self._intensityData)
+		if isinstance(self._Normalisation, normalisation.NullNormaliser):
+			return self._intensityData
+
+		cache = self._normalisedIntensityData
+		if (cache is not None) and (cache[0] == self._intensityDataVersion) and (cache[1] is self._intensityData) and (cache[2] is self._Normalisation):
+			self._normalisationCacheInfo['hits'] += 1
+			return cache[3]
+
+		self._normalisationCacheInfo['misses'] += 1
+		normalisedData = self._Normalisation.normalise(self._intensityData)
+		self._normalisedIntensityData = (self._intensityDataVersion, self._intensityData, self._Normalisation, normalisedData)
+
+		return normalisedData
 
 	@intensityData.setter
 	def intensityData(self, X: numpy.ndarray):
 
 		self._intensityData = X
+		self._invalidateNormalisedIntensityData()
+
+	@property
+	def normalisationCacheInfo(self):
+		"""
+		Number of reads of :py:attr:`intensityData` served from the cache of normalised intensities (*hits*), and that required normalisation (*misses*).
+
+		:rtype: dict
+		"""
+		return dict(self._normalisationCacheInfo)
+
+	def _invalidateNormalisedIntensityData(self):
+		"""
+		Bump the intensity data version, so that the normalised intensities and role statistics are recalculated on next access.
+		"""
+		self._intensityDataVersion += 1
+		self._normalisedIntensityData = None
+		self._roleStatisticsCache = None
 
 	@property
 	def noSamples(self) -> int:
@@ -149,6 +169,92 @@ class Dataset:
 			noFeatures = 0
 		return noFeatures
 
+	@property
+	def sampleMetadata(self):
+		"""
+		:math:`n` × :math:`p` dataframe of sample identifiers and metadata.
+
+		The sampleMetadata table can include any datatype that can be placed in a pandas cell, However the toolbox assumes certain prerequisites on the following columns in order to function:
+
+		================== ========================================= ============
+		Column             dtype                                     Usage
+		================== ========================================= ============
+		Sample ID          str                                       ID of the :term:`sampling event` generating this sample
+		AssayRole          :py:class:`~nPYc.enumerations.AssayRole`  Defines the role of this assay
+		SampleType         :py:class:`~nPYc.enumerations.SampleType` Defines the type of sample acquired
+		Sample File Name   str                                       :term:`Unique file name<Sample File Name>` for the analytical data
+		Sample Base Name   str                                       :term:`Common identifier<Sample Base Name>` that links analytical data to the *Sample ID*
+		Dilution           float                                     Where *AssayRole* is :py:attr:`~nPYc.enumerations.AssayRole.LinearityReference`, the expected abundance is indicated here
+		Batch              int                                       Acquisition batch
+		Correction Batch   int                                       When detecting and correcting for :term:`batch<Batch Effects>` and :term:`Run-Order<Run-Order Effects>` effects, run-order effects are characterised within samples sharing the same *Correction Batch*, while batch effects are detected between distinct values
+		Acquired Time      datetime.datetime                         Date and time of acquisition of raw data
+		Run order          int                                       Order of sample acquisition
+		Exclusion Details  str                                       Details of reasoning if marked for exclusion
+		Metadata Available bool                                      Records which samples had metadata provided with the .addSampleInfo() method
+		================== ========================================= ============
+
+		Assigning the table resets :py:attr:`roleMasks`. If the *SampleType* or *AssayRole* columns are edited in place, assign the table back to :py:attr:`sampleMetadata` to refresh the masks.
+		"""
+		return self._sampleMetadata
+
+	@sampleMetadata.setter
+	def sampleMetadata(self, sampleMetadata: pandas.DataFrame):
+
+		self._sampleMetadata = sampleMetadata
+		self._roleMasks = None
+
+	@sampleMetadata.deleter
+	def sampleMetadata(self):
+
+		del self._sampleMetadata
+		self._roleMasks = None
+
+	@property
+	def roleMasks(self):
+		"""
+		:py:class:`~nPYc.utilities._roleMasks.RoleMasks` of boolean masks selecting samples by their *SampleType* and *AssayRole* in :py:attr:`sampleMetadata`, indexed by a (:py:class:`~nPYc.enumerations.SampleType`, :py:class:`~nPYc.enumerations.AssayRole`) tuple, either of which may be ``None`` to match any value::
+
+			spMask = dataset.roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+
+		Masks are built once, and rebuilt after :py:attr:`sampleMetadata` is assigned, :py:meth:`addSampleInfo` or :py:meth:`applyMasks` are called, or the number of samples changes. Edits made to the *SampleType* or *AssayRole* columns in place are not detected, assign the table back to :py:attr:`sampleMetadata` afterwards to refresh the masks::
+
+			dataset.sampleMetadata.loc[0, 'AssayRole'] = AssayRole.Assay
+			dataset.sampleMetadata = dataset.sampleMetadata
+		"""
+		if (self._roleMasks is None) or (not self._roleMasks.matches(self.sampleMetadata)):
+			self._roleMasks = RoleMasks(self.sampleMetadata)
+
+		return self._roleMasks
+
+	def _roleStatistics(self, roles):
+		"""
+		Mean, standard deviation and :term:`RSD` of each feature in the unnormalised intensities, over the samples in :py:attr:`sampleMask` with each (SampleType, AssayRole) combination in *roles*.
+
+		Statistics are kept until :py:attr:`intensityData` is replaced, :py:attr:`sampleMask` changes, or the roles in :py:attr:`sampleMetadata` change. As for the normalised intensities, changes made to the matrix in place are not detected. Combinations not already calculated are found together, with :py:func:`~nPYc.utilities.groupStatistics`, in a single pass over the data.
+
+		:param list roles: (SampleType, AssayRole) tuples, as used to index :py:attr:`roleMasks`
+		:return: A (mean, std, rsd) tuple of vectors for each item of *roles*
+		:rtype: list
+		"""
+		roleMasks = self.roleMasks
+
+		cache = self._roleStatisticsCache
+		# Hold the matrix, as the normalisation cache does, so that it is still replaced when assigned to _intensityData directly
+		if (cache is None) or (cache['version'] != self._intensityDataVersion) or (cache['intensityData'] is not self._intensityData) \
+				or (cache['roleMasks'] is not roleMasks) or (not numpy.array_equal(cache['sampleMask'], self.sampleMask)):
+			cache = {'version': self._intensityDataVersion, 'intensityData': self._intensityData, 'roleMasks': roleMasks,
+					 'sampleMask': numpy.array(self.sampleMask, dtype=bool), 'statistics': dict()}
+			self._roleStatisticsCache = cache
+
+		missing = [role for role in dict.fromkeys(roles) if role not in cache['statistics']]
+		if missing:
+			masks = [roleMasks[role] & cache['sampleMask'] for role in missing]
+			(means, stds, rsds) = groupStatistics(self._intensityData, masks)
+			for (i, role) in enumerate(missing):
+				cache['statistics'][role] = (means[i], stds[i], rsds[i])
+
+		return [cache['statistics'][role] for role in roles]
+
 	@property
 	def log(self) -> str:
 		"""
@@ -192,6 +298,7 @@ class Dataset:
 			raise TypeError('Normalisation must implement the Normaliser ABC!')
 		else:
 			self._Normalisation = normaliser
+			self._invalidateNormalisedIntensityData()
 
 	def __repr__(self):
 		"""
@@ -200,6 +307,38 @@ class Dataset:
 		return "<%s instance at %s, named %s, with %d samples, %d features>" % (
 		self.__class__.__name__, id(self), self.name, self.noSamples, self.noFeatures)
 
+	def clone(self, shareData=True):
+		"""
+		Return a copy of the dataset that can be masked, trimmed or exported without altering the original.
+
+		With *shareData* ``True`` the copy references the intensity matrices of this dataset (:py:attr:`intensityData`, the matrices in *intensityDataExcluded*, the batch correction *fit* and any cached normalised intensities) instead of duplicating them. Shared arrays are read-only in the copy, and are only copied when replaced, as happens in :py:meth:`applyMasks` or on assignment to :py:attr:`intensityData`; modifying them in place raises a :py:exc:`ValueError`. Metadata tables, masks and :py:attr:`Attributes` are always copied.
+
+		:param bool shareData: If ``False`` return a fully independent copy, as :py:func:`copy.deepcopy`
+		:return: Copy of the dataset
+		:rtype: Dataset
+		"""
+		if not isinstance(shareData, bool):
+			raise TypeError('shareData must be True or False')
+
+		memo = dict()
+		if shareData:
+			sharedArrays = [self._intensityData]
+			if hasattr(self, 'intensityDataExcluded'):
+				sharedArrays.extend(self.intensityDataExcluded)
+			if hasattr(self, 'fit'):
+				sharedArrays.append(self.fit)
+			if self._normalisedIntensityData is not None:
+				sharedArrays.append(self._normalisedIntensityData[3])
+
+			# Seed the memo so deepcopy substitutes read-only views for the arrays
+			for array in sharedArrays:
+				if isinstance(array, numpy.ndarray):
+					readOnly = array.view()
+					readOnly.flags.writeable = False
+					memo[id(array)] = readOnly
+
+		return copy.deepcopy(self, memo)
+
 	def validateObject(self, verbose=True, raiseError=False, raiseWarning=True):
 		"""
 		Checks that all the attributes specified in the class definition are present and of the required class and/or values.
@@ -889,9 +1028,10 @@ class Dataset:
 		# end Exclusion Data
 
 		## List additional attributes (print + log)
-		expectedSet = set({'Attributes', 'VariableType', '_Normalisation', '_name', '_intensityData', 'sampleMetadata',
+		expectedSet = set({'Attributes', 'VariableType', '_Normalisation', '_name', '_intensityData', '_sampleMetadata',
 						   'featureMetadata', 'sampleMask', 'featureMask', 'sampleMetadataExcluded',
-						   'intensityDataExcluded', 'featureMetadataExcluded', 'excludedFlag'})
+						   'intensityDataExcluded', 'featureMetadataExcluded', 'excludedFlag',
+						   '_intensityDataVersion', '_normalisedIntensityData', '_normalisationCacheInfo', '_featureIndex', '_roleMasks', '_roleStatisticsCache'})
 		objectSet = set(self.__dict__.keys())
 		additionalAttributes = objectSet - expectedSet
 		if len(additionalAttributes) > 0:
@@ -1058,6 +1198,8 @@ class Dataset:
 	def applyMasks(self):
 		"""
 		Permanently delete elements masked (those set to ``False``) in :py:attr:`sampleMask` and :py:attr:`featureMask`, from :py:attr:`featureMetadata`, :py:attr:`sampleMetadata`, and :py:attr:`intensityData`.
+
+		Deleted elements are saved in *sampleMetadataExcluded*, *featureMetadataExcluded*, *intensityDataExcluded* and *excludedFlag*. Metadata tables are kept in an :py:class:`~nPYc.utilities._exclusionLedger.ExclusionLedger`, so that successive copies of :py:attr:`sampleMetadata` and :py:attr:`featureMetadata` are stored as changes to the copy before, and rebuilt when read.
 		"""
 
 		# Only save to excluded if features or samples masked
@@ -1065,9 +1207,9 @@ class Dataset:
 
 			# Instantiate lists if first application
 			if not hasattr(self, 'sampleMetadataExcluded'):
-				self.sampleMetadataExcluded = []
+				self.sampleMetadataExcluded = ExclusionLedger()
 				self.intensityDataExcluded = []
-				self.featureMetadataExcluded = []
+				self.featureMetadataExcluded = ExclusionLedger()
 				self.excludedFlag = []
 
 			# Samples
@@ -1080,14 +1222,23 @@ class Dataset:
 					pass
 
 				# Save excluded samples
-				self.sampleMetadataExcluded.append(self.sampleMetadata[:][self.sampleMask == False])
+				excludedSampleMetadata = self.sampleMetadata[:][self.sampleMask == False]
+				self.sampleMetadataExcluded.append(excludedSampleMetadata)
 				self.intensityDataExcluded.append(self._intensityData[self.sampleMask == False, :])
-				self.featureMetadataExcluded.append(self.featureMetadata)
+				if isinstance(self.featureMetadataExcluded, ExclusionLedger):
+					self.featureMetadataExcluded.appendTable(self.featureMetadata)
+				else:
+					self.featureMetadataExcluded.append(self.featureMetadata)
 				self.excludedFlag.append('Samples')
 
 				# Delete excluded samples
+				supersededSampleMetadata = self.sampleMetadata
 				self.sampleMetadata = self.sampleMetadata.loc[self.sampleMask]
 				self.sampleMetadata.reset_index(drop=True, inplace=True)
+
+				# Track the rows kept against the last table saved
+				if isinstance(self.sampleMetadataExcluded, ExclusionLedger):
+					self.sampleMetadataExcluded.supersede(supersededSampleMetadata, self.sampleMetadata, self.sampleMask)
 				self._intensityData = self._intensityData[self.sampleMask, :]
 
 				if hasattr(self, 'fit'):
@@ -1097,20 +1248,30 @@ class Dataset:
 			if sum(self.featureMask) != len(self.featureMask):
 
 				# Save excluded features
-				# Save excluded features
-				self.featureMetadataExcluded.append(self.featureMetadata[:][self.featureMask == False])
+				excludedFeatureMetadata = self.featureMetadata[:][self.featureMask == False]
+				self.featureMetadataExcluded.append(excludedFeatureMetadata)
 				self.intensityDataExcluded.append(self._intensityData[:, self.featureMask == False])
-				self.sampleMetadataExcluded.append(self.sampleMetadata)
+				if isinstance(self.sampleMetadataExcluded, ExclusionLedger):
+					self.sampleMetadataExcluded.appendTable(self.sampleMetadata)
+				else:
+					self.sampleMetadataExcluded.append(self.sampleMetadata)
 				self.excludedFlag.append('Features')
 
 				# Delete excluded features
+				supersededFeatureMetadata = self.featureMetadata
 				self.featureMetadata = self.featureMetadata.loc[self.featureMask]
 				self.featureMetadata.reset_index(drop=True, inplace=True)
+
+				# Track the rows kept against the last table saved
+				if isinstance(self.featureMetadataExcluded, ExclusionLedger):
+					self.featureMetadataExcluded.supersede(supersededFeatureMetadata, self.featureMetadata, self.featureMask)
 				self._intensityData = self._intensityData[:, self.featureMask]
 
 			self.Attributes['Log'].append([datetime.now(), '%i samples and %i features removed from dataset.' % (
 			sum(self.sampleMask == False), sum(self.featureMask == False))])
 
+			self._invalidateNormalisedIntensityData()
+
 			# Build new masks
 			self.initialiseMasks()
 
@@ -1150,6 +1311,9 @@ class Dataset:
 		else:
 			raise NotImplementedError
 
+		# Roles may have been set in place
+		self._roleMasks = None
+
 	def addFeatureInfo(self, filePath=None, descriptionFormat=None, featureId=None, **kwargs):
 		"""
 		Load additional metadata and map it in to the :py:attr:`featureMetadata` table.
@@ -1892,22 +2056,11 @@ class Dataset:
 		if not isinstance(message, str):
 			raise TypeError('`message` must be a string.')
 
-		notFound = []
-
 		if 'Exclusion Details' not in self.sampleMetadata:
 			self.sampleMetadata['Exclusion Details'] = ''
 
-		for sample in sampleList:
-			if sample in self.sampleMetadata[on].unique():
-				self.sampleMask[self.sampleMetadata[self.sampleMetadata[on] == sample].index] = False
-				if (self.sampleMetadata.loc[self.sampleMetadata[on] == sample, 'Exclusion Details'].values in ['', None]):
-					self.sampleMetadata.loc[self.sampleMetadata[on] == sample, 'Exclusion Details'] = message
-				else:
-					self.sampleMetadata.loc[self.sampleMetadata[on] == sample, 'Exclusion Details'] = \
-					self.sampleMetadata.loc[self.sampleMetadata[on] == sample, 'Exclusion Details'] + ' AND ' + message
-			else:
-				# AMtched must be unique.
-				notFound.append(sample)
+		(matched, notFound) = self._matchExclusions(self.sampleMetadata, sampleList, on, message)
+		self.sampleMask[matched] = False
 
 		if any(notFound):
 			return notFound
@@ -1935,18 +2088,8 @@ class Dataset:
 			self.featureMetadata['Exclusion Details'] = ''
 
 		if self.VariableType == VariableType.Discrete:
-			for feature in featureList:
-				if feature in self.featureMetadata[on].unique():
-					self.featureMask[self.featureMetadata[self.featureMetadata[on] == feature].index] = False
-					if (self.featureMetadata.loc[self.featureMetadata[on] == feature, 'Exclusion Details'].values == ''):
-						self.featureMetadata.loc[self.featureMetadata[on] == feature, 'Exclusion Details'] = message
-					else:
-						self.featureMetadata.loc[self.featureMetadata[on] == feature, 'Exclusion Details'] = \
-						self.featureMetadata.loc[
-							self.featureMetadata[on] == feature, 'Exclusion Details'] + ' AND ' + message
-				else:
-					# AMtched must be unique.
-					notFound.append(feature)
+			(matched, notFound) = self._matchExclusions(self.featureMetadata, featureList, on, message)
+			self.featureMask[matched] = False
 
 		elif self.VariableType == VariableType.Spectral:
 			for chunk in featureList:
@@ -1971,7 +2114,45 @@ class Dataset:
 		return notFound
 
 
-	def exportDataset(self, destinationPath='.', saveFormat='CSV', isaDetailsDict = {}, withExclusions=True, escapeDelimiters=False, filterMetadata=True):
+	def _matchExclusions(self, metadata, idList, on, message):
+		"""
+		Find the rows of *metadata* whose *on* value is listed in *idList*, and append *message* to their 'Exclusion Details'.
+
+		IDs are matched through a hash table built once, so the cost grows linearly with the number of rows and IDs. A row listed several times has *message* appended once per listing.
+
+		:param pandas.DataFrame metadata: :py:attr:`sampleMetadata` or :py:attr:`featureMetadata`, updated in place
+		:param idList: Iterable of IDs to match
+		:param str on: Column of *metadata* to match against
+		:param str message: Text to append to 'Exclusion Details' of matched rows
+		:return: Boolean mask of the rows matched, and list of the IDs in *idList* not found in *metadata*, in the order given
+		:rtype: tuple(numpy.ndarray, list)
+		"""
+		idList = list(idList)
+		ids = pandas.Series(idList, dtype=object)
+
+		# Missing values never match, as when testing membership of the unique values
+		found = (ids.isin(metadata[on].values) & ids.notnull()).values
+		notFound = [idList[i] for i in numpy.flatnonzero(~found)]
+
+		timesListed = metadata[on].map(ids[found].value_counts()).fillna(0).values.astype(int)
+		matched = timesListed > 0
+
+		if matched.any():
+			details = metadata['Exclusion Details'].values[matched]
+			empty = pandas.isnull(details) | (details == '')
+
+			messages = numpy.array([' AND '.join([message] * i) for i in range(timesListed.max() + 1)], dtype=object)
+			messages = messages[timesListed[matched]]
+			messages[~empty] = details[~empty] + ' AND ' + messages[~empty]
+
+			exclusionDetails = metadata['Exclusion Details'].values.astype(object)
+			exclusionDetails[matched] = messages
+			metadata['Exclusion Details'] = exclusionDetails
+
+		return matched, notFound
+
+
+	def exportDataset(self, destinationPath='.', saveFormat='CSV', isaDetailsDict = {}, withExclusions=True, escapeDelimiters=False, filterMetadata=True, compression=None, parallelise=False, workers=None):
 		"""
 		Export dataset object in a variety of formats for import in other software, the export is named according to the :py:attr:`name` attribute of the Dataset object.
 
@@ -1980,6 +2161,7 @@ class Dataset:
 		* **CSV** Basic CSV output, :py:attr:`featureMetadata`, :py:attr:`sampleMetadata` and :py:attr:`intensityData` are written to three separate CSV files in *desitinationPath*
 		* **UnifiedCSV** Exports :py:attr:`featureMetadata`, :py:attr:`sampleMetadata` and :py:attr:`intensityData` concatenated into a single CSV file
 		* **ISATAB** Exports the sampleMetadata in the `ISATAB <http://isa-tools.org>`_ format
+		* **HDF5** Saves the complete dataset to a single HDF5 file, that can be reopened with ``fileType='HDF5'``, see :py:meth:`_exportHDF5`
 
 		:param str destinationPath: Save data into the directory specified here
 		:param str format: File format for saved data, defaults to CSV.
@@ -2008,6 +2190,11 @@ class Dataset:
 		:param bool withExclusions: If ``True`` mask features and samples will be excluded
 		:param bool escapeDelimiters: If ``True`` remove characters commonly used as delimiters in csv files from metadata
 		:param bool filterMetadata: If ``True`` does not export the sampleMetadata and featureMetadata columns listed in self.Attributes['sampleMetadataNotExported'] and self.Attributes['featureMetadataNotExported']
+		:param compression: For CSV and UnifiedCSV exports, if 'gzip' compress the files written and append '.gz' to their names. For HDF5 exports, compress the intensity matrix with 'gzip' or 'lzf', if ``None`` store it uncompressed so it can be memory-mapped when loaded
+		:type compression: None or str
+		:param bool parallelise: For CSV and UnifiedCSV exports, if ``True`` convert intensities to text in a pool of worker processes
+		:param workers: Number of worker processes to use when *parallelise* is ``True``, if ``None`` use one less than the number of CPU cores
+		:type workers: None or int
 		:raises ValueError: if *saveFormat* is not understood
 		"""
 		# Validate inputs
@@ -2017,6 +2204,11 @@ class Dataset:
 			raise TypeError('`withExclusions` must be True or False')
 		if not isinstance(filterMetadata, bool):
 			raise TypeError('`filterMetadata` must be True or False')
+		if not isinstance(parallelise, bool):
+			raise TypeError('`parallelise` must be True or False')
+		if workers is not None:
+			if not (isinstance(workers, int) and (workers > 0)):
+				raise TypeError('workers must be a positive integer')
 
 		#  Create the fireacotry to save the data into.
 		self.saveDir = destinationPath
@@ -2024,8 +2216,8 @@ class Dataset:
 		if not os.path.exists(self.saveDir):
 			os.makedirs(self.saveDir)
 
-		# make a deepcopy to allow .applyMasks() or filterMetadata
-		exportDataset = copy.deepcopy(self)
+		# make a copy to allow .applyMasks() or filterMetadata
+		exportDataset = self.clone()
 
 		if withExclusions:
 			exportDataset.applyMasks()
@@ -2043,19 +2235,22 @@ class Dataset:
 
 		if saveFormat == 'CSV':
 			destinationPath = os.path.join(destinationPath, exportDataset.name)
-			exportDataset._exportCSV(destinationPath, escapeDelimiters=escapeDelimiters)
+			exportDataset._exportCSV(destinationPath, escapeDelimiters=escapeDelimiters, compression=compression, parallelise=parallelise, workers=workers)
 		elif saveFormat == 'UnifiedCSV':
 			destinationPath = os.path.join(destinationPath, exportDataset.name)
-			exportDataset._exportUnifiedCSV(destinationPath, escapeDelimiters=escapeDelimiters)
+			exportDataset._exportUnifiedCSV(destinationPath, escapeDelimiters=escapeDelimiters, compression=compression, parallelise=parallelise, workers=workers)
 		elif saveFormat == 'ISATAB':
 			exportDataset._exportISATAB(destinationPath, isaDetailsDict)
+		elif saveFormat == 'HDF5':
+			destinationPath = os.path.join(destinationPath, exportDataset.name)
+			exportDataset._exportHDF5(destinationPath, compression=compression)
 		else:
 			raise ValueError('Save format \'%s\' not understood.' % saveFormat)
 
 		self.Attributes['Log'].append([datetime.now(), "%s format export made to %s\n" % (saveFormat, self.saveDir)])
 
 
-	def _exportCSV(self, destinationPath, escapeDelimiters=False):
+	def _exportCSV(self, destinationPath, escapeDelimiters=False, compression=None, parallelise=False, workers=None):
 		"""
 		Export the dataset to the directory *destinationPath* as a set of three CSV files:
 			*destinationPath*_intensityData.csv
@@ -2064,8 +2259,14 @@ class Dataset:
 
 		:param str destinationPath: Path to a directory in which the output will be saved
 		:param bool escapeDelimiters: Remove characters commonly used as delimiters in csv files from metadata
+		:param compression: If 'gzip' compress the files, and append '.gz' to their names
+		:type compression: None or str
+		:param bool parallelise: If ``True`` format intensities in a pool of worker processes
+		:param workers: Number of worker processes, if ``None`` use one less than the number of CPU cores
+		:type workers: None or int
 		:raises IOError: If writing one of the files fails
 		"""
+		from ..utilities._csvWriter import csvPath, writeMatrixCSV
 
 		sampleMetadata = self.sampleMetadata.copy(deep=True)
 		featureMetadata = self.featureMetadata.copy(deep=True)
@@ -2088,16 +2289,16 @@ class Dataset:
 					pass
 
 		# Export sample metadata
-		sampleMetadata.to_csv(destinationPath + '_sampleMetadata.csv',
-							  encoding='utf-8', date_format=self._timestampFormat)
+		sampleMetadata.to_csv(csvPath(destinationPath + '_sampleMetadata.csv', compression),
+							  encoding='utf-8', date_format=self._timestampFormat, compression=compression)
 
 		# Export feature metadata
-		featureMetadata.to_csv(destinationPath + '_featureMetadata.csv',
-							   encoding='utf-8')
+		featureMetadata.to_csv(csvPath(destinationPath + '_featureMetadata.csv', compression),
+							   encoding='utf-8', compression=compression)
 
-		# Export intensity data
-		numpy.savetxt(destinationPath + '_intensityData.csv',
-					  self.intensityData, delimiter=",")
+		# Export intensity data, as numpy.savetxt but a block of rows at a time
+		writeMatrixCSV(destinationPath + '_intensityData.csv', self.intensityData, delimiter=",",
+					   compression=compression, parallelise=parallelise, workers=workers)
 
 
 	def _exportISATAB(self, destinationPath, isaDetailsDict, assay='MS'):
@@ -2111,15 +2312,21 @@ class Dataset:
 		raise NotImplementedError
 
 
-	def _exportUnifiedCSV(self, destinationPath, escapeDelimiters=True):
+	def _exportUnifiedCSV(self, destinationPath, escapeDelimiters=True, compression=None, parallelise=False, workers=None):
 		"""
 		Export the dataset to the directory *destinationPath* as a combined CSV file containing intensity data, and feature and sample metadata
 			*destinationPath*_combinedData.csv.csv
 
 		:param str destinationPath: Path to a directory in which the output will be saved
 		:param bool escapeDelimiters: Remove characters commonly used as delimiters in csv files from metadata
+		:param compression: If 'gzip' compress the file, and append '.gz' to its name
+		:type compression: None or str
+		:param bool parallelise: If ``True`` format intensities in a pool of worker processes
+		:param workers: Number of worker processes, if ``None`` use one less than the number of CPU cores
+		:type workers: None or int
 		:raises IOError: If writing one of the files fails
 		"""
+		from ..utilities._csvWriter import writeUnifiedCSV
 
 		sampleMetadata = self.sampleMetadata.copy(deep=True)
 		featureMetadata = self.featureMetadata.copy(deep=True)
@@ -2141,21 +2348,9 @@ class Dataset:
 				except:
 					pass
 
-		# Export combined data in single file
-		tmpXCombined = pandas.concat([featureMetadata.transpose(),
-									  pandas.DataFrame(self.intensityData)], axis=0)
-
-		with warnings.catch_warnings():
-			# Seems no way to avoid pandas complaining here (v0.18.1)
-			warnings.simplefilter("ignore")
-			tmpCombined = pandas.concat([sampleMetadata, tmpXCombined], axis=1)
-
-		# reorder rows to put metadata first
-		tmpCombined = tmpCombined.reindex(tmpXCombined.index, axis=0)
-
-		# Save
-		tmpCombined.to_csv(os.path.join(destinationPath + '_combinedData.csv'),
-						   encoding='utf-8', date_format=self._timestampFormat)
+		# Export combined data in single file, with feature metadata in the first rows
+		writeUnifiedCSV(destinationPath + '_combinedData.csv', sampleMetadata, featureMetadata, self.intensityData,
+						dateFormat=self._timestampFormat, compression=compression, parallelise=parallelise, workers=workers)
 
 
 	def getFeatures(self, featureIDs, by=None, useMasks=True):
@@ -2171,6 +2366,8 @@ class Dataset:
 		:type by: None or str
 		:returns: (featureMetadata, intensityData)
 		:rtype: (pandas.Dataframe, numpy.ndarray)
+
+		Features are found through an index of the *by* column, kept between calls, and rebuilt whenever the values of the column differ from those it was built from. When the features returned are contiguous, the tables returned are slices of :py:attr:`featureMetadata` and :py:attr:`intensityData` rather than copies.
 		"""
 		if not isinstance(featureIDs, list):
 			featureIDs = [featureIDs]
@@ -2181,36 +2378,119 @@ class Dataset:
 		if by not in self.featureMetadata.keys():
 			raise KeyError('"by": %s is not a key in featureMetadata' % (by))
 
-		indexes = list()
 		if self.VariableType == VariableType.Discrete:
-			for feature in featureIDs:
-				indexes.append(self.featureMetadata.loc[self.featureMetadata[by] == feature].index[0])
+			indexes = self._lookupFeatures(by, 'lookup', featureIDs)
 
 			if useMasks:
-				indexes = [x for x in indexes if self.featureMask[x]]
-				#indexes.remove(maskedVar)
+				indexes = indexes[self.featureMask[indexes]]
 
-			return self.featureMetadata.iloc[indexes], self.intensityData[:, indexes]
+			indexes = asSlice(indexes)
 
 		elif self.VariableType == VariableType.Spectral:
-			rangeMask = numpy.zeros_like(self.featureMask)
-			for featureRange in featureIDs:
-				if featureRange[0] > featureRange[1]:
-					featureRange = tuple(reversed(featureRange))
-
-				rangeMask[numpy.logical_and(self.featureMetadata[by].values >= featureRange[0],
-											self.featureMetadata[by].values <= featureRange[1])] = True
+			indexes = self._lookupFeatures(by, 'rangeLookup', featureIDs)
 
-			if useMasks:
-				rangeMask &= self.featureMask
-
-			return self.featureMetadata.loc[rangeMask], self.intensityData[:, rangeMask]
+			if useMasks and not numpy.all(self.featureMask[indexes]):
+				rangeMask = numpy.zeros_like(self.featureMask)
+				rangeMask[indexes] = True
+				indexes = numpy.flatnonzero(rangeMask & self.featureMask)
 		else:
 			raise TypeError('Dataset.VariableType type not understood!')
 
-	def _exportHDF5(self, destinationPath):
+		return self.featureMetadata.iloc[indexes], self.intensityData[:, indexes]
 
-		raise NotImplementedError
+	def _lookupFeatures(self, by, method, featureIDs):
+		"""
+		Call *method* of the :py:class:`~nPYc.utilities._featureIndex.FeatureIndex` of column *by*, rebuilding the index if it is out of date.
+		"""
+		if (self._featureIndex is None) or not self._featureIndex.matches(self.featureMetadata, by):
+			self._featureIndex = FeatureIndex(self.featureMetadata, by)
+
+		return getattr(self._featureIndex, method)(featureIDs)
+
+	def _exportHDF5(self, destinationPath, compression=None):
+		"""
+		Save the dataset to the single HDF5 file *destinationPath*.h5
+
+		The file holds the unnormalised :py:attr:`intensityData`, :py:attr:`sampleMetadata`, :py:attr:`featureMetadata`, :py:attr:`sampleMask`, :py:attr:`featureMask`, :py:attr:`Attributes`, the state of the :py:attr:`Normalisation` object, and the batch correction *fit* when present. Metadata columns of numbers, booleans, strings, datetimes or :py:mod:`~nPYc.enumerations` are stored natively, other columns as a JSON string per value.
+
+		:param str destinationPath: Path to save to, '.h5' is appended
+		:param compression: Compress the intensity matrix with 'gzip' or 'lzf' in chunks, if ``None`` store it contiguously so it can be memory-mapped on loading
+		:type compression: None or str
+		:raises ValueError: if *compression* is not understood
+		"""
+		import h5py
+		from .. import __version__
+		from ..utilities._hdf5Store import writeFrame, writeMatrix, writeNormaliser, writeString, encodeJSON
+
+		if compression not in {None, 'gzip', 'lzf'}:
+			raise ValueError('compression must be None, \'gzip\' or \'lzf\'')
+
+		with h5py.File(destinationPath + '.h5', 'w') as store:
+			store.attrs['class'] = self.__class__.__name__
+			store.attrs['version'] = __version__
+			store.attrs['name'] = self.name
+			store.attrs['VariableType'] = encodeJSON(self.VariableType)
+			store.attrs['AnalyticalPlatform'] = encodeJSON(self.AnalyticalPlatform)
+			writeString(store, 'Attributes', encodeJSON(self.Attributes))
+
+			writeMatrix(store, 'intensityData', self._intensityData, compression=compression)
+			store.create_dataset('sampleMask', data=numpy.asarray(self.sampleMask, dtype=bool))
+			store.create_dataset('featureMask', data=numpy.asarray(self.featureMask, dtype=bool))
+			if hasattr(self, 'fit'):
+				writeMatrix(store, 'fit', self.fit, compression=compression)
+
+			writeFrame(store.create_group('sampleMetadata'), self.sampleMetadata)
+			writeFrame(store.create_group('featureMetadata'), self.featureMetadata)
+			writeNormaliser(store.create_group('Normalisation'), self.Normalisation)
+
+	def _loadHDF5Dataset(self, path, samples=None, features=None, mmap=False):
+		"""
+		Load a dataset saved by :py:meth:`_exportHDF5`, optionally reading only a subset of samples or features.
+
+		:param str path: Path to the .h5 file
+		:param samples: Samples to load, as a boolean mask or list of positions in the stored dataset, if ``None`` load all
+		:param features: Features to load, as a boolean mask or list of positions in the stored dataset, if ``None`` load all
+		:param bool mmap: If ``True`` memory-map the intensity matrix from the file rather than reading it, only possible if it was saved without compression. The map is copy-on-write, changes are never written back to the file.
+		:raises TypeError: if *mmap* is not a bool
+		:raises ValueError: if the file holds a different class of dataset, or it cannot be memory-mapped
+		"""
+		import h5py
+		from ..utilities._hdf5Store import readFrame, readMatrix, mapMatrix, readNormaliser, readString, decodeJSON, selectionIndex
+
+		if not isinstance(mmap, bool):
+			raise TypeError('mmap must be True or False')
+
+		with h5py.File(path, 'r') as store:
+			if store.attrs['class'] != self.__class__.__name__:
+				raise ValueError('%s holds a %s, not a %s' % (path, store.attrs['class'], self.__class__.__name__))
+
+			(noSamples, noFeatures) = store['intensityData'].shape
+			samples = selectionIndex(samples, noSamples, 'samples')
+			features = selectionIndex(features, noFeatures, 'features')
+
+			if mmap:
+				intensityData = mapMatrix(store['intensityData'], path)
+				if (samples is not None) or (features is not None):
+					intensityData = intensityData[slice(None) if samples is None else samples, :][:, slice(None) if features is None else features]
+			else:
+				intensityData = readMatrix(store['intensityData'], rows=samples, columns=features)
+			if 'fit' in store:
+				self.fit = readMatrix(store['fit'], rows=samples, columns=features)
+
+			self.sampleMetadata = readFrame(store['sampleMetadata'], rows=samples)
+			self.featureMetadata = readFrame(store['featureMetadata'], rows=features)
+			self.sampleMask = store['sampleMask'][()] if samples is None else store['sampleMask'][()][samples]
+			self.featureMask = store['featureMask'][()] if features is None else store['featureMask'][()][features]
+
+			self.Attributes = decodeJSON(readString(store, 'Attributes'))
+			self.Normalisation = readNormaliser(store['Normalisation'])
+			self.VariableType = decodeJSON(store.attrs['VariableType'])
+			self.AnalyticalPlatform = decodeJSON(store.attrs['AnalyticalPlatform'])
+			self.name = store.attrs['name']
+
+		self.intensityData = intensityData
+
+		self.Attributes['Log'].append([datetime.now(), 'Loaded %d samples and %d features from %s' % (self.noSamples, self.noFeatures, path)])
 
 
 def main():
@@ -12,15 +12,17 @@ import numbers
 from datetime import datetime
 import logging
 import copy
-import networkx
+import scipy.sparse
+from scipy.sparse.csgraph import connected_components
 from .._toolboxPath import toolboxPath
 from ._dataset import Dataset
-from ..utilities import rsd
-from ..utilities._internal import _vcorrcoef
+from ..utilities._internal import _vcorrcoef, _vcorrcoefByGroup, _PairedCorrelation
 from ..utilities._getMetadataFromWatersRaw import getSampleMetadataFromWatersRawFiles
 from ..enumerations import VariableType, DatasetLevel, AssayRole, SampleType
 from ..utilities import removeTrailingColumnNumbering
-from ..utilities._filters import blankFilter
+from ..utilities._filters import blankFilter, _blankLevels
+from ..utilities._thresholdSweep import ThresholdSweep
+from ..utilities._filenameParser import _parseFilenames, _mergeFilenameMetadata
 from ..utilities.normalisation._normaliserABC import Normaliser
 from ..utilities.normalisation._nullNormaliser import NullNormaliser
 
@@ -39,6 +41,12 @@ class MSDataset(Dataset):
 	* XCMS
 		XCMS import operates on the csv files generated by XCMS with the peakTable() method. By default, the csv is expected to have 14 columns of feature parameters, with the intensity values for the first sample coming on the 15 column. However, the number of columns to skip is dataset dependent and can be set with the (e ``noFeatureParams=`` keyword argument.
 
+	* Streaming import
+		Large QI and XCMS exports may be imported with ``streaming=True``, the file is then read in chunks of ``chunkSize=`` features directly into a preallocated intensity matrix of ``dtype=`` (e.g. ``numpy.float32`` to halve memory use), and feature metadata is read with numeric columns typed as floats. If ``memmapPath=`` is provided, the intensity matrix is backed by a memory-mapped ``.npy`` file at this location instead of RAM.
+
+	* HDF5
+		Reopens a dataset saved with :py:meth:`~Dataset.exportDataset` and ``saveFormat='HDF5'``. A subset of the stored samples or features may be loaded by passing boolean masks or lists of positions as ``samples=`` and ``features=``, and ``mmap=True`` memory-maps an uncompressed intensity matrix instead of reading it.
+
 	* Biocrates
 		Operates on spreadsheets exported from Biocrates MetIDQ. By default loads data from the sheet named 'Data Export', this may be overridden with the ``sheetName=`` argument, If the number of sample metadata columns differes from the default, this can be overridden with the ``noSampleParams=`` argument.
 	"""
@@ -57,6 +65,7 @@ class MSDataset(Dataset):
 			pass
 		self._tempArtifactualLinkageMatrix = pandas.DataFrame(None)
 		self._artifactualLinkageMatrix = pandas.DataFrame(None)
+		self._artifactualLinkageCorrelation = None
 		self.Attributes['Raw Data Path'] = None
 		self.Attributes['Feature Names'] = 'Feature Name'
 		self.filePath, fileName = os.path.split(datapath)
@@ -76,7 +85,7 @@ class MSDataset(Dataset):
 		# Load the QI output file
 		fileType = fileType.lower()
 		if fileType == 'qi':
-			self._loadQIDataset(datapath)
+			self._loadQIDataset(datapath, **{key: kwargs[key] for key in ['streaming', 'chunkSize', 'dtype', 'memmapPath'] if key in kwargs})
 			self.Attributes['FeatureExtractionSoftware'] = 'Progenesis QI'
 			self.VariableType = VariableType.Discrete
 		elif fileType == 'csv':
@@ -105,22 +114,26 @@ class MSDataset(Dataset):
 			if 'Retention Time' in self.featureMetadata.columns:
 				self.featureMetadata['Retention Time'] = self.featureMetadata['Retention Time'].apply(pandas.to_numeric, errors='ignore')
 			self.VariableType = VariableType.Discrete
+		elif fileType == 'hdf5':
+			self._loadHDF5Dataset(datapath, **{key: kwargs[key] for key in ['samples', 'features', 'mmap'] if key in kwargs})
 		elif fileType == 'empty':
 			# Lets us build an empty object for testing &c
 			pass
 		else:
 			raise NotImplementedError
 
-		self.featureMetadata['Exclusion Details'] = None
-		self.featureMetadata['User Excluded'] = False
-		self.featureMetadata[['rsdFilter', 'varianceRatioFilter', 'correlationToDilutionFilter', 'blankFilter',
-							  'artifactualFilter']] = pandas.DataFrame([[True, True, True, True, True]],
-																	   index=self.featureMetadata.index)
+		# Saved datasets already carry their filter columns and masks
+		if fileType != 'hdf5':
+			self.featureMetadata['Exclusion Details'] = None
+			self.featureMetadata['User Excluded'] = False
+			self.featureMetadata[['rsdFilter', 'varianceRatioFilter', 'correlationToDilutionFilter', 'blankFilter',
+								  'artifactualFilter']] = pandas.DataFrame([[True, True, True, True, True]],
+																		   index=self.featureMetadata.index)
 
-		self.featureMetadata[['rsdSP', 'rsdSS/rsdSP', 'correlationToDilution', 'blankValue']] \
-			= pandas.DataFrame([[numpy.nan, numpy.nan, numpy.nan, numpy.nan]], index=self.featureMetadata.index)
+			self.featureMetadata[['rsdSP', 'rsdSS/rsdSP', 'correlationToDilution', 'blankValue']] \
+				= pandas.DataFrame([[numpy.nan, numpy.nan, numpy.nan, numpy.nan]], index=self.featureMetadata.index)
 
-		self.initialiseMasks()
+			self.initialiseMasks()
 
 		self.Attributes['Log'].append([datetime.now(), '%s instance inited, with %d samples, %d features, from \%s\'' % (self.__class__.__name__, self.noSamples, self.noFeatures, datapath)])
 
@@ -138,6 +151,8 @@ class MSDataset(Dataset):
 				setattr(result, k, copy.deepcopy(v, memo))
 		result._tempArtifactualLinkageMatrix = pandas.DataFrame(None)
 		result._artifactualLinkageMatrix = pandas.DataFrame(None)
+		result._artifactualLinkageCorrelation = None
+		result._normalisedIntensityData = None
 
 		return(result)
 
@@ -198,6 +213,7 @@ class MSDataset(Dataset):
 	def artifactualLinkageMatrix(self):
 		self._artifactualLinkageMatrix = pandas.DataFrame(None)
 		self._tempArtifactualLinkageMatrix = pandas.DataFrame(None)
+		self._artifactualLinkageCorrelation = None
 
 
 	@property
@@ -205,19 +221,20 @@ class MSDataset(Dataset):
 		"""
 		Returns percentage :term:`relative standard deviations<RSD>` for each feature in the dataset, calculated on samples with the Assay Role :py:attr:`~nPYc.enumerations.AssayRole.PrecisionReference` and Sample Type :py:attr:`~nPYc.enumerations.SampleType.StudyPool` in :py:attr:`~Dataset.sampleMetadata`.
 
+		RSDs are calculated once, and kept until :py:attr:`~Dataset.intensityData` is replaced or :py:attr:`~Dataset.sampleMask` or the roles of samples change.
+
 		:return: Vector of feature RSDs
 		:rtype: numpy.ndarray
 		"""
 		# Check we have Study Reference samples defined
 		if not ('AssayRole' in self.sampleMetadata.keys() or 'SampleType' in self.sampleMetadata.keys()):
 			raise ValueError('Assay Roles and Sample Types must be defined to calculate RSDs.')
-		if not sum(self.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference) > 1:
+		if not sum(self.roleMasks[None, AssayRole.PrecisionReference]) > 1:
 			raise ValueError('More than one precision reference is required to calculate RSDs.')
 
-		mask = numpy.logical_and(self.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference,
-								 self.sampleMetadata['SampleType'].values == SampleType.StudyPool)
+		(mean, std, rsdSP) = self._roleStatistics([(SampleType.StudyPool, AssayRole.PrecisionReference)])[0]
 
-		return rsd(self._intensityData[mask & self.sampleMask])
+		return rsdSP.copy()
 
 
 	@property
@@ -225,19 +242,20 @@ class MSDataset(Dataset):
 		"""
 		Returns percentage :term:`relative standard deviations<RSD>` for each feature in the dataset, calculated on samples with the Assay Role :py:attr:`~nPYc.enumerations.AssayRole.Assay` and Sample Type :py:attr:`~nPYc.enumerations.SampleType.StudySample` in :py:attr:`~Dataset.sampleMetadata`.
 
+		RSDs are calculated once, and kept until :py:attr:`~Dataset.intensityData` is replaced or :py:attr:`~Dataset.sampleMask` or the roles of samples change.
+
 		:return: Vector of feature RSDs
 		:rtype: numpy.ndarray
 		"""
 		# Check we have Study Reference samples defined
 		if not ('AssayRole' in self.sampleMetadata.keys() or 'SampleType' in self.sampleMetadata.keys()):
 			raise ValueError('Assay Roles and Sample Types must be defined to calculate RSDs.')
-		if not sum(self.sampleMetadata['AssayRole'].values == AssayRole.Assay) > 1:
+		if not sum(self.roleMasks[None, AssayRole.Assay]) > 1:
 			raise ValueError('More than one assay sample is required to calculate RSDs.')
 
-		mask = numpy.logical_and(self.sampleMetadata['AssayRole'].values == AssayRole.Assay,
-								 self.sampleMetadata['SampleType'].values == SampleType.StudySample)
+		(mean, std, rsdSS) = self._roleStatistics([(SampleType.StudySample, AssayRole.Assay)])[0]
 
-		return rsd(self._intensityData[mask & self.sampleMask])
+		return rsdSS.copy()
     
 
 	def applyMasks(self):
@@ -252,6 +270,11 @@ class MSDataset(Dataset):
 			if hasattr(self, 'fit'):
 				self.fit = self.fit[:, self.featureMask]
 
+		# samples about to be deleted, used to downdate the linkage correlations
+		removedSamples = None
+		if (not changeFeature) and (self._artifactualLinkageCorrelation is not None):
+			removedSamples = self._intensityData[self.sampleMask==False, :]
+
 		# if a change is made to the features, the whole artifactualLinkageMatrix must be updated (feature IDs change), else only correlation calculation
 		super().applyMasks()																			# applyMasks
 		if self.Attributes['featureFilters']['artifactualFilter'] == True:
@@ -259,7 +282,7 @@ class MSDataset(Dataset):
 				if changeFeature:
 					self._artifactualLinkageMatrix = self.__generateArtifactualLinkageMatrix()								# change features, recalculate all
 				else:
-					self._artifactualLinkageMatrix = self.__generateArtifactualLinkageMatrix(corrOnly=True)		# change samples, recalculate correlation only
+					self._artifactualLinkageMatrix = self.__generateArtifactualLinkageMatrix(corrOnly=True, removedSamples=removedSamples)		# change samples, recalculate correlation only
 		# Reset correlations
 		del self.correlationToDilution
 
@@ -387,6 +410,10 @@ class MSDataset(Dataset):
 			# Keep all manual feature exclusions and regenerate the proper tests
 			featureMask = numpy.copy(~self.featureMetadata['User Excluded'].values)
 
+			# Calculate the SP and SS statistics needed together, in one pass over the data
+			if featureFilters['varianceRatioFilter'] is True:
+				self._roleStatistics([(SampleType.StudyPool, AssayRole.PrecisionReference), (SampleType.StudySample, AssayRole.Assay)])
+
 			if featureFilters['rsdFilter'] is True:
 
 				self.featureMetadata['rsdFilter'] = (self.rsdSP <= rsdThreshold)
@@ -398,12 +425,7 @@ class MSDataset(Dataset):
 
 			if featureFilters['varianceRatioFilter'] is True:
 
-				mask = numpy.logical_and(self.sampleMetadata['AssayRole'].values == AssayRole.Assay,
-										 self.sampleMetadata['SampleType'].values == SampleType.StudySample)
-
-				mask = numpy.logical_and(mask, self.sampleMask)
-
-				rsdSS = rsd(self._intensityData[mask, :])
+				(mean, std, rsdSS) = self._roleStatistics([(SampleType.StudySample, AssayRole.Assay)])[0]
 
 				self.featureMetadata['varianceRatioFilter'] = ((self.rsdSP * varianceRatio) <= rsdSS)
 				self.featureMetadata['rsdSS/rsdSP'] = rsdSS/self.rsdSP
@@ -503,6 +525,10 @@ class MSDataset(Dataset):
 		:param filenameSpec: Only used if *descriptionFormat* is 'Filenames'. A regular expression that extracts sample-type information into the following named capture groups: 'fileName', 'baseName', 'study', 'chromatography' 'ionisation', 'instrument', 'groupingKind' 'groupingNo', 'injectionKind', 'injectionNo', 'reference', 'exclusion' 'reruns', 'extraInjections', 'exclusion2'. if ``None`` is passed, use the *filenameSpec* key in *Attributes*, loaded from the SOP json
 		:type filenameSpec: None or str
 		:raises NotImplementedError: if the descriptionFormat is not understood
+
+		When *descriptionFormat* is 'Raw Data', the *parallelise*, *workers*, and *cachePath* keyword arguments are passed to :py:func:`~nPYc.utilities.extractParams`, to read raw data folders in a pool of threads, and only read folders that are new or have changed since an earlier call with the same *cachePath*::
+
+			msData.addSampleInfo(descriptionFormat='Raw Data', filePath=rawDataPath, parallelise=True, cachePath=os.path.join(rawDataPath, 'metadataCache.json'))
 		"""
 
 		if descriptionFormat == 'Filenames':
@@ -511,11 +537,16 @@ class MSDataset(Dataset):
 			self._getSampleMetadataFromFilename(filenameSpec)
 		elif descriptionFormat == 'Batches':
 			self._fillBatches()
+		elif descriptionFormat == 'Raw Data':
+			self._getSampleMetadataFromRawData(filePath, **kwargs)
 		else:
 			super().addSampleInfo(descriptionFormat=descriptionFormat, filePath=filePath, filenameSpec=filenameSpec, **kwargs)
 
+		# Roles may have been set in place
+		self._roleMasks = None
+
 
-	def _loadQIDataset(self, path):
+	def _loadQIDataset(self, path, streaming=False, chunkSize=10000, dtype=float, memmapPath=None):
 
 		# Get index positions for QIs data blocks
 		dataT = pandas.read_csv(path, index_col=0, header=[0], nrows=1)
@@ -524,6 +555,30 @@ class MSDataset(Dataset):
 
 		dataSize = endIndex - startIndex
 
+		if streaming:
+			columns = list(range(endIndex+1, endIndex+dataSize+1))
+			sampleNames = pandas.read_csv(path, header=2, nrows=0).columns[columns]
+
+			featureColumns = {'Compound': 'Feature Name', 'm/z': 'm/z', 'Retention time (min)': 'Retention Time',
+							  'Chromatographic peak width (min)': 'Peak Width', 'Isotope Distribution': 'Isotope Distribution',
+							  'Adducts': 'Adducts'}
+			dataT = pandas.read_csv(path, header=2, usecols=list(featureColumns.keys()),
+									dtype={'Compound': str, 'm/z': float, 'Retention time (min)': float,
+										   'Chromatographic peak width (min)': float, 'Isotope Distribution': str, 'Adducts': str})
+
+			self._intensityData = self._readCSVIntensities(path, columns, dataT.shape[0], chunkSize=chunkSize, dtype=dtype, memmapPath=memmapPath, header=2)
+
+			self.featureMetadata = dataT[list(featureColumns.keys())].rename(columns=featureColumns)
+			self.sampleMetadata['Sample File Name'] = [name[:-2] for name in sampleNames]
+			self.sampleMetadata['AssayRole'] = None#AssayRole.Assay
+			self.sampleMetadata['SampleType'] = None#SampleType.StudySample
+			self.sampleMetadata['Dilution'] = 100
+			self.sampleMetadata['Metadata Available'] = False
+			self.sampleMetadata['Exclusion Details'] = None
+
+			self.Attributes['Log'].append([datetime.now(), 'Progenesis QI dataset streamed from %s' % (path)])
+			return
+
 		# Now read for real
 		dataT = pandas.read_csv(path, header=2)
 		values = dataT.iloc[:,endIndex+1:endIndex+dataSize+1]
@@ -629,7 +684,11 @@ class MSDataset(Dataset):
 
 		self.Attributes['Log'].append([datetime.now(), 'CSV dataset loaded from %s' % (path)])
 
-	def _loadXCMSDataset(self, path, noFeatureParams=14):
+	def _loadXCMSDataset(self, path, noFeatureParams=14, streaming=False, chunkSize=10000, dtype=float, memmapPath=None):
+
+		if streaming:
+			self._loadXCMSDatasetStreaming(path, noFeatureParams=noFeatureParams, chunkSize=chunkSize, dtype=dtype, memmapPath=memmapPath)
+			return
 
 		# Import into dataframe
 		dataT = pandas.read_csv(path, index_col=False)
@@ -657,7 +716,7 @@ class MSDataset(Dataset):
 		if 'name' not in dataT.columns:
 			try:
 				# build feature name by combination of rt and m/z
-				feature_names = [str(round(row['rt'], 2)) + '_' + str(round(row['mz'], 4)) + 'm/z' for idx,row in dataT.iterrows()]
+				feature_names = self._xcmsFeatureNames(dataT['rt'].values, dataT['mz'].values)
 				# insert feature name
 				dataT.insert(0, 'name', feature_names)
 				# rename mz to mzmed like in diffreport
@@ -697,6 +756,102 @@ class MSDataset(Dataset):
 
 		self.Attributes['Log'].append([datetime.now(), 'XCMS dataset loaded from %s' % (path)])
 
+	def _loadXCMSDatasetStreaming(self, path, noFeatureParams=14, chunkSize=10000, dtype=float, memmapPath=None):
+		"""
+		Import an XCMS peak table without holding more than one copy of the intensities in memory, the feature parameters are read first, then the intensities in chunks of *chunkSize* features.
+		"""
+		columns = pandas.read_csv(path, index_col=False, nrows=0).columns
+		sampleNames = columns[noFeatureParams:]
+
+		dataT = pandas.read_csv(path, index_col=False, usecols=list(range(noFeatureParams)), dtype={'name': str})
+
+		# If no feature name is present, assume peakTable was used to derive the dataset and adjust accordingly
+		if 'name' not in dataT.columns:
+			try:
+				# build feature name by combination of rt and m/z
+				feature_names = self._xcmsFeatureNames(dataT['rt'].values, dataT['mz'].values)
+				dataT.insert(0, 'name', feature_names)
+				dataT.rename(columns={'mz': 'mzmed', 'rt': 'rtmed'}, inplace=True)
+			except:
+				raise ValueError('XCMS data frame should be obtained with either peakTable or diffreport methods')
+
+		self._intensityData = self._readCSVIntensities(path, list(range(noFeatureParams, len(columns))), dataT.shape[0], chunkSize=chunkSize, dtype=dtype, memmapPath=memmapPath, index_col=False)
+
+		featureColumns = {'name': 'Feature Name', 'mzmed': 'm/z', 'rtmed': 'Retention Time', 'mzmin': 'm/z - Minimum', 'mzmax': 'm/z - Maximum',
+						  'rtmin': 'Retention Time - Minimum', 'rtmax': 'Retention Time - Maximum'}
+		self.featureMetadata = dataT[list(featureColumns.keys())].rename(columns=featureColumns)
+		for column in self.featureMetadata.columns[1:]:
+			self.featureMetadata[column] = self.featureMetadata[column].astype(float)
+		self.featureMetadata['Retention Time'] = self.featureMetadata['Retention Time'] / 60.0
+
+		self.sampleMetadata = pandas.DataFrame({'Sample File Name': [os.path.splitext(name)[0] for name in sampleNames]})
+		self.sampleMetadata['AssayRole'] = None#AssayRole.Assay
+		self.sampleMetadata['SampleType'] = None#SampleType.StudySample
+		self.sampleMetadata['Dilution'] = 100
+		self.sampleMetadata['Metadata Available'] = False
+		self.sampleMetadata['Exclusion Details'] = None
+
+		self.Attributes['Log'].append([datetime.now(), 'XCMS dataset streamed from %s' % (path)])
+
+	@staticmethod
+	def _xcmsFeatureNames(rt, mz):
+		"""
+		Build 'rt_mzm/z' feature names for an XCMS peakTable, formatting whole columns at once.
+
+		Values are rounded to 2 (retention time) and 4 (m/z) decimals, and printed as ``str(round(x, n))`` would.
+
+		:param numpy.ndarray rt: Retention times
+		:param numpy.ndarray mz: m/z values
+		:return: Feature names
+		:rtype: list of str
+		"""
+		rt = numpy.round(numpy.asarray(rt, dtype=float), 2).astype(str)
+		mz = numpy.round(numpy.asarray(mz, dtype=float), 4).astype(str)
+
+		return numpy.char.add(numpy.char.add(rt, '_'), numpy.char.add(mz, 'm/z')).tolist()
+
+	def _readCSVIntensities(self, path, columns, noFeatures, chunkSize=10000, dtype=float, memmapPath=None, **kwargs):
+		"""
+		Read the intensity *columns* of a csv export with one feature per row, *chunkSize* rows at a time, into a preallocated samples × features matrix.
+
+		:param str path: Path to the csv file
+		:param list columns: Positions of the intensity columns, one per sample
+		:param int noFeatures: Number of feature rows in the file
+		:param int chunkSize: Number of rows to parse at once
+		:param dtype: Floating point type of the matrix
+		:param memmapPath: If not ``None``, back the matrix with a memory-mapped ``.npy`` file created at this path
+		:type memmapPath: None or str
+		:param kwargs: Passed to :py:func:`pandas.read_csv`
+		:return: Intensity matrix
+		:rtype: numpy.ndarray
+		:raises TypeError: if *dtype* is not a floating point type, or *chunkSize* is not an int
+		:raises ValueError: if *chunkSize* is less than one, or the file does not contain *noFeatures* rows
+		"""
+		if numpy.dtype(dtype).kind != 'f':
+			raise TypeError('dtype must be a floating point type, %s provided' % (str(dtype)))
+		if not isinstance(chunkSize, int) or isinstance(chunkSize, bool):
+			raise TypeError('chunkSize must be an int, %s provided' % (type(chunkSize)))
+		if chunkSize < 1:
+			raise ValueError('chunkSize must be a positive integer, %i provided' % (chunkSize))
+
+		if memmapPath is None:
+			intensityData = numpy.empty((len(columns), noFeatures), dtype=dtype)
+		else:
+			intensityData = numpy.lib.format.open_memmap(memmapPath, mode='w+', dtype=dtype, shape=(len(columns), noFeatures))
+
+		start = 0
+		for chunk in pandas.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunkSize, **kwargs):
+			stop = start + chunk.shape[0]
+			if stop > noFeatures:
+				raise ValueError('More than %i feature rows in %s' % (noFeatures, path))
+			intensityData[:, start:stop] = chunk.values.T
+			start = stop
+
+		if start != noFeatures:
+			raise ValueError('Expected %i feature rows in %s, %i read' % (noFeatures, path, start))
+
+		return intensityData
+
 	def _loadBiocratesDataset(self, path, noSampleParams=15, sheetName='Data Export'):
 
 		# Read in data
@@ -859,16 +1014,23 @@ class MSDataset(Dataset):
 		self.Attributes['Log'].append([datetime.now(), 'Metaboscape dataset loaded from %s' % (path)])
 
 
-	def _getSampleMetadataFromRawData(self, rawDataPath):
+	def _getSampleMetadataFromRawData(self, rawDataPath, parallelise=False, workers=None, cachePath=None):
 		"""
 		Pull metadata out of raw experiment files.
+
+		:param str rawDataPath: Path to folder of raw data
+		:param bool parallelise: If ``True`` read raw data in a pool of worker threads
+		:param workers: Number of worker threads to use when *parallelise* is ``True``
+		:type workers: None or int
+		:param cachePath: Path of a file to cache metadata in, if ``None`` do not cache
+		:type cachePath: None or str
 		"""
 		# Validate inputs
 		if not os.path.isdir(rawDataPath):
 			raise ValueError('No directory found at %s' % (rawDataPath))
 
 		# Infer data format here - for now assume Waters RAW.
-		instrumentParams = getSampleMetadataFromWatersRawFiles(rawDataPath)
+		instrumentParams = getSampleMetadataFromWatersRawFiles(rawDataPath, parallelise=parallelise, workers=workers, cachePath=cachePath)
 
 		# Store the location
 		# Appending is supported to allow reading from multiple folders and directories
@@ -941,83 +1103,9 @@ class MSDataset(Dataset):
 		# Strip any whitespace from 'Sample File Name'
 		self.sampleMetadata['Sample File Name'] = self.sampleMetadata['Sample File Name'].str.strip()
 
-		# Break filename down into constituent parts.
-		baseNameParser = re.compile(filenameSpec, re.VERBOSE)
-		fileNameParts = self.sampleMetadata['Sample File Name'].str.extract(baseNameParser, expand=False)
-
-		# Deal with badly ordered exclusions
-		fileNameParts['exclusion'].loc[fileNameParts['exclusion2'].isnull() == False] = fileNameParts['exclusion2'].loc[fileNameParts['exclusion2'].isnull() == False]
-		fileNameParts.drop('exclusion2', axis=1, inplace=True)
-
-		# Pass masks into enum fields
-		fileNameParts.loc[:,'AssayRole'] = AssayRole.Assay
-		fileNameParts.loc[fileNameParts['reference'] == 'SR', 'AssayRole'] = AssayRole.PrecisionReference
-		fileNameParts.loc[fileNameParts['baseName'].str.match('.+[B]\d+?[SE]\d+?', na=False).astype(bool), 'AssayRole'] = AssayRole.PrecisionReference
-		fileNameParts.loc[fileNameParts['reference'] == 'LTR', 'AssayRole'] = AssayRole.PrecisionReference
-		fileNameParts.loc[fileNameParts['reference'] == 'MR', 'AssayRole'] = AssayRole.PrecisionReference
-		fileNameParts.loc[fileNameParts['injectionKind'] == 'SRD', 'AssayRole'] = AssayRole.LinearityReference
-		fileNameParts.loc[fileNameParts['groupingKind'].str.match('Blank', na=False).astype(bool), 'AssayRole'] = AssayRole.LinearityReference
-		fileNameParts.loc[fileNameParts['groupingKind'].str.match('E?IC', na=False).astype(bool), 'AssayRole'] = AssayRole.Assay
-
-		fileNameParts.loc[:,'SampleType'] = SampleType.StudySample
-		fileNameParts.loc[fileNameParts['reference'] == 'SR', 'SampleType'] = SampleType.StudyPool
-		fileNameParts.loc[fileNameParts['baseName'].str.match('.+[B]\d+?[SE]\d+?', na=False).astype(bool), 'SampleType'] = SampleType.StudyPool
-		fileNameParts.loc[fileNameParts['reference'] == 'LTR', 'SampleType'] = SampleType.ExternalReference
-		fileNameParts.loc[fileNameParts['reference'] == 'MR', 'SampleType'] = SampleType.MethodReference
-		fileNameParts.loc[fileNameParts['injectionKind'] == 'SRD', 'SampleType'] = SampleType.StudyPool
-		fileNameParts.loc[fileNameParts['groupingKind'].str.match('Blank', na=False).astype(bool), 'SampleType'] = SampleType.ProceduralBlank
-		fileNameParts.loc[fileNameParts['groupingKind'].str.match('E?IC', na=False).astype(bool), 'SampleType'] = SampleType.StudyPool
-
-		# Skipped runs
-		fileNameParts['Skipped'] = fileNameParts['exclusion'].str.match('[Xx]', na=False)
-
-		# Get matrix
-		fileNameParts['Matrix'] = fileNameParts['groupingKind'].str.extract('^([AC-Z]{1,2})(?<!IC)$', expand=False)
-		fileNameParts['Matrix'].fillna('', inplace=True)
-
-		# Get well numbers
-		fileNameParts.loc[fileNameParts['groupingKind'].str.match('Blank|E?IC', na=False).astype(bool) ,'injectionNo'] = -1
-		fileNameParts['Well'] = pandas.to_numeric(fileNameParts['injectionNo'])
-
-		# Plate / grouping no
-		fileNameParts['Plate'] = pandas.to_numeric(fileNameParts['groupingNo'])
-
-		# Get batch where it is explicit in file name
-		fileNameParts['Batch'] = pandas.to_numeric(fileNameParts['baseName'].str.extract('B(\d+?)[SE]', expand=False))
-		fileNameParts['Correction Batch'] = numpy.nan
-
-		# Map dilution series names to dilution level
-		fileNameParts['Dilution'] = fileNameParts['baseName'].str.extract('(?:.+_?)(SRD\d\d)(?:_?.*)', expand=False).replace(self.Attributes['dilutionMap'])
-		fileNameParts['Dilution'] = fileNameParts['Dilution'].astype(float)
-
-		# Blank out NAs for neatness
-		fileNameParts['reruns'].fillna('', inplace=True)
-		fileNameParts['extraInjections'].fillna('', inplace=True)
-
-		# Drop unwanted columns
-		fileNameParts.drop(['exclusion', 'reference', 'groupingKind', 'injectionNo', 'injectionKind', 'groupingNo'], axis=1, inplace=True)
-
-		# Swap in user friendly file names
-		fileNameParts.rename(columns={'chromatography': 'Chromatography'}, inplace=True)
-		fileNameParts.rename(columns={'instrument': 'Instrument'}, inplace=True)
-		fileNameParts.rename(columns={'study': 'Study'}, inplace=True)
-		fileNameParts.rename(columns={'baseName': 'Sample Base Name'}, inplace=True)
-		fileNameParts.rename(columns={'fileName': 'Sample File Name'}, inplace=True)
-		fileNameParts.rename(columns={'suplementalInfo': 'Suplemental Info'}, inplace=True)
-		fileNameParts.rename(columns={'ionisation': 'Ionisation'}, inplace=True)
-		fileNameParts.rename(columns={'extraInjections': 'Suplemental Injections'}, inplace=True)
-		fileNameParts.rename(columns={'reruns': 'Re-Run'}, inplace=True)
-
-		# Merge metadata back into the sampleInfo table.
-		# first remove duplicate columns (from _dataset _init_)
-		if 'AssayRole' in self.sampleMetadata.columns: self.sampleMetadata.drop(['AssayRole'], axis=1, inplace=True)
-		if 'SampleType' in self.sampleMetadata.columns: self.sampleMetadata.drop(['SampleType'], axis=1, inplace=True)
-		if 'Sample Base Name' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Sample Base Name'], axis=1, inplace=True)
-		if 'Dilution' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Dilution'], axis=1, inplace=True)
-		if 'Batch' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Batch'], axis=1, inplace=True)
-		if 'Correction Batch' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Correction Batch'], axis=1, inplace=True)
-		# merge
-		self.sampleMetadata = pandas.merge(self.sampleMetadata, fileNameParts, left_on='Sample File Name', right_on='Sample File Name', how='left', sort=False)
+		# Break filename down into constituent parts, and merge metadata back into the sampleInfo table.
+		fileNameParts = _parseFilenames(self.sampleMetadata['Sample File Name'], filenameSpec, self.Attributes['dilutionMap'])
+		self.sampleMetadata = _mergeFilenameMetadata(self.sampleMetadata, fileNameParts)
 
 		# Add 'Exclusion Details' column
 		self.sampleMetadata['Exclusion Details'] = ''
@@ -1047,31 +1135,39 @@ class MSDataset(Dataset):
 			warnings.warn('Unable to infer batches without run order, skipping.')
 		else:
 			self.__corrExclusions = None
-			currentBatch = 0
-			dilutionSeries = 0
-			contiguousDilution = False
-			# Loop over samples in run order
-			for index, row in self.sampleMetadata.sort_values(by='Run Order').iterrows():
-				nameComponents = batchRE.search(row['Sample File Name'])
-				if nameComponents:
-					# Batch start
-					if nameComponents.group('startend') == 'S':
-						# New batch - increment batch no
-						if nameComponents.group('sequence') == '1':
-							currentBatch = currentBatch + 1
-
-				# Don't include the dilution series or blanks
-				if not ((row['AssayRole'] == AssayRole.LinearityReference) or (row['SampleType'] == SampleType.ProceduralBlank)):
-					self.sampleMetadata.loc[index, 'Batch'] = currentBatch
-					self.sampleMetadata.loc[index, 'Correction Batch'] = currentBatch
-					contiguousDilution = False
-
-				elif row['AssayRole'] == AssayRole.LinearityReference and row['SampleType'] != SampleType.ProceduralBlank:
-					if not contiguousDilution:
-						dilutionSeries += 1
-						contiguousDilution = True
-
-					self.sampleMetadata.loc[index, 'Dilution Series'] = dilutionSeries
+
+			# Work in run order
+			sampleMetadata = self.sampleMetadata.sort_values(by='Run Order')
+			nameComponents = sampleMetadata['Sample File Name'].str.extract(batchRE)
+
+			# New batch - increment batch no at the start of each sequence
+			batchStarts = (nameComponents['startend'] == 'S') & (nameComponents['sequence'] == '1')
+			batches = numpy.cumsum(batchStarts.values)
+
+			# Don't include the dilution series or blanks
+			linearityReference = (sampleMetadata['AssayRole'] == AssayRole.LinearityReference).values
+			blank = (sampleMetadata['SampleType'] == SampleType.ProceduralBlank).values
+			assay = ~(linearityReference | blank)
+			dilution = linearityReference & ~blank
+
+			# A dilution series is a contiguous run of dilution samples, ignoring any blanks run amongst them
+			contiguous = dilution[assay | dilution]
+			seriesStarts = contiguous & ~numpy.concatenate(([False], contiguous[:-1]))
+			dilutionSeries = numpy.cumsum(seriesStarts)[contiguous]
+
+			# Fill columns in the order samples are encountered in the run, so any new columns are added in that order
+			fill = [(assay, 'Batch', batches[assay]), (assay, 'Correction Batch', batches[assay]), (dilution, 'Dilution Series', dilutionSeries)]
+			fill.sort(key=lambda item: numpy.argmax(item[0]))
+
+			for (mask, column, values) in fill:
+				if any(mask):
+					# Keep the dtypes given by filling one sample at a time, even when every sample is filled
+					if column not in self.sampleMetadata.columns:
+						self.sampleMetadata[column] = numpy.nan
+					if self.sampleMetadata[column].dtype.kind in 'fO':
+						values = values.astype(self.sampleMetadata[column].dtype)
+
+					self.sampleMetadata.loc[sampleMetadata.index[mask], column] = values
 
 
 	def amendBatches(self, sampleRunOrder):
@@ -1107,9 +1203,7 @@ class MSDataset(Dataset):
 			##
 			# If indervidual dilution sereis are not defined, consider all LR samples together
 			##
-			lrMask = numpy.logical_and(self.sampleMetadata['SampleType'] == sampleType,
-									   self.sampleMetadata['AssayRole'] == assayRole)
-			lrMask = numpy.logical_and(lrMask,
+			lrMask = numpy.logical_and(self.roleMasks[sampleType, assayRole],
 									   exclusions)
 
 			if sum(lrMask) == 0:
@@ -1122,25 +1216,18 @@ class MSDataset(Dataset):
 
 		else:
 			##
-			# If sub-series are defined, calcuate corrs for each then average
+			# If sub-series are defined, calcuate corrs for each in one pass over the data, then average
 			##
 			batches = self.sampleMetadata['Dilution Series'].unique()
 			mask = pandas.notnull(batches)
 			batches = batches[mask]
 
-			correlations = numpy.zeros((len(batches), self.noFeatures))
-			index = 0
-			for batch in batches:
-				lrMask = self.sampleMetadata['Dilution Series'].values == batch
-				lrMask = numpy.logical_and(lrMask,
-										   exclusions)
-
-				correlations[index,:] = _vcorrcoef(self._intensityData,
-												   self.sampleMetadata['Dilution'].values,
-												   method=method,
-												   sampleMask=lrMask)
+			lrMasks = [numpy.logical_and(self.sampleMetadata['Dilution Series'].values == batch, exclusions) for batch in batches]
 
-				index += 1
+			correlations = _vcorrcoefByGroup(self._intensityData,
+											 self.sampleMetadata['Dilution'].values,
+											 lrMasks,
+											 method=method)
 
 			returnValues = numpy.mean(correlations, axis=0)
 
@@ -1151,7 +1238,7 @@ class MSDataset(Dataset):
 		return returnValues
 
 
-	def __generateArtifactualLinkageMatrix(self,corrOnly=False):
+	def __generateArtifactualLinkageMatrix(self,corrOnly=False,removedSamples=None):
 		""" Identify potentially artifactual features, generate the linkage between similar features
 			input:
 				msDataset
@@ -1159,6 +1246,7 @@ class MSDataset(Dataset):
 				deltaOverlap			  minimum peak overlap between two grouped features
 				deltaCorr				 minimum correlation between two grouped features
 				corrOnly				  recalculate the correlation but not the overlap
+				removedSamples			intensities of the samples deleted since the last call, if given with corrOnly the correlations are downdated instead of recalculated
 			output:
 				artifactualLinkageMatrix  feature pairs (row)(feature index), feature1-feature2 (col)
 			raise:
@@ -1167,6 +1255,7 @@ class MSDataset(Dataset):
 		"""
 		def find_similar_peakwidth(featureMetadata,deltaMZ,deltaOverlap):
 			"""Find 'identical' features based on m/z and peakwidth overlap
+				Candidate pairs are generated by a sweep over the features sorted by m/z, so only features within deltaMZ of each other are compared
 				input:
 					featureMetada   msDataset.featureMetadata
 					deltaMZ		 m/z distance to consider two features identical [ <= ] (same unit as m/z)
@@ -1174,40 +1263,54 @@ class MSDataset(Dataset):
 				output:
 					pandas.DataFrame listing matched features based on deltaMZ and deltaOverlap
 			"""
-			def get_match(i,ds,deltaMZ):
-				"""Find identical features for a given variable
-					output:
-						pandas.DataFrames listing the matching features based overlap of peakwidth
-				"""
-				match = (abs(ds.loc[i,'Retention Time']-ds.loc[:,'Retention Time']) <= (ds.loc[i,'Peak Width']+ds.loc[:,'Peak Width'])/2) & (abs(ds.loc[i,'m/z']-ds.loc[:,'m/z']) <= deltaMZ)	 # find match
-				return( pandas.DataFrame(data = {'node1': ds.index[i], 'node2': ds.index[match], 'Peak Overlap': ((((ds.loc[i,'Peak Width']+ds.loc[match,'Peak Width'])/2)-abs(ds.loc[i,'Retention Time']-ds.loc[match,'Retention Time']))/((ds.loc[i,'Peak Width']+ds.loc[match,'Peak Width'])/2))*100 } ) )  # return the matching rows
-
-			# get feature overlap
-			ds	  = featureMetadata[['Feature Name','Retention Time','m/z','Peak Width']]
-			# By concatenating all the matches once, save ~22% compared to do it at each loop round
-			matches = [ get_match(i,ds,deltaMZ) for i in range(ds.shape[0]) ] # get a list of matches
-			res	 = pandas.concat(matches)
-			res	 = res.loc[ res.node1 < res.node2 ]	  # keeps feat1-feat2, removes feat1-feat1 and feat2-feat1
+			mz	  = featureMetadata['m/z'].values.astype(float)
+			rt	  = featureMetadata['Retention Time'].values.astype(float)
+			width   = featureMetadata['Peak Width'].values.astype(float)
+			labels  = featureMetadata.index.values
+
+			# sort by m/z, the features following each one within deltaMZ (plus rounding slack, the exact test is applied below) are its candidates
+			mzOrder  = numpy.argsort(mz, kind='mergesort')
+			sortedMZ = mz[mzOrder]
+			upper	= numpy.searchsorted(sortedMZ, sortedMZ + deltaMZ + 1e-9 * (numpy.abs(sortedMZ) + abs(deltaMZ)), side='right')
+			counts   = numpy.maximum(upper - numpy.arange(1, len(mzOrder) + 1), 0)
+
+			first  = numpy.repeat(numpy.arange(len(mzOrder)), counts)
+			second = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts) + first + 1
+			first  = mzOrder[first]
+			second = mzOrder[second]
+
+			# same tests as comparing every feature to all others
+			halfWidth = (width[first] + width[second]) / 2
+			rtDist	= abs(rt[first] - rt[second])
+			match	 = (rtDist <= halfWidth) & (abs(mz[first] - mz[second]) <= deltaMZ) & (labels[first] != labels[second])
+			overlap   = ((halfWidth - rtDist) / halfWidth) * 100
 
 			#filter interactions by overlap
-			res	 = res.loc[ res.loc[:,'Peak Overlap']>=deltaOverlap, ['node1','node2'] ]
-			res.reset_index( drop=True, inplace=True )
+			match  = match & (overlap >= deltaOverlap)
+			first  = first[match]
+			second = second[match]
+
+			# keeps feat1-feat2 (node1 < node2), ordered as feat1 then feat2 appear in featureMetadata
+			swap   = labels[second] < labels[first]
+			node1  = numpy.where(swap, second, first)
+			node2  = numpy.where(swap, first, second)
+			order  = numpy.lexsort((node2, node1))
+
+			res = pandas.DataFrame(data = {'node1': labels[node1[order]], 'node2': labels[node2[order]]})
 
 			return( res )
 		# end find_similar_peakwidth
 
-		def remove_min_corr_overlap(overlappingFeatures,intensityData,corrCutoff):
-			""" Return the overlap match DataFrame with overlap of metabolites correlated < cut-off removed (and correlation added)
+		def remove_min_corr_overlap(overlappingFeatures,linkCorrelation,corrCutoff):
+			""" Return the overlap match DataFrame with overlap of metabolites correlated < cut-off removed
 				input:
 					overlappingFeatures pandas.DataFrame as generated by find_similar_peakwidth
-					intensityData	   pandas.DataFrame of data value for each sample (row) / feature (column)
+					linkCorrelation	 _PairedCorrelation of the intensity data for each pair in overlappingFeatures
 					corrCutoff		  minimum percentage of overlap (0-1)
 				output:
 					overlapping features filtered
 			"""
-			link_corr = numpy.zeros([overlappingFeatures.shape[0]])
-			for jrow in range(0,len(link_corr)):
-				link_corr[jrow] = numpy.corrcoef( intensityData[:,overlappingFeatures.loc[jrow,'node1']], intensityData[:,overlappingFeatures.loc[jrow,'node2']])[0,1]
+			link_corr = linkCorrelation.correlation()
 
 			return( overlappingFeatures.loc[ link_corr>=corrCutoff, ] )
 		# end remove_min_corr_overlap
@@ -1230,7 +1333,19 @@ class MSDataset(Dataset):
 
 		if ((not corrOnly) | (corrOnly & self._tempArtifactualLinkageMatrix.empty)):
 			self._tempArtifactualLinkageMatrix = find_similar_peakwidth(featureMetadata=self.featureMetadata, deltaMZ=self.Attributes['filterParameters']['deltaMzArtifactual'], deltaOverlap=self.Attributes['filterParameters']['overlapThresholdArtifactual'])
-		artifactualLinkageMatrix = remove_min_corr_overlap(self._tempArtifactualLinkageMatrix, self._intensityData, self.Attributes['filterParameters']['corrThresholdArtifactual'])
+			self._artifactualLinkageCorrelation = None
+
+		# when only samples were removed, subtract their contribution from the correlation sums rather than recalculating
+		linkCorrelation = self._artifactualLinkageCorrelation
+		downdated = False
+		if corrOnly and (removedSamples is not None) and (linkCorrelation is not None):
+			if linkCorrelation.noRows - removedSamples.shape[0] == self._intensityData.shape[0]:
+				downdated = linkCorrelation.removeRows(removedSamples)
+		if not downdated:
+			linkCorrelation = _PairedCorrelation(self._intensityData, self._tempArtifactualLinkageMatrix['node1'].values, self._tempArtifactualLinkageMatrix['node2'].values)
+			self._artifactualLinkageCorrelation = linkCorrelation
+
+		artifactualLinkageMatrix = remove_min_corr_overlap(self._tempArtifactualLinkageMatrix, linkCorrelation, self.Attributes['filterParameters']['corrThresholdArtifactual'])
 
 		return(artifactualLinkageMatrix)
 
@@ -1253,29 +1368,68 @@ class MSDataset(Dataset):
 		# if no featureMask provided, get the one from the msDataset (faster for reportType='feature selection')
 		if featMask is not None:
 			assert ((type(featMask[0])==numpy.bool_) and (featMask.shape == self.featureMask.shape)), 'check featMask'
-			newFeatureMask = copy.deepcopy(featMask)
+			newFeatureMask = numpy.copy(featMask)
 		else:
-			newFeatureMask = copy.deepcopy(self.featureMask)
+			newFeatureMask = numpy.copy(self.featureMask)
+
+		# remove links to features previously filtered (in newFeatMask)
+		node1 = numpy.asarray(self.artifactualLinkageMatrix['node1'].values, dtype=numpy.intp)
+		node2 = numpy.asarray(self.artifactualLinkageMatrix['node2'].values, dtype=numpy.intp)
+		kept = newFeatureMask[node1] & newFeatureMask[node2]
+		node1 = node1[kept]
+		node2 = node2[kept]
+
+		if node1.shape[0] == 0:
+			return(newFeatureMask)
 
-		# remove features in LinkageMatrix previously filtered (in newFeatMask)
-		tmpLinkage		 = copy.deepcopy(self.artifactualLinkageMatrix)
-		keptPreviousFilter = self.featureMetadata.index[newFeatureMask]	 # index of previously kept features
-		tmpLinkage		 = tmpLinkage[tmpLinkage.node1.isin(keptPreviousFilter) & tmpLinkage.node2.isin(keptPreviousFilter)]
+		# label clusters of linked features
+		graph = scipy.sparse.coo_matrix((numpy.ones(node1.shape[0], dtype=bool), (node1, node2)), shape=(self.noFeatures, self.noFeatures))
+		(noClusters, clusters) = connected_components(graph, directed=False)
 
-		meanIntensity = self._intensityData.mean(axis=0)
+		nodes = numpy.union1d(node1, node2)
+		clusters = clusters[nodes]
+		meanIntensity = self._intensityData[:, nodes].mean(axis=0)
 
-		# make graphs
-		g = networkx.from_pandas_edgelist(df=tmpLinkage, source='node1', target='node2') #, edge_attr=True)
-		graphs = list((g.subgraph(c).copy() for c in networkx.connected_components(g)))  # a list of clusters
+		# update FeatureMask with features to remove (all but max intensity), ranking NaN highest and ties by index, as numpy.argmax
+		missing = numpy.isnan(meanIntensity)
+		order = numpy.lexsort((nodes, -numpy.where(missing, 0, meanIntensity), ~missing, clusters))
+		first = numpy.ones(order.shape[0], dtype=bool)
+		first[1:] = clusters[order[1:]] != clusters[order[:-1]]
 
-		# update FeatureMask with features to remove (all but max intensity)
-		for i in range(0,len(graphs)):
-			newFeatureMask[list(graphs[i].nodes)] = False												 # remove  all nodes in a cluster
-			newFeatureMask[list(graphs[i].nodes)[meanIntensity[list(graphs[i].nodes)].argmax()]] = True   # keep max intensity
+		newFeatureMask[nodes] = False								# remove  all nodes in a cluster
+		newFeatureMask[nodes[order[first]]] = True					# keep max intensity
 
 		return(newFeatureMask)
 
 
+	def thresholdSweep(self, withArtifactualFiltering=False):
+		"""
+		Build a :py:class:`~nPYc.utilities.ThresholdSweep`, to count the features that would pass :py:meth:`updateMasks` over grids of RSD, correlation to dilution, variance ratio and blank thresholds without refiltering the dataset each time::
+
+			sweep = msData.thresholdSweep()
+			sweep.count(rsdThreshold=[20, 30], corrThreshold=numpy.arange(0.5, 1.01, 0.05), varianceRatio=1.1)
+
+		Features are counted from those not excluded by the user, as when :py:meth:`updateMasks` regenerates :py:attr:`~Dataset.featureMask`.
+
+		:param bool withArtifactualFiltering: If ``True`` include :py:attr:`artifactualLinkageMatrix`, so that linked features can be counted as one
+		:return: Threshold sweep over the features in the dataset
+		:rtype: nPYc.utilities.ThresholdSweep
+		"""
+
+		# Blanks are only compared when two or more are present, as in updateMasks
+		if sum(self.roleMasks[SampleType.ProceduralBlank, None]) >= 2:
+			blankLevels = _blankLevels(self)
+		else:
+			blankLevels = None
+
+		return ThresholdSweep(self.correlationToDilution,
+							  self.rsdSP,
+							  rsdSS=self.rsdSS,
+							  featureMask=~self.featureMetadata['User Excluded'].values,
+							  blankLevels=blankLevels,
+							  linkage=self.artifactualLinkageMatrix if withArtifactualFiltering else None)
+
+
 	def extractRTslice(msrun, target_rt):
 		pass
 
@@ -1306,19 +1460,9 @@ class MSDataset(Dataset):
 			self.featureMetadata['Exclusion Details'] = ''
 
 		if self.VariableType == VariableType.Discrete:
-			for feature in featureList:
-				if feature in self.featureMetadata[on].unique():
-					self.featureMask[self.featureMetadata[self.featureMetadata[on] == feature].index] = False
-					self.featureMetadata.loc[self.featureMetadata[on] == feature, 'User Excluded'] = True
-					if (self.featureMetadata.loc[self.featureMetadata[on] == feature, 'Exclusion Details'].values == ''):
-						self.featureMetadata.loc[self.featureMetadata[on] == feature, 'Exclusion Details'] = message
-					else:
-						self.featureMetadata.loc[self.featureMetadata[on] == feature, 'Exclusion Details'] = \
-						self.featureMetadata.loc[
-							self.featureMetadata[on] == feature, 'Exclusion Details'] + ' AND ' + message
-				else:
-					# AMtched must be unique.
-					notFound.append(feature)
+			(matched, notFound) = self._matchExclusions(self.featureMetadata, featureList, on, message)
+			self.featureMask[matched] = False
+			self.featureMetadata.loc[matched, 'User Excluded'] = True
 
 		elif self.VariableType == VariableType.Spectral:
 			for chunk in featureList:
@@ -2139,9 +2283,10 @@ class MSDataset(Dataset):
 
 			## List additional attributes (print + log)
 			expectedSet = set({'Attributes', 'VariableType', '_Normalisation', '_name', 'fileName', 'filePath',
-							   '_intensityData', 'sampleMetadata', 'featureMetadata', 'sampleMask',  'featureMask',
+							   '_intensityData', '_sampleMetadata', 'featureMetadata', 'sampleMask',  'featureMask',
 							   'sampleMetadataExcluded', 'intensityDataExcluded', 'featureMetadataExcluded', 'excludedFlag',
-							   'corrExclusions', '_correlationToDilution', '_artifactualLinkageMatrix', '_tempArtifactualLinkageMatrix'})
+							   'corrExclusions', '_correlationToDilution', '_artifactualLinkageMatrix', '_tempArtifactualLinkageMatrix',
+							   '_artifactualLinkageCorrelation', '_intensityDataVersion', '_normalisedIntensityData', '_normalisationCacheInfo', '_featureIndex', '_roleMasks', '_roleStatisticsCache'})
 			objectSet = set(self.__dict__.keys())
 			additionalAttributes = objectSet - expectedSet
 			if len(additionalAttributes) > 0:
@@ -3,12 +3,12 @@ from datetime import datetime
 import pandas
 import numpy
 import numbers
-import re
 import warnings
 
 from ._dataset import Dataset
 from ..enumerations import VariableType, AssayRole, SampleType
 from ..utilities._nmr import qcCheckBaseline, qcCheckSolventPeak
+from ..utilities._filenameParser import _extractFilenameParts
 from plotly.offline import iplot
 
 
@@ -26,14 +26,20 @@ class NMRDataset(Dataset):
 	* BI-LISA
 		BI-LISA data can be read from Excel workbooks, the name of the sheet containing the data to be loaded should be passed in the *pulseProgram* argument. Feature descriptors will be loaded from the 'Analytes' sheet, and file names converted back to the `ExperimentName/expno` format from `ExperimentName_EXPNO_expno`.
 
+	* HDF5
+		Reopens a dataset saved with :py:meth:`~Dataset.exportDataset` and ``saveFormat='HDF5'``. Subsets of the stored spectra or of the spectral points may be loaded by passing boolean masks or lists of positions as ``samples=`` and ``features=``, and ``mmap=True`` memory-maps an uncompressed intensity matrix instead of reading it.
+
 	:param str fileType: Type of data to be loaded
 	:param str sheetname: Load data from the specifed sheet of the Excel workbook
 	:param str pulseprogram: When loading raw data, only import spectra aquired with *pulseprogram*
+	:param bool parallelise: When loading raw data, if ``True`` read and process spectra in a pool of worker processes
+	:param workers: Number of worker processes to use when *parallelise* is ``True``, if ``None`` use one less than the number of CPU cores
+	:type workers: None or int
 	"""
 
 	__importTypes = ['Bruker'] # Raw data types we understand
 
-	def __init__(self, datapath, fileType='Bruker', pulseProgram='noesygppr1d', sop='GenericNMRurine', pdata=1, **kwargs):
+	def __init__(self, datapath, fileType='Bruker', pulseProgram='noesygppr1d', sop='GenericNMRurine', pdata=1, parallelise=False, workers=None, **kwargs):
 		"""
 		NMRDataset(datapath, fileType='Bruker', sop='GenericNMRurine', pulseprogram='noesygpp1d', **kwargs)
 
@@ -47,6 +53,9 @@ class NMRDataset(Dataset):
 		:param str fileType: Type of data to be loaded
 		:param str sheetname: Load data from the specifed sheet of the Excel workbook
 		:param str pulseprogram: When loading raw data, only import spectra aquired with *pulseprogram*
+		:param bool parallelise: When loading raw data, if ``True`` read and process spectra in a pool of worker processes
+		:param workers: Number of worker processes to use when *parallelise* is ``True``, if ``None`` use one less than the number of CPU cores
+		:type workers: None or int
 		"""
 		super().__init__(sop=sop, **kwargs)
 
@@ -78,7 +87,9 @@ class NMRDataset(Dataset):
 			(self._intensityData, ppm, self.sampleMetadata) = importBrukerSpectra(datapath,
 																				  pulseProgram,
 																				  pdata,
-																				  self.Attributes)
+																				  self.Attributes,
+																				  parallelise=parallelise,
+																				  workers=workers)
 			self.featureMetadata = pandas.DataFrame(ppm, columns=['ppm'])
 
 			##
@@ -114,6 +125,10 @@ class NMRDataset(Dataset):
 			(self.name, self.intensityData, self.featureMetadata, self.sampleMetadata) = self._initialiseFromCSV(datapath)
 			self.VariableType = VariableType.Spectral
 			self.initialiseMasks()
+		elif fileType.lower() == 'hdf5':
+			self._loadHDF5Dataset(datapath, **{key: kwargs[key] for key in ['samples', 'features', 'mmap'] if key in kwargs})
+			if 'ppm' in self.featureMetadata.columns:
+				self._scale = self.featureMetadata['ppm'].values
 		elif fileType == 'empty':
 			# Lets us build an empty object for testing &c
 			pass
@@ -153,6 +168,9 @@ class NMRDataset(Dataset):
 		else:
 			super().addSampleInfo(descriptionFormat=descriptionFormat, filePath=filePath, filenameSpec=filenameSpec, **kwargs)
 
+		# Roles may have been set in place
+		self._roleMasks = None
+
 
 	def _matchDatasetToLIMS(self, pathToLIMSfile):
 		"""
@@ -200,8 +218,7 @@ class NMRDataset(Dataset):
 		"""
 
 		# Break filename down into constituent parts.
-		baseNameParser = re.compile(filenameSpec, re.VERBOSE)
-		fileNameParts = self.sampleMetadata['Sample File Name'].str.extract(baseNameParser, expand=False)
+		fileNameParts = _extractFilenameParts(self.sampleMetadata['Sample File Name'], filenameSpec)
 
 		self.sampleMetadata['Rack'] = fileNameParts['rack'].astype(int, errors='ignore')
 		self.sampleMetadata['Study'] = fileNameParts['study']
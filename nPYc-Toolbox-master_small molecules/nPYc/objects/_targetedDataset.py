@@ -12,7 +12,8 @@ import collections
 import warnings
 from .._toolboxPath import toolboxPath
 from ._dataset import Dataset
-from ..utilities import normalisation, rsd
+from ..utilities import normalisation
+from ..utilities._filenameParser import _parseFilenames, _mergeFilenameMetadata
 from ..enumerations import VariableType, AssayRole, SampleType, QuantificationType, CalibrationMethod, AnalyticalPlatform
 
 
@@ -232,38 +233,40 @@ class TargetedDataset(Dataset):
         Returns percentage :term:`relative standard deviations<RSD>` for each feature in the dataset, calculated on samples with the Assay Role :py:attr:`~nPYc.enumerations.AssayRole.PrecisionReference` and Sample Type :py:attr:`~nPYc.enumerations.SampleType.StudyPool` in :py:attr:`~Dataset.sampleMetadata`.
         Implemented as a back-up to :py:Meth:`accuracyPrecision` when no expected concentrations are known
 
+        RSDs are calculated once, and kept until :py:attr:`~Dataset.intensityData` is replaced or :py:attr:`~Dataset.sampleMask` or the roles of samples change.
+
         :return: Vector of feature RSDs
         :rtype: numpy.ndarray
         """
         # Check we have Study Reference samples defined
         if not ('AssayRole' in self.sampleMetadata.keys() or 'SampleType' in self.sampleMetadata.keys()):
             raise ValueError('Assay Roles and Sample Types must be defined to calculate RSDs.')
-        if not sum(self.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference) > 1:
+        if not sum(self.roleMasks[None, AssayRole.PrecisionReference]) > 1:
             raise ValueError('More than one precision reference is required to calculate RSDs.')
 
-        mask = numpy.logical_and(self.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference,
-                                 self.sampleMetadata['SampleType'].values == SampleType.StudyPool)
+        (mean, std, rsdSP) = self._roleStatistics([(SampleType.StudyPool, AssayRole.PrecisionReference)])[0]
 
-        return rsd(self._intensityData[mask & self.sampleMask])
+        return rsdSP.copy()
 
     @property
     def rsdSS(self):
         """
         Returns percentage :term:`relative standard deviations<RSD>` for each feature in the dataset, calculated on samples with the Assay Role :py:attr:`~nPYc.enumerations.AssayRole.Assay` and Sample Type :py:attr:`~nPYc.enumerations.SampleType.StudySample` in :py:attr:`~Dataset.sampleMetadata`.
 
+        RSDs are calculated once, and kept until :py:attr:`~Dataset.intensityData` is replaced or :py:attr:`~Dataset.sampleMask` or the roles of samples change.
+
         :return: Vector of feature RSDs
         :rtype: numpy.ndarray
         """
         # Check we have Study Reference samples defined
         if not ('AssayRole' in self.sampleMetadata.keys() or 'SampleType' in self.sampleMetadata.keys()):
             raise ValueError('Assay Roles and Sample Types must be defined to calculate RSDs.')
-        if not sum(self.sampleMetadata['AssayRole'].values == AssayRole.Assay) > 1:
+        if not sum(self.roleMasks[None, AssayRole.Assay]) > 1:
             raise ValueError('More than one assay sample is required to calculate RSDs.')
 
-        mask = numpy.logical_and(self.sampleMetadata['AssayRole'].values == AssayRole.Assay,
-                                 self.sampleMetadata['SampleType'].values == SampleType.StudySample)
+        (mean, std, rsdSS) = self._roleStatistics([(SampleType.StudySample, AssayRole.Assay)])[0]
 
-        return rsd(self._intensityData[mask & self.sampleMask])
+        return rsdSS.copy()
 
     def _loadTargetLynxDataset(self, datapath, calibrationReportPath, keepIS=False, noiseFilled=False, keepPeakInfo=False, keepExcluded=False, **kwargs):
         """
@@ -1952,9 +1955,10 @@ class TargetedDataset(Dataset):
 
         ## unexpected attributes
         expectedAttr = {'Attributes', 'VariableType', 'AnalyticalPlatform', '_Normalisation', '_name', 'fileName', 'filePath',
-                        '_intensityData', 'sampleMetadata', 'featureMetadata', 'expectedConcentration','sampleMask',
+                        '_intensityData', '_sampleMetadata', 'featureMetadata', 'expectedConcentration','sampleMask',
                         'featureMask', 'calibration', 'sampleMetadataExcluded', 'intensityDataExcluded',
-                        'featureMetadataExcluded', 'expectedConcentrationExcluded', 'excludedFlag'}
+                        'featureMetadataExcluded', 'expectedConcentrationExcluded', 'excludedFlag',
+                        '_intensityDataVersion', '_normalisedIntensityData', '_normalisationCacheInfo', '_featureIndex', '_roleMasks', '_roleStatisticsCache'}
         selfAttr = set(self.__dict__.keys())
         selfAdditional = selfAttr - expectedAttr
         otherAttr = set(other.__dict__.keys())
@@ -2065,19 +2069,26 @@ class TargetedDataset(Dataset):
             print('Limits of quantification merged to the highest LLOQ and lowest ULOQ across batch')
 
 
-    def exportDataset(self, destinationPath='.', saveFormat='CSV', withExclusions=True, escapeDelimiters=False, filterMetadata=True):
+    def exportDataset(self, destinationPath='.', saveFormat='CSV', withExclusions=True, escapeDelimiters=False, filterMetadata=True, compression=None, parallelise=False, workers=None):
         """
         Calls :py:meth:`~Dataset.exportDataset` and raises a warning if normalisation is employed as :py:class:`TargetedDataset` :py:attr:`intensityData` can be left-censored.
+
+        The HDF5 format does not store :py:attr:`expectedConcentration` and :py:attr:`calibration`, and is not available for :py:class:`TargetedDataset`.
+
+        :raises ValueError: if *saveFormat* is 'HDF5'
         """
+        if saveFormat == 'HDF5':
+            raise ValueError('Save format \'HDF5\' is not available for TargetedDataset.')
+
         # handle the dilution due to method... These lines are left here commented - as hopefully this will be handled more
         # elegantly through the intensityData getter
         # Export dataset...
         tmpData = copy.deepcopy(self)
         tmpData._intensityData = tmpData._intensityData * (100/tmpData.sampleMetadata['Dilution']).values[:, numpy.newaxis]
-        super(TargetedDataset, tmpData).exportDataset(destinationPath=destinationPath, saveFormat=saveFormat, withExclusions=withExclusions, escapeDelimiters=escapeDelimiters, filterMetadata=filterMetadata)
+        super(TargetedDataset, tmpData).exportDataset(destinationPath=destinationPath, saveFormat=saveFormat, withExclusions=withExclusions, escapeDelimiters=escapeDelimiters, filterMetadata=filterMetadata, compression=compression, parallelise=parallelise, workers=workers)
 
 
-    def _exportCSV(self, destinationPath, escapeDelimiters=False):
+    def _exportCSV(self, destinationPath, escapeDelimiters=False, compression=None, parallelise=False, workers=None):
         """
         Replace `-numpy.inf` by `<LLOQ` and `numpy.inf` by `>ULOQ`
 
@@ -2088,17 +2099,18 @@ class TargetedDataset(Dataset):
 
         :param str destinationPath: Path to a directory in which the output will be saved
         :param bool escapeDelimiters: Remove characters commonly used as delimiters in csv files from metadata
+        :param compression: If 'gzip' compress the files, and append '.gz' to their names
+        :type compression: None or str
+        :param bool parallelise: If ``True`` format intensities in a pool of worker processes
+        :param workers: Number of worker processes, if ``None`` use one less than the number of CPU cores
+        :type workers: None or int
         :raises IOError: If writing one of the files fails
         """
+        from ..utilities._csvWriter import csvPath, writeIntensityCSV
 
         sampleMetadata = self.sampleMetadata.copy(deep=True)
         featureMetadata = self.featureMetadata.copy(deep=True)
 
-        intensityData = copy.deepcopy(self._intensityData)
-        intensityData = pandas.DataFrame(intensityData)
-        intensityData.replace(to_replace=-numpy.inf, value='<LLOQ', inplace=True)
-        intensityData.replace(to_replace= numpy.inf, value='>ULOQ', inplace=True)
-
         if escapeDelimiters:
             # Remove any commas from metadata/feature tables - for subsequent import of resulting csv files to other software packages
 
@@ -2117,16 +2129,17 @@ class TargetedDataset(Dataset):
                     pass
 
         # Export sample metadata
-        sampleMetadata.to_csv(destinationPath + '_sampleMetadata.csv', encoding='utf-8', date_format=self._timestampFormat)
+        sampleMetadata.to_csv(csvPath(destinationPath + '_sampleMetadata.csv', compression), encoding='utf-8', date_format=self._timestampFormat, compression=compression)
 
         # Export feature metadata
-        featureMetadata.to_csv(destinationPath + '_featureMetadata.csv', encoding='utf-8')
+        featureMetadata.to_csv(csvPath(destinationPath + '_featureMetadata.csv', compression), encoding='utf-8', compression=compression)
 
         # Export intensity data
-        intensityData.to_csv(os.path.join(destinationPath + '_intensityData.csv'), encoding='utf-8', date_format=self._timestampFormat, header=False, index=False)
+        writeIntensityCSV(destinationPath + '_intensityData.csv', self._intensityData, {-numpy.inf: '<LLOQ', numpy.inf: '>ULOQ'}, dateFormat=self._timestampFormat,
+                          compression=compression, parallelise=parallelise, workers=workers)
 
 
-    def _exportUnifiedCSV(self, destinationPath, escapeDelimiters=False):
+    def _exportUnifiedCSV(self, destinationPath, escapeDelimiters=False, compression=None, parallelise=False, workers=None):
         """
         Replace `-numpy.inf` by `<LLOQ` and `numpy.inf` by `>ULOQ`
 
@@ -2135,17 +2148,18 @@ class TargetedDataset(Dataset):
 
         :param str destinationPath: Path to a directory in which the output will be saved
         :param bool escapeDelimiters: Remove characters commonly used as delimiters in csv files from metadata
+        :param compression: If 'gzip' compress the file, and append '.gz' to its name
+        :type compression: None or str
+        :param bool parallelise: If ``True`` format intensities in a pool of worker processes
+        :param workers: Number of worker processes, if ``None`` use one less than the number of CPU cores
+        :type workers: None or int
         :raises IOError: If writing one of the files fails
         """
+        from ..utilities._csvWriter import writeUnifiedCSV
 
         sampleMetadata = self.sampleMetadata.copy(deep=True)
         featureMetadata = self.featureMetadata.copy(deep=True)
 
-        intensityData = copy.deepcopy(self._intensityData)
-        intensityData = pandas.DataFrame(intensityData)
-        intensityData.replace(to_replace=-numpy.inf, value='<LLOQ', inplace=True)
-        intensityData.replace(to_replace=numpy.inf, value='>ULOQ', inplace=True)
-
         if escapeDelimiters:
             # Remove any commas from metadata/feature tables - for subsequent import of resulting csv files to other software packages
 
@@ -2163,19 +2177,9 @@ class TargetedDataset(Dataset):
                 except:
                     pass
 
-        # Export combined data in single file
-        tmpXCombined = pandas.concat([featureMetadata.transpose(), intensityData], axis=0, sort=False)
-
-        with warnings.catch_warnings():
-            # Seems no way to avoid pandas complaining here (v0.18.1)
-            warnings.simplefilter("ignore")
-            tmpCombined = pandas.concat([sampleMetadata, tmpXCombined], axis=1, sort=False)
-
-        # reorder rows to put metadata first
-        tmpCombined = tmpCombined.reindex(tmpXCombined.index, axis=0)
-
-        # Save
-        tmpCombined.to_csv(os.path.join(destinationPath + '_combinedData.csv'), encoding='utf-8', date_format=self._timestampFormat)
+        # Export combined data in single file, with feature metadata in the first rows
+        writeUnifiedCSV(destinationPath + '_combinedData.csv', sampleMetadata, featureMetadata, self._intensityData, dateFormat=self._timestampFormat,
+                        replacements={-numpy.inf: '<LLOQ', numpy.inf: '>ULOQ'}, compression=compression, parallelise=parallelise, workers=workers)
 
 
     def validateObject(self, verbose=True, raiseError=False, raiseWarning=True):
@@ -2886,9 +2890,10 @@ class TargetedDataset(Dataset):
 
             ## List additional attributes (print + log)
             expectedSet = set({'Attributes', 'VariableType', '_Normalisation', '_name', 'fileName', 'filePath',
-                               '_intensityData', 'sampleMetadata', 'featureMetadata', 'expectedConcentration', 'sampleMask',
+                               '_intensityData', '_sampleMetadata', 'featureMetadata', 'expectedConcentration', 'sampleMask',
                                'featureMask', 'calibration', 'sampleMetadataExcluded', 'intensityDataExcluded',
-                               'featureMetadataExcluded', 'expectedConcentrationExcluded', 'excludedFlag'})
+                               'featureMetadataExcluded', 'expectedConcentrationExcluded', 'excludedFlag',
+                               '_intensityDataVersion', '_normalisedIntensityData', '_normalisationCacheInfo', '_featureIndex', '_roleMasks', '_roleStatisticsCache'})
             objectSet = set(self.__dict__.keys())
             additionalAttributes = objectSet - expectedSet
             if len(additionalAttributes) > 0:
@@ -3192,6 +3197,9 @@ class TargetedDataset(Dataset):
         else:
             super().addSampleInfo(descriptionFormat=descriptionFormat, filePath=filePath, **kwargs)
 
+        # Roles may have been set in place
+        self._roleMasks = None
+
 
     def _matchDatasetToLIMS(self, pathToLIMSfile):
         """
@@ -3222,83 +3230,9 @@ class TargetedDataset(Dataset):
         # Strip any whitespace from 'Sample File Name'
         self.sampleMetadata['Sample File Name'] = self.sampleMetadata['Sample File Name'].str.strip()
 
-        # Break filename down into constituent parts.
-        baseNameParser = re.compile(filenameSpec, re.VERBOSE)
-        fileNameParts = self.sampleMetadata['Sample File Name'].str.extract(baseNameParser, expand=False)
-
-        # Deal with badly ordered exclusions
-        fileNameParts['exclusion'].loc[fileNameParts['exclusion2'].isnull() == False] = fileNameParts['exclusion2'].loc[fileNameParts['exclusion2'].isnull() == False]
-        fileNameParts.drop('exclusion2', axis=1, inplace=True)
-
-        # Pass masks into enum fields
-        fileNameParts.loc[:, 'AssayRole'] = AssayRole.Assay
-        fileNameParts.loc[fileNameParts['reference'] == 'SR', 'AssayRole'] = AssayRole.PrecisionReference
-        fileNameParts.loc[fileNameParts['baseName'].str.match('.+[B]\d+?[SE]\d+?', na=False).astype(bool), 'AssayRole'] = AssayRole.PrecisionReference
-        fileNameParts.loc[fileNameParts['reference'] == 'LTR', 'AssayRole'] = AssayRole.PrecisionReference
-        fileNameParts.loc[fileNameParts['reference'] == 'MR', 'AssayRole'] = AssayRole.PrecisionReference
-        fileNameParts.loc[fileNameParts['injectionKind'] == 'SRD', 'AssayRole'] = AssayRole.LinearityReference
-        fileNameParts.loc[fileNameParts['groupingKind'].str.match('Blank', na=False).astype(bool), 'AssayRole'] = AssayRole.LinearityReference
-        fileNameParts.loc[fileNameParts['groupingKind'].str.match('E?IC', na=False).astype(bool), 'AssayRole'] = AssayRole.Assay
-
-        fileNameParts.loc[:, 'SampleType'] = SampleType.StudySample
-        fileNameParts.loc[fileNameParts['reference'] == 'SR', 'SampleType'] = SampleType.StudyPool
-        fileNameParts.loc[fileNameParts['baseName'].str.match('.+[B]\d+?[SE]\d+?', na=False).astype(bool), 'SampleType'] = SampleType.StudyPool
-        fileNameParts.loc[fileNameParts['reference'] == 'LTR', 'SampleType'] = SampleType.ExternalReference
-        fileNameParts.loc[fileNameParts['reference'] == 'MR', 'SampleType'] = SampleType.MethodReference
-        fileNameParts.loc[fileNameParts['injectionKind'] == 'SRD', 'SampleType'] = SampleType.StudyPool
-        fileNameParts.loc[fileNameParts['groupingKind'].str.match('Blank', na=False).astype(bool), 'SampleType'] = SampleType.ProceduralBlank
-        fileNameParts.loc[fileNameParts['groupingKind'].str.match('E?IC', na=False).astype(bool), 'SampleType'] = SampleType.StudyPool
-
-        # Skipped runs
-        fileNameParts['Skipped'] = fileNameParts['exclusion'].str.match('[Xx]', na=False)
-
-        # Get matrix
-        fileNameParts['Matrix'] = fileNameParts['groupingKind'].str.extract('^([AC-Z]{1,2})(?<!IC)$', expand=False)
-        fileNameParts['Matrix'].fillna('', inplace=True)
-
-        # Get well numbers
-        fileNameParts.loc[
-            fileNameParts['groupingKind'].str.match('Blank|E?IC', na=False).astype(bool), 'injectionNo'] = -1
-        fileNameParts['Well'] = pandas.to_numeric(fileNameParts['injectionNo'])
-
-        # Plate / grouping no
-        fileNameParts['Plate'] = pandas.to_numeric(fileNameParts['groupingNo'])
-
-        # Get batch where it is explicit in file name
-        fileNameParts['Batch'] = pandas.to_numeric(fileNameParts['baseName'].str.extract('B(\d+?)[SE]', expand=False))
-        fileNameParts['Correction Batch'] = numpy.nan
-
-        # Map dilution series names to dilution level
-        fileNameParts['Dilution'] = fileNameParts['baseName'].str.extract('(?:.+_?)(SRD\d\d)(?:_?.*)', expand=False).replace(self.Attributes['dilutionMap'])
-        fileNameParts['Dilution'] = fileNameParts['Dilution'].astype(float)
-        # Blank out NAs for neatness
-        fileNameParts['reruns'].fillna('', inplace=True)
-        fileNameParts['extraInjections'].fillna('', inplace=True)
-
-        # Drop unwanted columns
-        fileNameParts.drop(['exclusion', 'reference', 'groupingKind', 'injectionNo', 'injectionKind', 'groupingNo'], axis=1, inplace=True)
-
-        # Swap in user freindly file names
-        fileNameParts.rename(columns={'chromatography': 'Chromatography'}, inplace=True)
-        fileNameParts.rename(columns={'instrument': 'Instrument'}, inplace=True)
-        fileNameParts.rename(columns={'study': 'Study'}, inplace=True)
-        fileNameParts.rename(columns={'baseName': 'Sample Base Name'}, inplace=True)
-        fileNameParts.rename(columns={'fileName': 'Sample File Name'}, inplace=True)
-        fileNameParts.rename(columns={'suplementalInfo': 'Suplemental Info'}, inplace=True)
-        fileNameParts.rename(columns={'ionisation': 'Ionisation'}, inplace=True)
-        fileNameParts.rename(columns={'extraInjections': 'Suplemental Injections'}, inplace=True)
-        fileNameParts.rename(columns={'reruns': 'Re-Run'}, inplace=True)
-
-        # Merge metadata back into the sampleInfo table.
-        # first remove duplicate columns (from _dataset _init_)
-        if 'AssayRole' in self.sampleMetadata.columns: self.sampleMetadata.drop(['AssayRole'], axis=1, inplace=True)
-        if 'SampleType' in self.sampleMetadata.columns: self.sampleMetadata.drop(['SampleType'], axis=1, inplace=True)
-        if 'Sample Base Name' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Sample Base Name'], axis=1, inplace=True)
-        if 'Dilution' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Dilution'], axis=1, inplace=True)
-        if 'Batch' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Batch'], axis=1, inplace=True)
-        if 'Correction Batch' in self.sampleMetadata.columns: self.sampleMetadata.drop(['Correction Batch'], axis=1, inplace=True)
-        # merge
-        self.sampleMetadata = pandas.merge(self.sampleMetadata, fileNameParts, left_on='Sample File Name', right_on='Sample File Name', how='left', sort=False)
+        # Break filename down into constituent parts, and merge metadata back into the sampleInfo table.
+        fileNameParts = _parseFilenames(self.sampleMetadata['Sample File Name'], filenameSpec, self.Attributes['dilutionMap'])
+        self.sampleMetadata = _mergeFilenameMetadata(self.sampleMetadata, fileNameParts)
 
         # Add 'Exclusion Details' column
         self.sampleMetadata['Exclusion Details'] = ''
@@ -3396,7 +3330,7 @@ class TargetedDataset(Dataset):
 
         # Restrict to PrecisionReference if necessary
         if onlyPrecisionReferences:
-            startMask = (self.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
+            startMask = self.roleMasks[None, AssayRole.PrecisionReference]
         else:
             startMask = numpy.squeeze(numpy.ones([self.sampleMetadata.shape[0], 1], dtype=bool), axis=1)
 
@@ -53,10 +53,11 @@ def plotBatchAndROCorrection(msData, msDatacorrected, featureList, addViolin=Tru
 							SampleType.MethodReference: 'm', SampleType.ProceduralBlank: 'c', 'Other': 'grey'}
 
 	# Define sample types and exclude masked samples
-	SSmask = (msData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (msData.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-	SPmask = (msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-	ERmask = (msData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-	LRmask = (msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+	roleMasks = msData.roleMasks
+	SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+	SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+	ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+	LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 
 	# Get and sort the fit data
 	localRO = msData.sampleMetadata['Acquired Time'].values
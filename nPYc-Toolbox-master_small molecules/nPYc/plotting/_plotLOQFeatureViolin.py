@@ -49,9 +49,10 @@ def _featureLOQViolinPlotHelper(ax, tData, featID, splitByBatch=True, plotBatchL
                            SampleType.MethodReference: 'm', SampleType.ProceduralBlank: 'c', 'Other': 'grey'}
 
     # SampleType masks
-    SSmask = ((tData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (tData.sampleMetadata['AssayRole'].values == AssayRole.Assay))
-    SPmask = ((tData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference))
-    ERmask = ((tData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference))
+    roleMasks = tData.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
 
     # Plot figures
     if not onlyLegend:
@@ -74,6 +74,8 @@ def plotLOQRunOrder(targetedData, addCalibration=True, compareBatch=True, title=
     color_ULOQ      = 'C1'
     color_calib     = 'C0'
 
+    roleMasks = targetedData.roleMasks
+
     # Prepare and store data for each batch
     for i in range(number_of_batch):
         out_data = dict()
@@ -86,8 +88,8 @@ def plotLOQRunOrder(targetedData, addCalibration=True, compareBatch=True, title=
         quantifiedFeatureMask = (targetedData.featureMetadata['quantificationType'] != QuantificationType.Monitored).values
 
         # Define sample types
-        SPMask = (targetedData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (targetedData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference) & batchMask
-        ERMask = (targetedData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (targetedData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference) & batchMask
+        SPMask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference] & batchMask
+        ERMask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference] & batchMask
 
         # x axis
         x    = targetedData.sampleMetadata.loc[batchMask, 'Acquired Time'].tolist()
@@ -140,8 +142,8 @@ def plotLOQRunOrder(targetedData, addCalibration=True, compareBatch=True, title=
             out_data['y_calib'] = y_calib
 
         # Store values to compare across batch
-        tmp_SPMask = (targetedData.sampleMetadata.loc[batchMask, 'SampleType'].values == SampleType.StudyPool) & (targetedData.sampleMetadata.loc[batchMask, 'AssayRole'].values == AssayRole.PrecisionReference)
-        tmp_ERMask = (targetedData.sampleMetadata.loc[batchMask, 'SampleType'].values == SampleType.ExternalReference) & (targetedData.sampleMetadata.loc[batchMask, 'AssayRole'].values == AssayRole.PrecisionReference)
+        tmp_SPMask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference][batchMask]
+        tmp_ERMask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference][batchMask]
         tmp_SSMask = numpy.invert(tmp_SPMask | tmp_ERMask)
         # check some SS exist
         if sum(tmp_SSMask) != 0:
@@ -163,26 +163,26 @@ def _plotRSDsHelper(dataset, featureName='Feature Name', ratio=False, withExclus
 	if not dataset.VariableType == VariableType.Discrete:
 		raise ValueError('Only datasets with discreetly sampled variables are supported.')
 
-	if sum(dataset.sampleMetadata.loc[dataset.sampleMask, 'SampleType'].values == SampleType.StudySample) <= 2:
+	roleMasks = dataset.roleMasks
+	if sum(roleMasks[SampleType.StudySample, None] & dataset.sampleMask) <= 2:
 		raise ValueError('More than two Study Samples must be defined to calculate biological RSDs.')
 
 	## Calculate RSD for every SampleType with enough PrecisionReference samples.
 	rsdVal = dict()
 
-	precRefMask = dataset.sampleMetadata.loc[:, 'AssayRole'].values == AssayRole.PrecisionReference
-	precRefMask = numpy.logical_and(precRefMask, dataset.sampleMask)
+	precRefMask = numpy.logical_and(roleMasks[None, AssayRole.PrecisionReference], dataset.sampleMask)
 	sTypes = list(set(dataset.sampleMetadata.loc[precRefMask, 'SampleType'].values))
 
 	if withExclusions:   
 		rsdVal['Feature Name'] = dataset.featureMetadata.loc[dataset.featureMask, featureName].values
 		rsdVal[SampleType.StudyPool] = dataset.rsdSP[dataset.featureMask]
-		ssMask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & dataset.sampleMask
+		ssMask = roleMasks[SampleType.StudySample, None] & dataset.sampleMask
 		rsdList = rsd(dataset.intensityData[ssMask, :])
 		rsdVal[SampleType.StudySample] = rsdList[dataset.featureMask]
 	else:		
 		rsdVal['Feature Name'] = dataset.featureMetadata.loc[:, featureName].values
 		rsdVal[SampleType.StudyPool] = dataset.rsdSP
-		ssMask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & dataset.sampleMask
+		ssMask = roleMasks[SampleType.StudySample, None] & dataset.sampleMask
 		rsdList = rsd(dataset.intensityData[ssMask, :])
 		rsdVal[SampleType.StudySample] = rsdList		
 
@@ -192,7 +192,7 @@ def _plotRSDsHelper(dataset, featureName='Feature Name', ratio=False, withExclus
 
 	for sType in sTypes:
 		if not sTypes == SampleType.StudyPool:
-			sTypeMask = dataset.sampleMetadata.loc[:, 'SampleType'].values == sType
+			sTypeMask = roleMasks[sType, None]
 			# precRefMask limits to Precision Reference and dataset.sampleMask
 			sTypeMask = numpy.logical_and(sTypeMask, precRefMask)
 
@@ -75,10 +75,11 @@ def plotTIC(msData, addViolin=True, addBatchShading=False, addLineAtGaps=False,
 		tempSamplesMask = numpy.ones(shape=msData.sampleMask.shape, dtype=bool)
 
 	# Define sample types
-	SSmask = ((msData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (msData.sampleMetadata['AssayRole'].values == AssayRole.Assay)) & tempSamplesMask
-	SPmask = ((msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)) & tempSamplesMask
-	ERmask = ((msData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)) & tempSamplesMask
-	LRmask = ((msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)) & tempSamplesMask
+	roleMasks = msData.roleMasks
+	SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay] & tempSamplesMask
+	SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference] & tempSamplesMask
+	ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference] & tempSamplesMask
+	LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference] & tempSamplesMask
 
 	# X axis limits for formatting
 	minX = msData.sampleMetadata['Acquired Time'].loc[msData.sampleMetadata['Run Order'] == min(msData.sampleMetadata['Run Order'][SSmask | SPmask | ERmask | LRmask])].values
@@ -28,12 +28,10 @@ def plotFeatureInteractive(tData, featureNo=0, withExclusions=True):
     else:
         tempSampleMask = numpy.ones(shape=tData.sampleMask.shape, dtype=bool)
 
-    SSmask = ((tData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (
-                tData.sampleMetadata['AssayRole'].values == AssayRole.Assay)) & tempSampleMask
-    SPmask = ((tData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (
-                tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)) & tempSampleMask
-    ERmask = ((tData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (
-                tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)) & tempSampleMask
+    roleMasks = tData.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay] & tempSampleMask
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference] & tempSampleMask
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference] & tempSampleMask
 
     SSplot = go.Scattergl(
         x=tData.sampleMetadata['Acquired Time'][SSmask],
@@ -241,9 +241,10 @@ def plotTICinteractive(msData, plottype='Sample Type', labelby='Run Order', with
 		
 	if plottype=='Sample Type': # Plot TIC for SR samples coloured by batch
 	
-		SSmask = ((msData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (msData.sampleMetadata['AssayRole'].values == AssayRole.Assay)) & tempSampleMask
-		SPmask = ((msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)) & tempSampleMask
-		ERmask = ((msData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)) & tempSampleMask
+		roleMasks = msData.roleMasks
+		SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay] & tempSampleMask
+		SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference] & tempSampleMask
+		ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference] & tempSampleMask
 	
 		SSplot = go.Scatter(
 			x = msData.sampleMetadata[plotby][SSmask],
@@ -288,7 +289,7 @@ def plotTICinteractive(msData, plottype='Sample Type', labelby='Run Order', with
 	
 	if plottype=='Serial Dilution': # Plot TIC for LR samples coloured by dilution
 
-		LRmask = ((msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)) & tempSampleMask
+		LRmask = msData.roleMasks[SampleType.StudyPool, AssayRole.LinearityReference] & tempSampleMask
 		
 		if hasattr(msData, 'corrExclusions'):
 			
@@ -368,7 +369,7 @@ def plotLRTIC(msData, sampleMask=None, colourByDetectorVoltage=False, title='',
 	
 	# Plot TIC for LR samples coloured by sample dilution
 	tic = numpy.sum(msData.intensityData, axis=1)
-	LRmask = (msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference) & (sampleMask)
+	LRmask = msData.roleMasks[SampleType.StudyPool, AssayRole.LinearityReference] & (sampleMask)
 	tic = tic[LRmask]
 	runIX = numpy.argsort(msData.sampleMetadata['Run Order'][LRmask].values)
 	runIX = numpy.argsort(runIX)
@@ -455,7 +456,7 @@ def plotCorrelationToLRbyFeature(msData, featureMask=None, title='', maxNo=5, sa
 			featureList = numpy.random.permutation(featureList)[:maxNo]
 
 	# Define sample mask and run order
-	LRmask = (msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+	LRmask = msData.roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 	runIX = numpy.argsort(msData.sampleMetadata['Run Order'][LRmask].values)
 	runIX = numpy.argsort(runIX)
 	
@@ -83,14 +83,11 @@ def _finalReportPeakPantheR(dataset, destinationPath=None):
         figureSize=dataset.Attributes['figureSize']
 
 	# Define sample masks
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SPmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    ERmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    LRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+    LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 
     # Set up template item and save required info
     item = dict()
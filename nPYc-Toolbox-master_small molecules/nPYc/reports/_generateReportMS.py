@@ -24,6 +24,7 @@ from ..enumerations import AssayRole, SampleType
 from ._generateBasicPCAReport import generateBasicPCAReport
 from ..reports._finalReportPeakPantheR import _finalReportPeakPantheR
 from ..utilities._filters import blankFilter
+from ..utilities._thresholdSweep import ThresholdSweep
 
 from pandas.plotting import register_matplotlib_converters
 register_matplotlib_converters()
@@ -108,7 +109,7 @@ def _generateReportMS(dataset, reportType, withExclusions=False, withArtifactual
             os.makedirs(os.path.join(destinationPath, 'graphics'))
 
     # Apply sample/feature masks if exclusions to be applied
-    msData = copy.deepcopy(dataset)
+    msData = dataset.clone()
     if withExclusions:
         msData.applyMasks()
 
@@ -156,14 +157,11 @@ def _finalReport(dataset, destinationPath=None, pcaModel=None, reportType='final
         figureSize=dataset.Attributes['figureSize']
 
 	# Define sample masks
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SPmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    ERmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    LRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+    LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 
     # Set up template item and save required info
     item = dict()
@@ -506,16 +504,13 @@ def _featureReport(dataset, destinationPath=None):
     item['Nsamples'] = dataset.intensityData.shape[0]
 
     # Define sample masks
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SPmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    ERmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
 
     try:
-        LRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-                (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+        LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
         item['LRcount'] = str(sum(LRmask))
     except KeyError:
         pass
@@ -791,13 +786,11 @@ def _featureSelectionReport(dataset, destinationPath=None, withArtifactualFilter
     """
 
     # Define sample masks
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    SRDmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
-    Blankmask = dataset.sampleMetadata['SampleType'] == SampleType.ProceduralBlank
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SRmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    SRDmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
+    Blankmask = roleMasks[SampleType.ProceduralBlank, None]
 
     # Define passmask as current featureMask
     passMask = dataset.featureMask
@@ -871,39 +864,17 @@ def _featureSelectionReport(dataset, destinationPath=None, withArtifactualFilter
     rVals = numpy.arange(0.5, 1.01, 0.05)
     rValsRep = numpy.tile(numpy.arange(0.5, 1.01, 0.05), [1, len(rsdVals)])
     rsdValsRep = numpy.reshape(numpy.tile(numpy.arange(5, 55, 5), [len(rVals), 1]), rValsRep.shape, order='F')
-    featureNos = numpy.zeros(rValsRep.shape, dtype=numpy.int)
-    if withArtifactualFiltering:
-        # with blankThreshold in heatmap
-        if (dataset.Attributes['featureFilters']['blankFilter'] is True) & (sum(Blankmask) >= 2):
-            for rsdNo in range(rValsRep.shape[1]):
-                featureNos[0, rsdNo] = sum(dataset.artifactualFilter(featMask=(
-                            (dataset.correlationToDilution >= rValsRep[0, rsdNo]) & (
-                                dataset.rsdSP <= rsdValsRep[0, rsdNo]) & (
-                                        (dataset.rsdSP * item['rsdSPvsSSvarianceRatio']) <= rsdSS) & (
-                                        dataset.featureMask == True) & (blankMask == True))))
-        # without blankThreshold
-        else:
-            for rsdNo in range(rValsRep.shape[1]):
-                featureNos[0, rsdNo] = sum(dataset.artifactualFilter(featMask=(
-                            (dataset.correlationToDilution >= rValsRep[0, rsdNo]) & (
-                                dataset.rsdSP <= rsdValsRep[0, rsdNo]) & (
-                                        (dataset.rsdSP * item['rsdSPvsSSvarianceRatio']) <= rsdSS) & (
-                                        dataset.featureMask == True))))
-    else:
-        # with blankThreshold in heatmap
-        if (dataset.Attributes['featureFilters']['blankFilter'] is True) & (sum(Blankmask) >= 2):
-            for rsdNo in range(rValsRep.shape[1]):
-                featureNos[0, rsdNo] = sum(
-                    (dataset.correlationToDilution >= rValsRep[0, rsdNo]) & (dataset.rsdSP <= rsdValsRep[0, rsdNo]) & (
-                                (dataset.rsdSP * item['rsdSPvsSSvarianceRatio']) <= rsdSS) & (
-                                dataset.featureMask == True) & (blankMask == True))
-        # without blankThreshold
-        else:
-            for rsdNo in range(rValsRep.shape[1]):
-                featureNos[0, rsdNo] = sum(
-                    (dataset.correlationToDilution >= rValsRep[0, rsdNo]) & (dataset.rsdSP <= rsdValsRep[0, rsdNo]) & (
-                                (dataset.rsdSP * item['rsdSPvsSSvarianceRatio']) <= rsdSS) & (
-                                dataset.featureMask == True))
+
+    # Count all cells together, from the features passing the current featureMask (and blank filter)
+    sweepMask = dataset.featureMask
+    if (dataset.Attributes['featureFilters']['blankFilter'] is True) & (sum(Blankmask) >= 2):
+        sweepMask = numpy.logical_and(sweepMask, numpy.reshape(blankMask[0] if isinstance(blankMask, tuple) else blankMask, -1))
+    sweep = ThresholdSweep(dataset.correlationToDilution, dataset.rsdSP, rsdSS=rsdSS, featureMask=sweepMask,
+                           linkage=dataset.artifactualLinkageMatrix if withArtifactualFiltering else None)
+    featureNos = sweep.count(rsdVals, rVals, varianceRatio=item['rsdSPvsSSvarianceRatio'],
+                             withArtifactualFiltering=withArtifactualFiltering)
+    # rValsRep varies fastest, rsdValsRep slowest
+    featureNos = numpy.reshape(featureNos, rValsRep.shape)
 
     test = pandas.DataFrame(data=numpy.transpose(numpy.concatenate([rValsRep, rsdValsRep, featureNos])),
                             columns=['Correlation to dilution', 'RSD', 'nFeatures'])
@@ -976,14 +947,11 @@ def _batchCorrectionAssessmentReport(dataset, destinationPath=None, batch_correc
         return
 
     # Define sample masks
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SPmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    ERmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    LRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+    LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 
     # Set up template item and save required info
     item = dict()
@@ -1116,14 +1084,11 @@ def _batchCorrectionSummaryReport(dataset, correctedDataset, destinationPath=Non
 
 
     # Define sample masks
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SPmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    ERmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    LRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+    LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 
     # Set up template item and save required info
     item = dict()
@@ -1342,14 +1307,11 @@ def _featureCorrelationToDilutionReport(dataset, destinationPath=None):
 
 
     # Define sample masks
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SPmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    ERmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    LRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-             (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+    LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 
     # Set up template item and save required info
     item = dict()
@@ -1416,9 +1378,7 @@ def _featureCorrelationToDilutionReport(dataset, destinationPath=None):
     corLRbyBatch['MeanAllSubsets'] = numpy.mean(corALL, axis=0)
     corLRsummary['MeanAllSubsets'] = sum(corLRbyBatch['MeanAllSubsets'] >= dataset.Attributes['corrThreshold'])
     figuresCorLRbyBatch = _localLRPlots(dataset,
-                                        (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (
-                                                    dataset.sampleMetadata[
-                                                        'AssayRole'].values == AssayRole.LinearityReference),
+                                        roleMasks[SampleType.StudyPool, AssayRole.LinearityReference],
                                         corLRbyBatch['MeanAllSubsets'],
                                         'MeanAllSubsets',
                                         figures=figuresCorLRbyBatch,
@@ -1673,20 +1633,16 @@ def _localLRPlots(dataset, LRmask, corToLR, saveName, figures=None, savePath=Non
 
 
 def batchCorrectionTest(dataset, nFeatures=10, window=11):
-    import copy
     import numpy
     import random
     from ..batchAndROCorrection._batchAndROCorrection import _batchCorrection
 
     # Samplemask
-    SSmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudySample) & (
-                dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-    SPmask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (
-                dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    ERmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (
-                dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-    LRmask = (dataset.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (
-                dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+    roleMasks = dataset.roleMasks
+    SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+    SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+    ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+    LRmask = roleMasks[SampleType.ExternalReference, AssayRole.LinearityReference]
     sampleMask = (SSmask | SPmask | ERmask | LRmask) & (dataset.sampleMask == True).astype(bool)
 
     # Exclude features with zero values
@@ -1732,13 +1688,13 @@ def batchCorrectionTest(dataset, nFeatures=10, window=11):
             break
 
     # Create copy of dataset and trim
-    preData = copy.deepcopy(dataset)
+    preData = dataset.clone()
     preData.intensityData = dataset.intensityData[:, featureList]
     preData.featureMetadata = dataset.featureMetadata.loc[featureList, :]
     preData.featureMetadata.reset_index(drop=True, inplace=True)
 
     # Run batch correction
-    postData = copy.deepcopy(preData)
+    postData = preData.clone()
     postData.intensityData = correctedData
     postData.fit = fits
 
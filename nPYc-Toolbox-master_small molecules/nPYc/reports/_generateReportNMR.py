@@ -67,9 +67,10 @@ def _generateReportNMR(nmrData, reportType, withExclusions=True, destinationPath
 		nmrData.applyMasks()
 
 	# Define sample masks
-	SSmask = (nmrData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (nmrData.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-	SPmask = (nmrData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (nmrData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-	ERmask = (nmrData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (nmrData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
+	roleMasks = nmrData.roleMasks
+	SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+	SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+	ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
 
 	if not 'Plot Sample Type' in nmrData.sampleMetadata.columns:
 		nmrData.sampleMetadata.loc[~SSmask & ~SPmask & ~ERmask, 'Plot Sample Type'] = 'Sample'
@@ -93,10 +93,11 @@ def _generateReportTargeted(tDataIn, reportType, withExclusions=False, destinati
 
 	# Prepare the item object
 	# Define sample masks
-	SSmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (tData.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-	SPmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-	ERmask = (tData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-	LRmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (tData.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+	roleMasks = tData.roleMasks
+	SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+	SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+	ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
+	LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 	[ns, nv] = tData.intensityData.shape
 
 	# The quantificationTypes present (force the ordering)
@@ -748,15 +749,12 @@ def _finalReportMS(tData, item, destinationPath, pcaModel=None, withAccPrec=True
 	## Figure 5 and 6: (if available) PCA scores and loadings plots by sample type
 	if pcaModel is not None:
 		# Get sample types
-		SSmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (
-					tData.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-		SPmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (
-					tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-		ERmask = (tData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (
-					tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
+		roleMasks = tData.roleMasks
+		SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+		SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+		ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
 		# Linearity references not commonly used, but left here throughout.
-		LRmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (
-					tData.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+		LRmask = roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 
 		tData.sampleMetadata.loc[~SSmask & ~SPmask & ~ERmask, 'Plot Sample Type'] = 'Sample'
 		tData.sampleMetadata.loc[SSmask, 'Plot Sample Type'] = 'Study Sample'
@@ -833,12 +831,10 @@ def _finalReportNMR(tData, item, destinationPath, pcaModel=None, withAccPrec=Tru
 		graphicsPath = None
 
 	# Define sample masks
-	SSmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudySample) & \
-			 (tData.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-	SPmask = (tData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & \
-			 (tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-	ERmask = (tData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & \
-			 (tData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
+	roleMasks = tData.roleMasks
+	SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+	SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+	ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
 
 	# Modify the required fields in item
 	item['NfeaturesPassing'] = numpy.where(tData.featureMetadata['Passing Selection'])[0].shape[0]
@@ -1311,12 +1307,12 @@ def _getRSDTable(tData):
 	## Calculate RSD for every SampleType with enough PrecisionReference samples.
 	rsdVal = dict()
 
-	precRefMask = tData.sampleMetadata.loc[:, 'AssayRole'].values == AssayRole.PrecisionReference
-	precRefMask = numpy.logical_and(precRefMask, tData.sampleMask)
+	roleMasks = tData.roleMasks
+	precRefMask = numpy.logical_and(roleMasks[None, AssayRole.PrecisionReference], tData.sampleMask)
 	sTypes = list(set(tData.sampleMetadata.loc[precRefMask, 'SampleType'].values))
 
 	rsdVal[SampleType.StudyPool] = tData.rsdSP
-	ssMask = (tData.sampleMetadata['SampleType'].values == SampleType.StudySample) & tData.sampleMask
+	ssMask = roleMasks[SampleType.StudySample, None] & tData.sampleMask
 	rsdVal[SampleType.StudySample] = rsd(tData.intensityData[ssMask, :])
 
 	# Only keep features with finite values for SP and SS
@@ -1325,7 +1321,7 @@ def _getRSDTable(tData):
 
 	for sType in sTypes:
 		if not sTypes == SampleType.StudyPool:
-			sTypeMask = tData.sampleMetadata.loc[:, 'SampleType'].values == sType
+			sTypeMask = roleMasks[sType, None]
 			# precRefMask limits to Precision Reference and tData.sampleMask
 			sTypeMask = numpy.logical_and(sTypeMask, precRefMask)
 
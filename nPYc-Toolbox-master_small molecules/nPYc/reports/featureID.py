@@ -4,7 +4,6 @@ import os
 import sys
 import sqlite3
 import types
-import copy
 import pandas
 import logging
 from .._toolboxPath import toolboxPath
@@ -53,17 +52,18 @@ def generateMSIDrequests(msData, features, outputDir='', rawData=None, database=
 
 	# Prepare the data objects - exclude all samples that are not SS, SP or ER	
 	sampleMask = numpy.zeros(msData.sampleMask.shape).astype(bool)
-	SSmask = (msData.sampleMetadata['SampleType'].values == SampleType.StudySample) & (msData.sampleMetadata['AssayRole'].values == AssayRole.Assay)
-	SPmask = (msData.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
-	ERmask = (msData.sampleMetadata['SampleType'].values == SampleType.ExternalReference) & (msData.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
+	roleMasks = msData.roleMasks
+	SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+	SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+	ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
 	sampleMask[SSmask|SPmask|ERmask] = True
 	
-	postData = copy.deepcopy(msData)
+	postData = msData.clone()
 	postData.sampleMask = sampleMask
 	postData.applyMasks()
 	
 	if msDataPrecorrection is not None:
-		preData = copy.deepcopy(msDataPrecorrection)
+		preData = msDataPrecorrection.clone()
 		preData.sampleMask = sampleMask
 		preData.applyMasks()
 	else:
@@ -160,9 +160,10 @@ def _msIDreport(msData, feature, outputDir='', rawData=None, dbConnection=None,
 	# Create a local copy of the DF to add in in fields for Seaborn plots
 	##
 	localDF = msData.sampleMetadata.copy()
-	SSmask = (localDF['SampleType'].values == SampleType.StudySample) & (localDF['AssayRole'].values == AssayRole.Assay)
-	SPmask = (localDF['SampleType'].values == SampleType.StudyPool) & (localDF['AssayRole'].values == AssayRole.PrecisionReference)
-	ERmask = (localDF['SampleType'].values == SampleType.ExternalReference) & (localDF['AssayRole'].values == AssayRole.PrecisionReference)
+	roleMasks = msData.roleMasks
+	SSmask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+	SPmask = roleMasks[SampleType.StudyPool, AssayRole.PrecisionReference]
+	ERmask = roleMasks[SampleType.ExternalReference, AssayRole.PrecisionReference]
 	localDF.loc[SSmask, 'Sample Type'] = 'Study Sample'
 	localDF.loc[SPmask, 'Sample Type'] = 'Study Reference'
 	localDF.loc[ERmask, 'Sample Type'] = 'Long-Term Reference'
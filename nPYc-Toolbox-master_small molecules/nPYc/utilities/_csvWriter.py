@@ -0,0 +1,192 @@
+"""
+Streaming writers for the CSV exports of :py:meth:`~nPYc.objects.Dataset.exportDataset`.
+
+Rows are formatted a block at a time, optionally in a pool of worker processes, and written out in order, so that output is identical to formatting the whole table at once, without holding more than a few blocks of text in memory.
+"""
+import functools
+import gzip
+import multiprocessing
+
+import numpy
+import pandas
+
+
+def csvPath(path, compression=None):
+	"""
+	Return the file name for *path* written with *compression*.
+
+	:raises ValueError: if *compression* is not ``None`` or 'gzip'
+	"""
+	if compression is None:
+		return path
+	elif compression == 'gzip':
+		return path + '.gz'
+	else:
+		raise ValueError('compression must be None or \'gzip\'')
+
+
+def writeBlocks(path, blocks, formatter, header=None, compression=None, parallelise=False, workers=None):
+	"""
+	Format each item of *blocks* to text with *formatter*, and write the text to *path* in order.
+
+	:param str path: File to write
+	:param blocks: Iterable of work items passed to *formatter*
+	:param formatter: Picklable function returning the text for one item of *blocks*
+	:param header: Text to write before the first block
+	:type header: None or str
+	:param compression: If 'gzip' compress the output, and append '.gz' to *path*
+	:type compression: None or str
+	:param bool parallelise: If ``True`` format blocks in a pool of worker processes
+	:param workers: Number of worker processes, if ``None`` use one less than the number of CPU cores
+	:type workers: None or int
+	"""
+	path = csvPath(path, compression)
+
+	if compression == 'gzip':
+		handle = gzip.open(path, 'wt', encoding='utf-8', newline='')
+	else:
+		handle = open(path, 'w', encoding='utf-8', newline='')
+
+	with handle:
+		if header is not None:
+			handle.write(header)
+
+		if parallelise:
+			# Use one less workers than CPU cores, unless told otherwise
+			if workers is not None:
+				cores = workers
+			else:
+				cores = max(multiprocessing.cpu_count() - 1, 1)
+
+			with multiprocessing.Pool(processes=cores) as pool:
+				for text in pool.imap(formatter, blocks):
+					handle.write(text)
+		else:
+			for block in blocks:
+				handle.write(formatter(block))
+
+
+def _rowBlocks(noRows, noColumns, blockSize):
+	"""
+	Yield (start, stop) bounds dividing *noRows* into blocks of about *blockSize* elements.
+	"""
+	step = max(1, blockSize // max(noColumns, 1))
+	for start in range(0, noRows, step):
+		yield (start, min(start + step, noRows))
+
+
+def _formatMatrixRows(block, rowFormat):
+
+	return (rowFormat * block.shape[0]) % tuple(block.ravel().tolist())
+
+
+def writeMatrixCSV(path, matrix, fmt='%.18e', delimiter=',', compression=None, parallelise=False, workers=None, blockSize=2**18):
+	"""
+	Write a two-dimensional *matrix* to *path*, producing the same text as :py:func:`numpy.savetxt` with the same *fmt* and *delimiter*.
+
+	:param str path: File to write
+	:param numpy.ndarray matrix: Values to write
+	:param str fmt: Format of each value
+	:param str delimiter: Separator between values
+	:param int blockSize: Approximate number of values formatted at a time
+	"""
+	rowFormat = delimiter.join([fmt] * matrix.shape[1]) + '\n'
+	blocks = (matrix[start:stop, :] for (start, stop) in _rowBlocks(matrix.shape[0], matrix.shape[1], blockSize))
+
+	writeBlocks(path, blocks, functools.partial(_formatMatrixRows, rowFormat=rowFormat), compression=compression, parallelise=parallelise, workers=workers)
+
+
+def _intensityFrame(block, index, objectColumns, replacements):
+	"""
+	Build the :py:class:`~pandas.DataFrame` for a block of intensities, with the columns in *objectColumns* cast to object, and *replacements* applied.
+	"""
+	if objectColumns.all():
+		frame = pandas.DataFrame(block.astype(object), index=index)
+	else:
+		frame = pandas.DataFrame(block, index=index)
+		if objectColumns.any():
+			for column in numpy.flatnonzero(objectColumns):
+				frame[column] = frame[column].astype(object)
+
+	if replacements:
+		for (value, text) in replacements.items():
+			frame.replace(to_replace=value, value=text, inplace=True)
+
+	return frame
+
+
+def _formatIntensityRows(block, objectColumns, replacements, dateFormat):
+
+	frame = _intensityFrame(block, pandas.RangeIndex(block.shape[0]), objectColumns, replacements)
+
+	return frame.to_csv(None, header=False, index=False, date_format=dateFormat)
+
+
+def writeIntensityCSV(path, matrix, replacements, dateFormat=None, compression=None, parallelise=False, workers=None, blockSize=2**18):
+	"""
+	Write *matrix* to *path* as :py:meth:`pandas.DataFrame.to_csv` would without a header or index, after substituting values with the text in *replacements*.
+
+	:param str path: File to write
+	:param numpy.ndarray matrix: Values to write
+	:param dict replacements: Dictionary mapping values to the text to write in their place
+	:param str dateFormat: Passed to :py:meth:`pandas.DataFrame.to_csv` as *date_format*
+	"""
+	# Columns holding a replaced value become object when the whole matrix is converted at once
+	objectColumns = numpy.zeros(matrix.shape[1], dtype=bool)
+	for value in replacements.keys():
+		objectColumns |= numpy.any(matrix == value, axis=0)
+
+	blocks = (matrix[start:stop, :] for (start, stop) in _rowBlocks(matrix.shape[0], matrix.shape[1], blockSize))
+	formatter = functools.partial(_formatIntensityRows, objectColumns=objectColumns, replacements=replacements, dateFormat=dateFormat)
+
+	writeBlocks(path, blocks, formatter, compression=compression, parallelise=parallelise, workers=workers)
+
+
+def _formatUnifiedRows(block, objectColumns, replacements, dateFormat):
+
+	(metadata, intensities) = block
+
+	frame = _intensityFrame(intensities, metadata.index, objectColumns, replacements)
+	frame = pandas.concat([metadata, frame], axis=1)
+
+	return frame.to_csv(None, header=False, date_format=dateFormat)
+
+
+def writeUnifiedCSV(path, sampleMetadata, featureMetadata, intensityData, dateFormat=None, replacements=None, compression=None, parallelise=False, workers=None, blockSize=2**18):
+	"""
+	Write *sampleMetadata*, *featureMetadata* and *intensityData* to *path* as one table, with a row for each column of *featureMetadata* followed by a row for each sample.
+
+	Output is identical to concatenating the transposed *featureMetadata* and *intensityData*, joining *sampleMetadata* on the left, and writing the result with :py:meth:`pandas.DataFrame.to_csv`; but the intensities are converted to text a block of samples at a time.
+
+	:param str path: File to write
+	:param pandas.DataFrame sampleMetadata: Sample metadata, rows matching those of *intensityData*
+	:param pandas.DataFrame featureMetadata: Feature metadata, rows matching the columns of *intensityData*
+	:param numpy.ndarray intensityData: Intensity values
+	:param str dateFormat: Passed to :py:meth:`pandas.DataFrame.to_csv` as *date_format*
+	:param replacements: Dictionary mapping intensity values to the text to write in their place
+	:type replacements: None or dict
+	"""
+	(noSamples, noFeatures) = intensityData.shape
+	transposedFeatures = featureMetadata.reset_index(drop=True).transpose()
+	noFeatureRows = transposedFeatures.shape[0]
+
+	# Sample metadata takes the dtypes it would have in the combined table, where feature rows are empty
+	rowIndex = transposedFeatures.index.append(pandas.RangeIndex(noSamples))
+	combinedMetadata = sampleMetadata.reset_index(drop=True).reindex(rowIndex)
+
+	# Intensity columns are object wherever feature metadata is, or where values are replaced
+	objectColumns = (transposedFeatures.dtypes == object).values
+	if replacements:
+		for value in replacements.keys():
+			objectColumns |= numpy.any(intensityData == value, axis=0)
+
+	featureRows = pandas.concat([combinedMetadata.iloc[:noFeatureRows], transposedFeatures], axis=1)
+	for column in numpy.flatnonzero(objectColumns):
+		featureRows[column] = featureRows[column].astype(object)
+
+	blocks = ((combinedMetadata.iloc[noFeatureRows + start:noFeatureRows + stop], intensityData[start:stop, :]) for (start, stop) in _rowBlocks(noSamples, noFeatures, blockSize))
+	formatter = functools.partial(_formatUnifiedRows, objectColumns=objectColumns, replacements=replacements, dateFormat=dateFormat)
+
+	header = featureRows.to_csv(None, date_format=dateFormat)
+
+	writeBlocks(path, blocks, formatter, header=header, compression=compression, parallelise=parallelise, workers=workers)
@@ -0,0 +1,189 @@
+"""
+Compact storage for the metadata tables recorded by :py:meth:`~nPYc.objects.Dataset.applyMasks`.
+"""
+import copy
+import weakref
+
+import numpy
+import pandas
+
+
+class ExclusionLedger(list):
+	"""
+	List of the metadata tables saved in :py:attr:`~nPYc.objects.Dataset.sampleMetadataExcluded` or :py:attr:`~nPYc.objects.Dataset.featureMetadataExcluded`.
+
+	Each exclusion saves the rows removed from one table, along with the whole of the other table as it stood at the time. Rather than keep a full copy of every version of a table, tables saved with :py:meth:`appendTable` are recorded as the positions of their rows in the version saved before, and copies of only the columns that have changed since. The first version saved is copied whole. :py:meth:`~nPYc.objects.Dataset.applyMasks` calls :py:meth:`supersede` whenever it replaces a table by a subset of its rows, to keep track of where the rows of the current table lie in the last version saved.
+
+	Tables are rebuilt whenever an entry is read, so the ledger behaves as a list of :py:class:`~pandas.DataFrame`. Entries hold no reference to the current table, so editing it does not alter the tables saved.
+	"""
+
+	def __init__(self, *args):
+
+		super().__init__(*args)
+
+		# Last table saved, the positions in it of the rows of the current table, and the current table
+		self._base = None
+		self._basePositions = None
+		self._live = None
+
+	def appendTable(self, table):
+		"""
+		Save a snapshot of *table*, as it stands now.
+
+		:param pandas.DataFrame table: Table to save
+		"""
+		if self._tracks(table):
+			record = _RecordedTable(self._base, self._basePositions, table)
+		else:
+			record = table.copy()
+
+		list.append(self, record)
+
+		self._base = record
+		self._basePositions = numpy.arange(table.shape[0])
+		self._live = weakref.ref(table)
+
+	def supersede(self, table, replacement, keptMask):
+		"""
+		Record that *table* has been replaced by *replacement*, holding only its *keptMask* rows.
+
+		:param pandas.DataFrame table: Table being replaced
+		:param pandas.DataFrame replacement: Table replacing *table*
+		:param numpy.ndarray keptMask: Boolean mask of rows of *table* kept in *replacement*
+		"""
+		if self._tracks(table):
+			self._basePositions = self._basePositions[numpy.array(keptMask, dtype=bool)]
+			self._live = weakref.ref(replacement)
+		else:
+			self._base = None
+			self._basePositions = None
+			self._live = None
+
+	def _tracks(self, table):
+		"""
+		``True`` if the rows of *table* can be related to the last table saved.
+		"""
+		return (self._live is not None) and (self._live() is table) and (self._basePositions.shape[0] == table.shape[0]) and table.columns.is_unique
+
+	def __getitem__(self, key):
+
+		if isinstance(key, slice):
+			return [_materialise(item) for item in list.__getitem__(self, key)]
+
+		return _materialise(list.__getitem__(self, key))
+
+	def __iter__(self):
+
+		for item in list.__iter__(self):
+			yield _materialise(item)
+
+	def __reversed__(self):
+
+		for item in list.__reversed__(self):
+			yield _materialise(item)
+
+	def pop(self, index=-1):
+
+		return _materialise(list.pop(self, index))
+
+	def copy(self):
+
+		return self.__copy__()
+
+	def __add__(self, other):
+
+		return list(self) + list(other)
+
+	def __radd__(self, other):
+
+		return list(other) + list(self)
+
+	def __repr__(self):
+
+		return repr(list(self))
+
+	def __copy__(self):
+
+		output = ExclusionLedger()
+		list.extend(output, list.__iter__(self))
+		output._base = self._base
+		output._basePositions = self._basePositions
+		output._live = self._live
+
+		return output
+
+	def __deepcopy__(self, memo):
+
+		output = ExclusionLedger()
+		memo[id(self)] = output
+		list.extend(output, copy.deepcopy(list(list.__iter__(self)), memo))
+
+		live = self._live() if self._live is not None else None
+		if live is not None:
+			output._base = copy.deepcopy(self._base, memo)
+			output._basePositions = self._basePositions
+			output._live = weakref.ref(copy.deepcopy(live, memo))
+
+		return output
+
+	def __reduce_ex__(self, protocol):
+
+		# Pickle the records as stored, the current table is not part of the ledger and is not tracked once unpickled
+		return (ExclusionLedger, (), {'entries': list(list.__iter__(self)), 'base': self._base, 'basePositions': self._basePositions})
+
+	def __setstate__(self, state):
+
+		list.extend(self, state['entries'])
+		self._base = state['base']
+		self._basePositions = state['basePositions']
+		self._live = None
+
+
+class _RecordedTable(object):
+	"""
+	Snapshot of a table, as the positions of its rows in an earlier record *base*, and copies of the columns that differ from *base*.
+
+	Positions in ascending order are held as a boolean mask of the rows of *base*, and the index only if it differs from that of those rows.
+	"""
+
+	def __init__(self, base, positions, table):
+
+		baseTable = _materialise(base)
+		baseRows = baseTable.iloc[positions, :]
+		rows = table.reset_index(drop=True)
+
+		self.base = base
+		if numpy.all(numpy.diff(positions) > 0):
+			self.positions = numpy.zeros(baseTable.shape[0], dtype=bool)
+			self.positions[positions] = True
+		else:
+			self.positions = positions
+		self.columns = table.columns.copy()
+		self.index = None if baseRows.index.identical(table.index) else table.index.copy()
+
+		baseRows = baseRows.reset_index(drop=True)
+		self.sharedColumns = [column for column in self.columns if column in baseRows.columns and baseRows[column].equals(rows[column])]
+		self.changedColumns = rows[[column for column in self.columns if column not in self.sharedColumns]].copy()
+
+	def materialise(self):
+		"""
+		Rebuild the table, taking unchanged columns from *base*.
+		"""
+		baseRows = _materialise(self.base).iloc[self.positions, :]
+		index = baseRows.index if self.index is None else self.index
+		baseRows = baseRows.reset_index(drop=True)
+
+		table = pandas.concat([baseRows[self.sharedColumns], self.changedColumns], axis=1, sort=False)
+		table = table[list(self.columns)]
+		table.columns = self.columns
+		table.index = index.copy()
+
+		return table
+
+
+def _materialise(item):
+
+	if isinstance(item, _RecordedTable):
+		return item.materialise()
+
+	return item
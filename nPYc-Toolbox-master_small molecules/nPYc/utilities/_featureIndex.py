@@ -0,0 +1,140 @@
+"""
+Lookup of feature positions by ID or by range, for :py:meth:`~nPYc.objects.Dataset.getFeatures`.
+"""
+import numpy
+import pandas
+
+
+class FeatureIndex(object):
+	"""
+	Index of the values in one column of :py:attr:`~nPYc.objects.Dataset.featureMetadata`.
+
+	Discrete IDs are found through a hash table of the first position of each value, ranges of numeric values by bisection of the column, if it is sorted in either direction, or of a sorted copy.
+
+	The index keeps a copy of the column it was built from, and :py:meth:`matches` compares it with the current column in full, so that the index is rebuilt after any change to the column, including edits to single values in place.
+
+	:param pandas.DataFrame featureMetadata: Table to index
+	:param str by: Column of *featureMetadata* to index
+	"""
+
+	def __init__(self, featureMetadata, by):
+
+		self.by = by
+
+		# Copy the column, rather than hold a view that would keep the whole table alive, or follow edits to it
+		self._values = numpy.array(featureMetadata[by].values)
+		self._firstPositions = None
+		self._direction = None
+		self._order = None
+		self._sortedValues = None
+
+	def matches(self, featureMetadata, by):
+		"""
+		``True`` if the index is still valid for column *by* of *featureMetadata*.
+		"""
+		if (by != self.by) or (by not in featureMetadata.columns):
+			return False
+
+		values = featureMetadata[by].values
+		if (values.shape != self._values.shape) or (values.dtype != self._values.dtype):
+			return False
+
+		equal = numpy.asarray(values == self._values)
+		if equal.shape != values.shape:
+			return False
+		if numpy.all(equal):
+			return True
+
+		# Compare missing values as equal
+		return bool(numpy.all(equal | (pandas.isnull(values) & pandas.isnull(self._values))))
+
+	def lookup(self, featureIDs):
+		"""
+		Find the position of the first occurrence of each ID in *featureIDs*.
+
+		:param list featureIDs: IDs to find
+		:return: Positions of *featureIDs*
+		:rtype: numpy.ndarray
+		:raises IndexError: if an ID is not present
+		"""
+		if self._firstPositions is None:
+			index = pandas.Index(self._values)
+			first = ~index.duplicated(keep='first')
+			self._firstPositions = pandas.Series(numpy.flatnonzero(first), index=index[first])
+
+		positions = self._firstPositions.reindex(pandas.Index(featureIDs, dtype=object, tupleize_cols=False)).values
+
+		for (featureID, position) in zip(featureIDs, positions):
+			if pandas.isnull(position):
+				raise IndexError('%s is not present in featureMetadata' % (featureID,))
+
+		return positions.astype(int)
+
+	def rangeLookup(self, ranges):
+		"""
+		Find the positions of features with values inside any of *ranges*, inclusive of the bounds.
+
+		:param list ranges: List of (bound, bound) tuples
+		:return: Positions of matching features in ascending order, as a :py:class:`slice` if they are contiguous
+		:rtype: slice or numpy.ndarray
+		"""
+		noFeatures = self._values.shape[0]
+
+		if self._direction is None:
+			difference = numpy.diff(self._values)
+			if numpy.all(difference >= 0):
+				self._direction = 1
+				self._sortedValues = self._values
+			elif numpy.all(difference <= 0):
+				self._direction = -1
+				self._sortedValues = self._values[::-1]
+			else:
+				# Missing values are sorted to the end, and never fall within a range
+				self._direction = 0
+				self._order = numpy.argsort(self._values, kind='stable')
+				self._sortedValues = self._values[self._order]
+
+		intervals = list()
+		for featureRange in ranges:
+			low = min(featureRange)
+			high = max(featureRange)
+			start = numpy.searchsorted(self._sortedValues, low, side='left')
+			stop = numpy.searchsorted(self._sortedValues, high, side='right')
+			if stop > start:
+				intervals.append((start, stop))
+
+		# Merge overlapping intervals
+		intervals.sort()
+		merged = list()
+		for (start, stop) in intervals:
+			if merged and (start <= merged[-1][1]):
+				merged[-1] = (merged[-1][0], max(stop, merged[-1][1]))
+			else:
+				merged.append((start, stop))
+
+		if self._direction == 0:
+			positions = numpy.concatenate([self._order[start:stop] for (start, stop) in merged]) if merged else numpy.array([], dtype=int)
+			positions.sort()
+			return asSlice(positions)
+
+		if self._direction == -1:
+			merged = [(noFeatures - stop, noFeatures - start) for (start, stop) in reversed(merged)]
+
+		if len(merged) == 0:
+			return slice(0, 0)
+		elif len(merged) == 1:
+			return slice(merged[0][0], merged[0][1])
+
+		return numpy.concatenate([numpy.arange(start, stop) for (start, stop) in merged])
+
+
+def asSlice(positions):
+	"""
+	Return *positions* as a :py:class:`slice` if they are ascending and contiguous.
+	"""
+	if positions.shape[0] == 0:
+		return slice(0, 0)
+	if (positions[-1] - positions[0] + 1 == positions.shape[0]) and numpy.all(numpy.diff(positions) == 1):
+		return slice(int(positions[0]), int(positions[-1]) + 1)
+
+	return positions
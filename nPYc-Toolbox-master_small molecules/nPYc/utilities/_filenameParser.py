@@ -0,0 +1,133 @@
+"""
+Parsing of sample metadata from standardised filenames, shared by :py:class:`~nPYc.objects.MSDataset`, :py:class:`~nPYc.objects.TargetedDataset` and :py:class:`~nPYc.objects.NMRDataset`.
+"""
+import functools
+import re
+import numpy
+import pandas
+
+from ..enumerations import AssayRole, SampleType
+
+# Patterns applied to the parts of a filename, compiled once
+_batchReferencePattern = re.compile(r'.+[B]\d+?[SE]\d+?')
+_blankPattern = re.compile(r'Blank')
+_injectionControlPattern = re.compile(r'E?IC')
+_exclusionPattern = re.compile(r'[Xx]')
+_matrixPattern = re.compile(r'^([AC-Z]{1,2})(?<!IC)$')
+_batchPattern = re.compile(r'B(\d+?)[SE]')
+_dilutionPattern = re.compile(r'(?:.+_?)(SRD\d\d)(?:_?.*)')
+
+_columnNames = {'chromatography': 'Chromatography',
+				'instrument': 'Instrument',
+				'study': 'Study',
+				'baseName': 'Sample Base Name',
+				'fileName': 'Sample File Name',
+				'suplementalInfo': 'Suplemental Info',
+				'ionisation': 'Ionisation',
+				'extraInjections': 'Suplemental Injections',
+				'reruns': 'Re-Run'}
+
+# Columns replaced when parsed metadata is merged into sampleMetadata
+_replacedColumns = ['AssayRole', 'SampleType', 'Sample Base Name', 'Dilution', 'Batch', 'Correction Batch']
+
+
+@functools.lru_cache(maxsize=None)
+def _compileFilenameSpec(filenameSpec):
+	"""
+	Compile *filenameSpec* as a verbose regular expression, once per distinct spec.
+	"""
+	return re.compile(filenameSpec, re.VERBOSE)
+
+
+def _extractFilenameParts(fileNames, filenameSpec):
+	"""
+	Break each filename in *fileNames* down into the named capture groups of *filenameSpec*.
+
+	:param pandas.Series fileNames: Filenames to parse
+	:param str filenameSpec: Regular expression, in verbose syntax, with a named group for each part of the filename
+	:return: Table with a column per named group, ``NaN`` where a filename does not match
+	:rtype: pandas.DataFrame
+	"""
+	return fileNames.str.extract(_compileFilenameSpec(filenameSpec), expand=False)
+
+
+def _parseFilenames(fileNames, filenameSpec, dilutionMap):
+	"""
+	Infer sample acquisition metadata from filenames following the MS naming template.
+
+	*filenameSpec* must capture the groups 'fileName', 'baseName', 'groupingKind', 'groupingNo', 'injectionKind', 'injectionNo', 'reference', 'exclusion', 'exclusion2', 'reruns' and 'extraInjections'. The filenames are parsed in one pass, and each of the masks used to classify samples found once and shared between *AssayRole* and *SampleType*.
+
+	:param pandas.Series fileNames: Filenames to parse
+	:param str filenameSpec: Regular expression, in verbose syntax
+	:param dict dilutionMap: Dilution (%) of each SRD level, by name ('SRD01', ...)
+	:return: Table of metadata, with a row for each filename, and a 'Sample File Name' column to merge on
+	:rtype: pandas.DataFrame
+	"""
+	fileNameParts = _extractFilenameParts(fileNames, filenameSpec)
+
+	# Deal with badly ordered exclusions
+	exclusion2 = fileNameParts.pop('exclusion2')
+	fileNameParts['exclusion'] = fileNameParts['exclusion'].where(exclusion2.isnull(), exclusion2)
+
+	# Classify samples
+	studyReference = (fileNameParts['reference'] == 'SR').values
+	batchReference = fileNameParts['baseName'].str.match(_batchReferencePattern, na=False).values.astype(bool)
+	externalReference = (fileNameParts['reference'] == 'LTR').values
+	methodReference = (fileNameParts['reference'] == 'MR').values
+	dilution = (fileNameParts['injectionKind'] == 'SRD').values
+	blank = fileNameParts['groupingKind'].str.match(_blankPattern, na=False).values.astype(bool)
+	injectionControl = fileNameParts['groupingKind'].str.match(_injectionControlPattern, na=False).values.astype(bool)
+
+	# Pass masks into enum fields, the first condition met taking precedence
+	fileNameParts['AssayRole'] = numpy.select([injectionControl, blank, dilution, studyReference | batchReference | externalReference | methodReference],
+											  [AssayRole.Assay, AssayRole.LinearityReference, AssayRole.LinearityReference, AssayRole.PrecisionReference],
+											  default=AssayRole.Assay)
+	fileNameParts['SampleType'] = numpy.select([injectionControl, blank, dilution, methodReference, externalReference, studyReference | batchReference],
+											   [SampleType.StudyPool, SampleType.ProceduralBlank, SampleType.StudyPool, SampleType.MethodReference, SampleType.ExternalReference, SampleType.StudyPool],
+											   default=SampleType.StudySample)
+
+	# Skipped runs
+	fileNameParts['Skipped'] = fileNameParts['exclusion'].str.match(_exclusionPattern, na=False)
+
+	# Get matrix
+	fileNameParts['Matrix'] = fileNameParts['groupingKind'].str.extract(_matrixPattern, expand=False).fillna('')
+
+	# Get well numbers
+	fileNameParts.loc[blank | injectionControl, 'injectionNo'] = -1
+	fileNameParts['Well'] = pandas.to_numeric(fileNameParts['injectionNo'])
+
+	# Plate / grouping no
+	fileNameParts['Plate'] = pandas.to_numeric(fileNameParts['groupingNo'])
+
+	# Get batch where it is explicit in file name
+	fileNameParts['Batch'] = pandas.to_numeric(fileNameParts['baseName'].str.extract(_batchPattern, expand=False))
+	fileNameParts['Correction Batch'] = numpy.nan
+
+	# Map dilution series names to dilution level, only searching names that can match
+	dilutionNames = fileNameParts['baseName'].where(fileNameParts['baseName'].str.contains('SRD', regex=False, na=False))
+	fileNameParts['Dilution'] = dilutionNames.str.extract(_dilutionPattern, expand=False).replace(dilutionMap).astype(float)
+
+	# Blank out NAs for neatness
+	fileNameParts['reruns'] = fileNameParts['reruns'].fillna('')
+	fileNameParts['extraInjections'] = fileNameParts['extraInjections'].fillna('')
+
+	# Drop unwanted columns, and swap in user friendly names
+	fileNameParts.drop(['exclusion', 'reference', 'groupingKind', 'injectionNo', 'injectionKind', 'groupingNo'], axis=1, inplace=True)
+	fileNameParts.rename(columns=_columnNames, inplace=True)
+
+	return fileNameParts
+
+
+def _mergeFilenameMetadata(sampleMetadata, fileNameParts):
+	"""
+	Merge metadata parsed by :py:func:`_parseFilenames` into *sampleMetadata*, on 'Sample File Name', replacing the sample classification and batch columns.
+
+	:param pandas.DataFrame sampleMetadata: Table to merge into
+	:param pandas.DataFrame fileNameParts: Parsed metadata
+	:return: Merged table
+	:rtype: pandas.DataFrame
+	"""
+	# first remove duplicate columns (from _dataset _init_)
+	sampleMetadata = sampleMetadata.drop([column for column in _replacedColumns if column in sampleMetadata.columns], axis=1)
+
+	return pandas.merge(sampleMetadata, fileNameParts, left_on='Sample File Name', right_on='Sample File Name', how='left', sort=False)
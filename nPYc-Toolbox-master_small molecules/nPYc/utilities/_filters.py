@@ -22,28 +22,44 @@ def blankFilter(dataset, threshold=None):
 		raise TypeError("threshold must be either None, False, or a float, %s provided." % (type(threshold)))
 
 	if threshold:
-		blanksMask = dataset.sampleMetadata['SampleType'].values == SampleType.ProceduralBlank
+		levels = _blankLevels(dataset)
 
-		blanksMask = numpy.logical_and(blanksMask, dataset.sampleMask)
-
-		if sum(blanksMask) <= 0:
+		if levels is None:
 			warnings.warn("No Procedural blank samples present, skipping blank filter.")
 			threshold = False
 
 	if threshold:
-		# Calculate abundance in SP samples and SS
-		sampleMask = numpy.logical_and(dataset.sampleMetadata['AssayRole'].values == AssayRole.Assay,
-							 dataset.sampleMetadata['SampleType'].values == SampleType.StudySample)
-
-		if sum(blanksMask) > 1:
-			p95 = numpy.percentile(dataset.intensityData[blanksMask, :], 95, axis=0)
-		else:
-			p95 = dataset.intensityData[blanksMask, :]
+		(sampleMeans, p95) = levels
 
-		mask = numpy.mean(dataset.intensityData[sampleMask,:], axis=0) >= (p95 * threshold)
+		mask = sampleMeans >= (p95 * threshold)
 
 		return mask, p95
 	else:
 		mask = numpy.squeeze(numpy.ones([dataset.noFeatures, 1], dtype=bool), axis=1)
 
 		return mask
+
+
+def _blankLevels(dataset):
+	"""
+	Mean intensity of each feature in study samples, and the 95th percentile of its intensity in procedural blanks, as compared by :py:func:`blankFilter`.
+
+	:param MSDataset dataset: Dataset object to process
+	:returns: Tuple of study sample means and blank levels, or ``None`` if no procedural blank samples are present
+	:rtype: None or tuple of numpy.ndarray
+	"""
+	roleMasks = dataset.roleMasks
+	blanksMask = numpy.logical_and(roleMasks[SampleType.ProceduralBlank, None], dataset.sampleMask)
+
+	if sum(blanksMask) <= 0:
+		return None
+
+	# Calculate abundance in SP samples and SS
+	sampleMask = roleMasks[SampleType.StudySample, AssayRole.Assay]
+
+	if sum(blanksMask) > 1:
+		p95 = numpy.percentile(dataset.intensityData[blanksMask, :], 95, axis=0)
+	else:
+		p95 = dataset.intensityData[blanksMask, :]
+
+	return (numpy.mean(dataset.intensityData[sampleMask,:], axis=0), p95)
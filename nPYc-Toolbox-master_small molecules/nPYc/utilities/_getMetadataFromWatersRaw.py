@@ -1,29 +1,36 @@
 import warnings
 import numpy
+import pandas
 from ..utilities.extractParams import *
-from datetime import datetime
 
-def getSampleMetadataFromWatersRawFiles(rawDataPath):
+def getSampleMetadataFromWatersRawFiles(rawDataPath, parallelise=False, workers=None, cachePath=None):
 	"""
 	Get acquisition metadata from Waters RAW files and returns them as a dataframe
 
 	:param str rawDataPath: Path to folder of raw data
+	:param bool parallelise: If ``True`` read raw data folders in a pool of worker threads, see :py:func:`~nPYc.utilities.extractParams`
+	:param workers: Number of worker threads to use when *parallelise* is ``True``
+	:type workers: None or int
+	:param cachePath: Path of a file to cache parameters in, so that only new or changed raw data is read on subsequent calls, if ``None`` do not cache
+	:type cachePath: None or str
 	"""
 
 	# Get the paramters as a table
-	instrumentParams = extractParams(rawDataPath, 'Waters .raw')
+	instrumentParams = extractParams(rawDataPath, 'Waters .raw', parallelise=parallelise, workers=workers, cachePath=cachePath)
 
 	# Strip any whitespace from 'Sample File Name'
 	instrumentParams['Sample File Name'] = instrumentParams['Sample File Name'].str.strip()
 
-	# Parse acqustion times
+	# Parse acqustion times, leaving those that can not be parsed as NaN
+	acquiredTime = pandas.to_datetime(instrumentParams['$$ Acquired Date:'].astype(str) + ' ' + instrumentParams['$$ Acquired Time:'].astype(str), format='%d-%b-%Y %H:%M:%S', errors='coerce')
+	parsed = acquiredTime.notnull().values
+
 	instrumentParams['Acquired Time'] = numpy.nan
-	for i in range(instrumentParams.shape[0]):
-		try:
-			instrumentParams.loc[i, 'Acquired Time'] = datetime.strptime(str(instrumentParams.loc[i, '$$ Acquired Date:']) + " " + str(instrumentParams.loc[i,'$$ Acquired Time:']), '%d-%b-%Y %H:%M:%S')
-		except ValueError:
-			pass
-		
+	if parsed.any():
+		values = numpy.full(instrumentParams.shape[0], numpy.nan, dtype=object)
+		values[parsed] = acquiredTime[parsed].dt.to_pydatetime()
+		instrumentParams['Acquired Time'] = pandas.Series(values, index=instrumentParams.index, dtype=object)
+
 	# Rename '$$ Acquired Time' and '$$ Acquired Date to avoid confusion
 	instrumentParams.rename(columns={'$$ Acquired Time:': 'Measurement Time'}, inplace=True)
 	instrumentParams.rename(columns={'$$ Acquired Date:': 'Measurement Date'}, inplace=True)
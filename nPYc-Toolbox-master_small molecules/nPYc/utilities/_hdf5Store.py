@@ -0,0 +1,332 @@
+"""
+Helpers to read and write the components of a :py:class:`~nPYc.objects.Dataset` to an HDF5 file.
+"""
+import json
+import numbers
+from datetime import datetime
+from enum import Enum
+
+import h5py
+import numpy
+import pandas
+
+from .. import enumerations
+from . import normalisation
+
+_stringType = h5py.string_dtype()
+
+
+def encodeJSON(obj):
+	"""
+	Serialise *obj* to JSON, tagging :py:class:`~datetime.datetime`, :py:mod:`~nPYc.enumerations` and numpy values so they are restored by :py:func:`decodeJSON`.
+
+	:param obj: Object to serialise
+	:return: JSON representation of *obj*
+	:rtype: str
+	:raises TypeError: if *obj* contains values that cannot be represented
+	"""
+	return json.dumps(obj, default=_encodeJSONDefault)
+
+
+def decodeJSON(text):
+	"""
+	Restore an object serialised with :py:func:`encodeJSON`.
+
+	:param str text: JSON representation
+	:return: Decoded object
+	"""
+	return json.loads(text, object_hook=_decodeJSONHook)
+
+
+def _encodeJSONDefault(obj):
+
+	if isinstance(obj, Enum):
+		return {'__enum__': obj.__class__.__name__, 'name': obj.name}
+	elif obj is pandas.NaT:
+		return {'__datetime__': None}
+	elif isinstance(obj, datetime):
+		return {'__datetime__': obj.isoformat()}
+	elif isinstance(obj, numpy.datetime64):
+		return {'__datetime__': str(pandas.Timestamp(obj).isoformat()) if not numpy.isnat(obj) else None}
+	elif isinstance(obj, numpy.ndarray):
+		return {'__ndarray__': obj.tolist(), 'dtype': obj.dtype.str}
+	elif isinstance(obj, numpy.generic):
+		return obj.item()
+	elif isinstance(obj, (set, frozenset)):
+		return {'__set__': list(obj)}
+
+	raise TypeError('Object of type %s cannot be stored.' % (obj.__class__.__name__))
+
+
+def _decodeJSONHook(obj):
+
+	if '__enum__' in obj:
+		return getattr(enumerations, obj['__enum__'])[obj['name']]
+	elif '__datetime__' in obj:
+		if obj['__datetime__'] is None:
+			return pandas.NaT
+		return pandas.Timestamp(obj['__datetime__']).to_pydatetime()
+	elif '__ndarray__' in obj:
+		return numpy.array(obj['__ndarray__'], dtype=obj['dtype'])
+	elif '__set__' in obj:
+		return set(obj['__set__'])
+
+	return obj
+
+
+def writeString(group, name, text):
+	"""
+	Store *text* as a scalar string dataset, avoiding the size limit on HDF5 attributes.
+	"""
+	group.create_dataset(name, data=text, dtype=_stringType)
+
+
+def readString(group, name):
+	"""
+	Read a string written by :py:func:`writeString`.
+	"""
+	return group[name].asstr()[()]
+
+
+def writeFrame(group, frame):
+	"""
+	Write the columns of :py:class:`~pandas.DataFrame` *frame* to *group*, one dataset per column.
+
+	Numeric and boolean columns are stored with their own dtype, datetime columns as nanoseconds since the epoch, columns of strings or of a single :py:mod:`~nPYc.enumerations` enum as strings, and any other column as one JSON-encoded string per value.
+
+	:param h5py.Group group: Group to write to
+	:param pandas.DataFrame frame: Table to store
+	"""
+	writeString(group, 'columns', encodeJSON(list(frame.columns)))
+	_writeColumn(group, 'index', frame.index.to_series())
+
+	for i, column in enumerate(frame.columns):
+		_writeColumn(group, 'column%i' % (i), frame.iloc[:, i])
+
+
+def readFrame(group, rows=None):
+	"""
+	Read a :py:class:`~pandas.DataFrame` written by :py:func:`writeFrame`.
+
+	:param h5py.Group group: Group to read from
+	:param rows: Sorted positions of rows to read, if ``None`` read all rows. When a subset is read the index is reset.
+	:type rows: None or numpy.ndarray
+	:return: Table read
+	:rtype: pandas.DataFrame
+	"""
+	columns = decodeJSON(readString(group, 'columns'))
+
+	data = dict()
+	for i in range(len(columns)):
+		data[i] = _readColumn(group['column%i' % (i)], rows)
+
+	if rows is None:
+		index = pandas.Index(_readColumn(group['index'], None))
+	else:
+		index = pandas.RangeIndex(len(rows))
+
+	frame = pandas.DataFrame(data, index=index)
+	frame.columns = columns
+
+	return frame
+
+
+def _writeColumn(group, name, series):
+
+	values = series.values
+	enumName = None
+	if pandas.api.types.is_bool_dtype(values.dtype) or pandas.api.types.is_numeric_dtype(values.dtype):
+		kind = 'numeric'
+		data = numpy.asarray(values)
+	elif pandas.api.types.is_datetime64_any_dtype(values.dtype):
+		kind = 'datetime'
+		data = numpy.asarray(values, dtype='datetime64[ns]').view(numpy.int64)
+	else:
+		values = numpy.asarray(values, dtype=object)
+		nonNull = [value for value in values if not _isNull(value)]
+		enumClasses = set(value.__class__ for value in nonNull)
+
+		if all(isinstance(value, str) for value in values):
+			kind = 'str'
+			data = values
+		elif (len(enumClasses) == 1) and issubclass(enumClasses.pop(), Enum):
+			kind = 'enum'
+			enumName = nonNull[0].__class__.__name__
+			data = numpy.array([value.name if isinstance(value, Enum) else '' for value in values], dtype=object)
+		else:
+			kind = 'json'
+			data = numpy.array([encodeJSON(value) for value in values], dtype=object)
+
+	if kind in ('numeric', 'datetime'):
+		dataset = group.create_dataset(name, data=data)
+	else:
+		dataset = group.create_dataset(name, data=data, dtype=_stringType)
+	dataset.attrs['kind'] = kind
+	if enumName is not None:
+		dataset.attrs['enum'] = enumName
+
+
+def _readColumn(dataset, rows):
+
+	kind = dataset.attrs['kind']
+
+	if kind in ('numeric', 'datetime'):
+		values = dataset[()]
+	else:
+		values = dataset.asstr()[()]
+	if rows is not None:
+		values = values[rows]
+
+	if kind == 'datetime':
+		return pandas.to_datetime(values)
+	elif kind == 'str':
+		return numpy.asarray(values, dtype=object)
+	elif kind == 'enum':
+		enum = getattr(enumerations, dataset.attrs['enum'])
+		return numpy.array([enum[value] if value != '' else None for value in values], dtype=object)
+	elif kind == 'json':
+		# Fill element-wise so list values are not broadcast into extra dimensions
+		decoded = numpy.empty(values.shape[0], dtype=object)
+		for i, value in enumerate(values):
+			decoded[i] = decodeJSON(value)
+		return decoded
+
+	return values
+
+
+def _isNull(value):
+
+	return (value is None) or (value is pandas.NaT) or (isinstance(value, numbers.Real) and numpy.isnan(value))
+
+
+def writeNormaliser(group, normaliser):
+	"""
+	Save the class and state of *normaliser* to *group*, arrays are stored as datasets and other values as JSON attributes.
+	"""
+	group.attrs['class'] = normaliser.__class__.__name__
+	for key, value in normaliser.__dict__.items():
+		if isinstance(value, numpy.ndarray):
+			group.create_dataset(key, data=value)
+		else:
+			group.attrs[key] = encodeJSON(value)
+
+
+def readNormaliser(group):
+	"""
+	Rebuild a normaliser saved by :py:func:`writeNormaliser`.
+
+	:rtype: nPYc.utilities.normalisation._normaliserABC.Normaliser
+	"""
+	cls = getattr(normalisation, group.attrs['class'])
+
+	normaliser = cls.__new__(cls)
+	for key, value in group.attrs.items():
+		if key != 'class':
+			setattr(normaliser, key, decodeJSON(value))
+	for key in group.keys():
+		setattr(normaliser, key, group[key][()])
+
+	return normaliser
+
+
+def selectionIndex(selection, length, name):
+	"""
+	Convert a boolean mask or list of positions into sorted, unique, integer positions.
+
+	:param selection: *length* element boolean mask, sequence of int positions, or ``None`` to select everything
+	:param int length: Size of the dimension being selected from
+	:param str name: Name of the selection, for error messages
+	:return: Positions selected, or ``None`` if *selection* is ``None``
+	:rtype: None or numpy.ndarray
+	:raises TypeError: if *selection* is not boolean or integer
+	:raises ValueError: if *selection* does not match *length*
+	"""
+	if selection is None:
+		return None
+
+	selection = numpy.asarray(selection)
+	if selection.ndim != 1:
+		raise ValueError('%s must be one-dimensional' % (name))
+
+	if selection.dtype == bool:
+		if selection.shape[0] != length:
+			raise ValueError('%s mask has %i elements, but the stored dataset has %i' % (name, selection.shape[0], length))
+		return numpy.flatnonzero(selection)
+	elif (selection.size == 0) or numpy.issubdtype(selection.dtype, numpy.integer):
+		selection = numpy.unique(selection.astype(numpy.intp))
+		if selection.size and ((selection[0] < 0) or (selection[-1] >= length)):
+			raise ValueError('%s positions must lie in the range 0 to %i' % (name, length - 1))
+		return selection
+	else:
+		raise TypeError('%s must be a boolean mask or a list of integer positions' % (name))
+
+
+def writeMatrix(group, name, matrix, compression=None):
+	"""
+	Write *matrix* to *group*.
+
+	If *compression* is ``None`` the matrix is stored contiguously, so it can later be memory-mapped, otherwise it is chunked and compressed.
+	"""
+	if (compression is None) or (matrix.size == 0):
+		group.create_dataset(name, data=matrix)
+	else:
+		group.create_dataset(name, data=matrix, chunks=True, compression=compression, shuffle=True)
+
+
+def readMatrix(dataset, rows=None, columns=None, blockSize=2**22):
+	"""
+	Read a subset of *rows* and *columns* from a two-dimensional HDF5 *dataset*.
+
+	Rows are read in blocks of approximately *blockSize* elements, each block reading only the span of stored columns covering *columns*.
+
+	:param h5py.Dataset dataset: Matrix to read from
+	:param rows: Sorted row positions to read, or ``None`` for all
+	:type rows: None or numpy.ndarray
+	:param columns: Sorted column positions to read, or ``None`` for all
+	:type columns: None or numpy.ndarray
+	:return: Selected values
+	:rtype: numpy.ndarray
+	"""
+	if (rows is None) and (columns is None):
+		return dataset[()]
+
+	(noRows, noColumns) = dataset.shape
+	if rows is None:
+		rows = numpy.arange(noRows)
+	if columns is None:
+		columns = numpy.arange(noColumns)
+
+	output = numpy.empty((rows.shape[0], columns.shape[0]), dtype=dataset.dtype)
+	if output.size == 0:
+		return output
+
+	columnStart = columns[0]
+	columnStop = columns[-1] + 1
+	columnPositions = columns - columnStart
+	step = max(1, blockSize // (columnStop - columnStart))
+
+	for start in range(0, rows.shape[0], step):
+		blockRows = rows[start:start + step]
+		if blockRows[-1] - blockRows[0] + 1 == blockRows.shape[0]:
+			block = dataset[blockRows[0]:blockRows[-1] + 1, columnStart:columnStop]
+		else:
+			block = dataset[blockRows, columnStart:columnStop]
+		output[start:start + blockRows.shape[0], :] = block[:, columnPositions]
+
+	return output
+
+
+def mapMatrix(dataset, path):
+	"""
+	Memory-map the contiguous two-dimensional *dataset*, held in the file at *path*.
+
+	The map is copy-on-write, changes are held in memory and never written back to the file.
+
+	:rtype: numpy.memmap
+	:raises ValueError: if *dataset* is chunked or compressed
+	"""
+	offset = dataset.id.get_offset()
+	if offset is None:
+		raise ValueError('%s in %s is chunked or compressed and cannot be memory-mapped, export with compression=None to allow mapping.' % (dataset.name, path))
+
+	return numpy.memmap(path, dtype=dataset.dtype, mode='c', offset=offset, shape=dataset.shape)
@@ -1,6 +1,8 @@
 import os
 import numpy
 import warnings
+import functools
+import multiprocessing
 from xml.etree import ElementTree
 
 from ..utilities._calibratePPMscale import calibratePPM
@@ -9,7 +11,7 @@ from ..utilities._fitPeak import integrateResonance
 from ..utilities._nmr import interpolateSpectrum
 from ..utilities import extractParams
 
-def importBrukerSpectra(path, pulseProgram, pdata, Attributes):
+def importBrukerSpectra(path, pulseProgram, pdata, Attributes, parallelise=False, workers=None):
 	"""
 	Load processed Bruker spectra found under *path*, with a pulse program that matches *pulseProgram*.
 
@@ -27,14 +29,24 @@ def importBrukerSpectra(path, pulseProgram, pdata, Attributes):
 	LWpeakIntesityFraction float The integrated LW peak must exceed the fractional baseline intergral by this percentage fraction
 	====================== ===== =========================
 
+	When *parallelise* is ``True`` spectra are loaded and processed in a pool of worker processes, results are returned in the same order, and with the same per-file warnings, as when loading serially.
+
 	:param str path: Find all matching spectra under this directory tree
 	:param str pulseProgram: Only load spectra acquired with a matching pulse program
 	:param int pdata: Load processed data fromt the specified pdata
 	:param dict Attributes: Dictionary of configuration parameters
+	:param bool parallelise: If ``True`` process spectra in parallel
+	:param workers: Number of worker processes to use when *parallelise* is ``True``, if ``None`` use one less than the number of CPU cores
+	:type workers: None or int
 	:returns: Tuple of (spectra, ppm, metadata)
 	:rtype: (numpy.array, numpy.array, pandas.DataFrame)
+	:raises TypeError: if *workers* is not ``None`` or a positive integer
 	"""
 
+	if workers is not None:
+		if not (isinstance(workers, int) and (workers > 0)):
+			raise TypeError('workers must be a positive integer')
+
 	metadata = extractParams(path, 'Bruker', pdata=pdata)
 
 	if metadata.shape[0] == 0:
@@ -50,73 +62,107 @@ def importBrukerSpectra(path, pulseProgram, pdata, Attributes):
 		raise ValueError("No Bruker format spectra acquired with the '%s' pulse program found." % (pulseProgram))
 
 	intensityData = numpy.zeros((metadata.shape[0], Attributes['variableSize']))
-	skipERETIC = False
 
-	metadata['Delta PPM'] = numpy.nan
-	metadata['ERETIC Integral'] = numpy.nan
-	metadata['ERETIC Concentration (mM)'] = numpy.nan
-	metadata['Line Width (Hz)'] = numpy.nan
-	metadata['Warnings'] = ''
 	ppm = numpy.linspace(Attributes['bounds'][1], Attributes['bounds'][0], Attributes['variableSize'])
-	for row in metadata.iterrows():
-		try:
-			##
-			# Load spectral data
-			##
-			spectrum, localPPM = importBrukerSpectrum(row[1]['File Path'],
-													row[1]['OFFSET'],
-													row[1]['SW_p'],
-													row[1]['NC_proc'],
-													row[1]['SF'],
-													row[1]['SI'],
-													row[1]['BYTORDP'])
-
-			##
-			# Do per-spectrum QC work here
-			##
-			##
-			# If QuantFactorSample.xml exists, intergrate ERETIC siginal
-			##
-			quantFilePath = os.path.dirname(row[1]['File Path'])
-			quantFilePath = os.path.join(quantFilePath, '..', '..', 'QuantFactorSample.xml')
-
-			if os.path.isfile(quantFilePath):
-				try:
-					position, erLineWidth, concentration = parseQuantFactorSample(quantFilePath)
-
-					metadata.loc[row[0], 'ERETIC Concentration (mM)'] = concentration
-					metadata.loc[row[0], 'ERETIC Integral'] = integrateResonance(spectrum, localPPM, position)
-				except:
-					metadata.loc[row[0], 'Warnings'] = 'Error calculating ERETIC integral'
-					warnings.warn('Error parsing `QuantFactorSample`.\nSkipping integration of ERETIC signal for %s.' % (row[1]['File Path']))
-
-			##
-			# Calibrate PPM scale
-			##
-			spectrum, localPPM, deltaPPM = calibratePPM(Attributes['alignTo'], Attributes['calibrateTo'], Attributes['ppmSearchRange'], localPPM, spectrum)
-			metadata.loc[row[0], 'Delta PPM'] = deltaPPM
-
-			lwHz = lineWidth(spectrum, localPPM, metadata.loc[row[0], 'SF'], Attributes['LWpeakRange'],
-							multiplicity=Attributes['LWpeakMultiplicity'],
-							peakIntesityFraction=Attributes['LWpeakIntesityFraction'])
-			metadata.loc[row[0], 'Line Width (Hz)'] = lwHz
-
-			##
-			# Interpolate onto common scale
-			##
-			intensityData[row[0], :] = interpolateSpectrum(spectrum, localPPM, ppm)
-
-		except:
-			metadata.loc[row[0], 'Warnings'] = 'Error loading file'
-			warnings.warn("Error loading '%s'" % (row[1]['File Path']))
+	parameters = {key: Attributes[key] for key in ['alignTo', 'calibrateTo', 'ppmSearchRange', 'LWpeakRange', 'LWpeakMultiplicity', 'LWpeakIntesityFraction']}
+	tasks = [(row[0], row[1]['File Path'], row[1]['OFFSET'], row[1]['SW_p'], row[1]['NC_proc'], row[1]['SF'], row[1]['SI'], row[1]['BYTORDP']) for row in metadata.iterrows()]
+	processSpectrum = functools.partial(_processBrukerSpectrum, ppm=ppm, parameters=parameters)
+
+	if parallelise:
+		# Use one less workers than CPU cores, unless told otherwise
+		if workers is not None:
+			cores = workers
+		else:
+			cores = max(multiprocessing.cpu_count() - 1, 1)
+
+		with multiprocessing.Pool(processes=cores) as pool:
+			records = pool.map(processSpectrum, tasks, chunksize=max(1, len(tasks) // (4 * cores)))
+	else:
+		records = map(processSpectrum, tasks)
+
+	columns = {'Delta PPM': [], 'ERETIC Integral': [], 'ERETIC Concentration (mM)': [], 'Line Width (Hz)': [], 'Warnings': []}
+	for record in records:
+		if record['spectrum'] is not None:
+			intensityData[record['index'], :] = record['spectrum']
+		for column in columns.keys():
+			columns[column].append(record[column])
+		for message in record['messages']:
+			warnings.warn(message)
+
+	for column in columns.keys():
+		metadata[column] = columns[column]
 
 	return intensityData, ppm, metadata
 
 
+def _processBrukerSpectrum(task, ppm, parameters):
+	"""
+	Load, calibrate, and interpolate a single spectrum onto *ppm*, calculating its per-spectrum QC values.
+
+	:param tuple task: Row index followed by the *File Path*, *OFFSET*, *SW_p*, *NC_proc*, *SF*, *SI*, and *BYTORDP* parameters of the spectrum
+	:param numpy.ndarray ppm: Common ppm scale
+	:param dict parameters: Calibration and line width parameters, as for :py:func:`importBrukerSpectra`
+	:returns: Dictionary of QC values, 'Warnings', the interpolated 'spectrum' (``None`` on failure), and any warning 'messages' to be raised
+	:rtype: dict
+	"""
+	index, filePath, offset, sw_p, nc_proc, sf, si, bytordp = task
+
+	record = {'index': index, 'spectrum': None, 'messages': [], 'Warnings': '',
+			  'Delta PPM': numpy.nan, 'ERETIC Integral': numpy.nan, 'ERETIC Concentration (mM)': numpy.nan, 'Line Width (Hz)': numpy.nan}
+	try:
+		##
+		# Load spectral data
+		##
+		spectrum, localPPM = importBrukerSpectrum(filePath, offset, sw_p, nc_proc, sf, si, bytordp)
+
+		##
+		# Do per-spectrum QC work here
+		##
+		##
+		# If QuantFactorSample.xml exists, intergrate ERETIC siginal
+		##
+		quantFilePath = os.path.dirname(filePath)
+		quantFilePath = os.path.join(quantFilePath, '..', '..', 'QuantFactorSample.xml')
+
+		if os.path.isfile(quantFilePath):
+			try:
+				position, erLineWidth, concentration = parseQuantFactorSample(quantFilePath)
+
+				record['ERETIC Concentration (mM)'] = concentration
+				record['ERETIC Integral'] = integrateResonance(spectrum, localPPM, position)
+			except:
+				record['Warnings'] = 'Error calculating ERETIC integral'
+				record['messages'].append('Error parsing `QuantFactorSample`.\nSkipping integration of ERETIC signal for %s.' % (filePath))
+
+		##
+		# Calibrate PPM scale
+		##
+		spectrum, localPPM, deltaPPM = calibratePPM(parameters['alignTo'], parameters['calibrateTo'], parameters['ppmSearchRange'], localPPM, spectrum)
+		record['Delta PPM'] = deltaPPM
+
+		lwHz = lineWidth(spectrum, localPPM, sf, parameters['LWpeakRange'],
+						multiplicity=parameters['LWpeakMultiplicity'],
+						peakIntesityFraction=parameters['LWpeakIntesityFraction'])
+		record['Line Width (Hz)'] = lwHz
+
+		##
+		# Interpolate onto common scale
+		##
+		record['spectrum'] = interpolateSpectrum(spectrum, localPPM, ppm)
+
+	except:
+		record['Warnings'] = 'Error loading file'
+		record['messages'].append("Error loading '%s'" % (filePath))
+
+	return record
+
+
 def importBrukerSpectrum(path, offset, sw_p, nc_proc, sf, si, bytordp):
 	"""
 	Load processed 1D Bruker spectra (*1r* files) from *path*.
 
+	The file is memory-mapped and scaled by 2\ :sup:`NC_proc` in a single pass, without an intermediate copy of the raw integers.
+
 	:param str path: Path to *1r* file
 	:param float offset: *offset* (ppm value of the first data point of the spectrum) parameter from *procs* file
 	:param float sw_p: *SW_p* (spectral width) parameter from *procs* file
@@ -125,6 +171,8 @@ def importBrukerSpectrum(path, offset, sw_p, nc_proc, sf, si, bytordp):
 	:param int si: *SI* (number of points in the processed data) parameter from *procs* file
 	:param int bytordp: *BYTORDP* parameter from *procs* file
 	:param int xdim: *XDIM* (submatrix size) parameter from *procs* file (only relevant for 2D data)
+	:returns: Tuple of (spectrum, ppm)
+	:rtype: (numpy.ndarray, numpy.ndarray)
 	"""
 
 	##
@@ -142,22 +190,10 @@ def importBrukerSpectrum(path, offset, sw_p, nc_proc, sf, si, bytordp):
 	if not os.path.isfile(path):
 		raise IOError('Unable to read %s' % (path))
 
-	##
-	# Parse endianness for numpy
-	##
-	if int(bytordp) == 0:
-		machine_format = '<i4'
-	else:
-		machine_format = '>i4'
-
 	##
 	# Open and read spectrum
 	##
-	fid = open(path, 'rb')
-	x1 = pow(2, int(nc_proc))
-	dim1 = numpy.fromfile(fid, dtype=machine_format)
-	spectra_real = (dim1 * x1)
-	fid.close()
+	spectra_real = _read1r(path, nc_proc, bytordp)
 
 	##
 	# Build ppm scale
@@ -169,6 +205,41 @@ def importBrukerSpectrum(path, offset, sw_p, nc_proc, sf, si, bytordp):
 	return spectra_real, spectra_ppm
 
 
+def _read1r(path, nc_proc, bytordp):
+	"""
+	Read the 32 bit integer points of a *1r* file via a read-only memory map, scaled by 2\ :sup:`NC_proc`.
+
+	:param str path: Path to *1r* file
+	:param int nc_proc: *NC_proc* intensity scaling factor
+	:param int bytordp: *BYTORDP*, 0 for little endian, otherwise big endian
+	:returns: Scaled points
+	:rtype: numpy.ndarray
+	"""
+
+	##
+	# Parse endianness for numpy
+	##
+	if int(bytordp) == 0:
+		machine_format = numpy.dtype('<i4')
+	else:
+		machine_format = numpy.dtype('>i4')
+
+	x1 = pow(2, int(nc_proc))
+
+	# Trailing bytes that do not make up a whole point are ignored, as by numpy.fromfile
+	noPoints = os.path.getsize(path) // machine_format.itemsize
+	if noPoints == 0:
+		dim1 = numpy.zeros(0, dtype=machine_format)
+	else:
+		dim1 = numpy.memmap(path, dtype=machine_format, mode='r', shape=(noPoints,))
+
+	try:
+		return numpy.asarray(dim1 * x1)
+	finally:
+		# Release the mapping so the file is not held open
+		del dim1
+
+
 def parseQuantFactorSample(path):
 	"""
 	Parse Bruker QuantFactorSample.xml to get location of ERETIC signal
@@ -1,5 +1,7 @@
 import os
 
+import numpy
+
 def _copyBackingFiles(toolboxPath, output):
 	"""
 	Copy templates files to the 'graphics' sub-directory of the output directory when needed.
@@ -11,9 +13,11 @@ def _copyBackingFiles(toolboxPath, output):
 	shutil.copy(os.path.join(toolboxPath, 'Templates', 'toolbox_logo.png'), os.path.join(output, 'toolbox_logo.png'))
 
 
-def _vcorrcoef(X, Y, method='pearson', sampleMask=None, featureMask=None):
+def _vcorrcoef(X, Y, method='pearson', sampleMask=None, featureMask=None, chunkSize=2**22):
 	"""
 	Calculate correlation between each column in *X* and the vector *Y*. Correlations may be calculated either as Pearson's *r* [#]_ or Spearman's rho [#]_ .
+
+	Columns of *X* are processed in chunks, so that temporaries never exceed approximately *chunkSize* elements, see :py:func:`_vcorrcoefByGroup`.
 	
 	[#] Karl Pearson (20 June 1895) "Notes on regression and inheritance in the case of two parents," *Proceedings of the Royal Society of London*, 58 : 240–242.
 	[#] Myers, Jerome L.; Well, Arnold D. (2003). *Research Design and Statistical Analysis (2nd ed.)*. Lawrence Erlbaum. p. 508. ISBN 0-8058-4037-0.
@@ -25,38 +29,194 @@ def _vcorrcoef(X, Y, method='pearson', sampleMask=None, featureMask=None):
 	:type sampleMask: None or numpy.ndarray of bool
 	:param featureMask: If ``None`` calculate correlations for all features
 	:type featureMask: None or numpy.ndarray of bool
+	:param int chunkSize: Approximate number of elements of *X* to process at once
 	"""
-	import numpy
-	import scipy
 
-	if sampleMask is None:
-		pass
-	else:
-		Y = Y[sampleMask]
-		X = X[sampleMask,:]
+	return _vcorrcoefByGroup(X, Y, [sampleMask], method=method, featureMask=featureMask, chunkSize=chunkSize)[0]
+
+
+def _vcorrcoefByGroup(X, Y, sampleMasks, method='pearson', featureMask=None, chunkSize=2**22):
+	"""
+	Calculate correlation between each column in *X* and the vector *Y*, separately within each of several subsets of samples, in a single pass over *X*.
+
+	Columns of *X* are read in chunks of approximately *chunkSize* elements, and each chunk correlated to *Y* in every subset before moving on to the next. With *method* = 'spearman' the chunk is ranked within each subset by :py:func:`_rankColumns`.
+
+	Correlations that are undefined, such as for constant columns or columns containing ``NaN``, are returned as zero.
+
+	:param numpy.ndarray X: *n* by *m* matrix
+	:param numpy.ndarray Y: Vector of *n* values
+	:param list sampleMasks: *k* boolean masks of *n* samples, or ``None`` to use all samples
+	:param str method: Correlation method to use, may be 'pearson', or 'spearman'
+	:param featureMask: If ``None`` calculate correlations for all features
+	:type featureMask: None or numpy.ndarray of bool
+	:param int chunkSize: Approximate number of elements of *X* to process at once
+	:return: *k* by *m* matrix of correlations, one row per mask
+	:rtype: numpy.ndarray
+	"""
+	Y = numpy.asarray(Y, dtype=float)
 
 	if featureMask is None:
-		pass
+		columns = numpy.arange(X.shape[1])
 	else:
-		X = X[:,featureMask]
+		columns = numpy.flatnonzero(featureMask)
 
-	if method == 'spearman':
-		rankedMat = numpy.zeros_like(X)
-		for col in range(X.shape[1]):
-			rankedMat[:, col] = scipy.stats.rankdata(X[:,col])
-		X = rankedMat
-		Y = scipy.stats.rankdata(Y)
+	# Centre Y within each subset once
+	groups = list()
+	for sampleMask in sampleMasks:
+		if sampleMask is None:
+			rows = numpy.arange(X.shape[0])
+		else:
+			rows = numpy.flatnonzero(sampleMask)
 
-	X = X.T
+		y = Y[rows]
+		if method == 'spearman':
+			y = _rankColumns(y[:, numpy.newaxis])[:, 0]
+		with numpy.errstate(invalid='ignore', divide='ignore'):
+			y = y - numpy.mean(y)
+		groups.append((rows, y, numpy.sum(y ** 2)))
 
-	# From https://waterprogramming.wordpress.com/2014/06/13/numpy-vectorized-correlation-coefficient/
-	Xm = numpy.reshape(numpy.mean(X,axis=1),(X.shape[0],1))
-	ym = numpy.mean(Y)
-	r_num = numpy.sum((X-Xm)*(Y-ym),axis=1)
-	r_den = numpy.sqrt(numpy.sum(numpy.power((X-Xm), 2),axis=1)*numpy.sum(numpy.power((Y-ym), 2)))
-	r = r_num/r_den
+	r = numpy.zeros((len(groups), columns.shape[0]))
+	step = max(1, chunkSize // max(1, X.shape[0]))
+
+	for start in range(0, columns.shape[0], step):
+		stop = start + step
+		if featureMask is None:
+			chunk = X[:, start:stop]
+		else:
+			chunk = X[:, columns[start:stop]]
+
+		for (index, (rows, y, ySquares)) in enumerate(groups):
+			values = chunk[rows, :]
+			if method == 'spearman':
+				values = _rankColumns(values)
+
+			with numpy.errstate(invalid='ignore', divide='ignore'):
+				values = values - numpy.mean(values, axis=0)
+				r[index, start:stop] = numpy.dot(y, values) / numpy.sqrt(numpy.sum(values ** 2, axis=0) * ySquares)
 
 	# Set NaNs to zero correlation
 	r[numpy.isnan(r)] = 0
 
 	return r
+
+
+def _rankColumns(X):
+	"""
+	Rank the values in each column of *X*, averaging the ranks of ties as :py:func:`scipy.stats.rankdata` does by default.
+
+	Each column is sorted once, and runs of tied values located by comparing neighbours in sorted order, so that all columns are ranked together without a Python loop. Columns containing ``NaN`` are ranked ``NaN`` throughout.
+
+	:param numpy.ndarray X: *n* by *m* matrix
+	:return: *n* by *m* matrix of ranks, starting at 1
+	:rtype: numpy.ndarray
+	"""
+	X = numpy.asarray(X)
+	(noRows, noColumns) = X.shape
+	ranks = numpy.empty((noRows, noColumns))
+	if noRows == 0:
+		return ranks
+
+	order = numpy.argsort(X, axis=0, kind='mergesort')
+	sortedX = numpy.take_along_axis(X, order, axis=0)
+	positions = numpy.arange(noRows)[:, numpy.newaxis]
+
+	# Mark the first and last sorted position of each run of tied values
+	runStarts = numpy.empty((noRows, noColumns), dtype=bool)
+	runStarts[0, :] = True
+	numpy.not_equal(sortedX[1:, :], sortedX[:-1, :], out=runStarts[1:, :])
+	runEnds = numpy.empty((noRows, noColumns), dtype=bool)
+	runEnds[-1, :] = True
+	runEnds[:-1, :] = runStarts[1:, :]
+
+	# Spread the run bounds to every member of the run, and average them to give the rank
+	first = numpy.maximum.accumulate(numpy.where(runStarts, positions, 0), axis=0)
+	last = numpy.minimum.accumulate(numpy.where(runEnds, positions, noRows - 1)[::-1, :], axis=0)[::-1, :]
+	numpy.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=0)
+
+	# NaNs sort last
+	if numpy.issubdtype(X.dtype, numpy.floating):
+		ranks[:, numpy.isnan(sortedX[-1, :])] = numpy.nan
+
+	return ranks
+
+
+class _PairedCorrelation:
+	"""
+	Pearson's *r* between many pairs of columns of a matrix, calculated in one pass.
+
+	The columns referenced by any pair are centred once, and the cross products for each pair accumulated in chunks, so that temporaries never exceed *chunkSize* elements. The sums are retained, allowing the correlations to be downdated with :py:meth:`removeRows` when rows are later deleted from the matrix, at a cost proportional to the number of rows removed.
+
+	:param numpy.ndarray X: Matrix of samples (rows) by features (columns)
+	:param numpy.ndarray first: Column index of the first member of each pair
+	:param numpy.ndarray second: Column index of the second member of each pair
+	:param int chunkSize: Maximum number of elements held in temporary arrays
+	"""
+
+	def __init__(self, X, first, second, chunkSize=2**22):
+		first = numpy.asarray(first, dtype=int)
+		second = numpy.asarray(second, dtype=int)
+
+		self.chunkSize = chunkSize
+		self.columns, inverse = numpy.unique(numpy.concatenate((first, second)), return_inverse=True)
+		self.first = inverse[:len(first)]
+		self.second = inverse[len(first):]
+
+		X = numpy.array(X[:, self.columns], dtype=float)
+		self.noRows = X.shape[0]
+		if self.noRows > 0:
+			self.shift = numpy.mean(X, axis=0)
+		else:
+			self.shift = numpy.zeros(X.shape[1])
+
+		X -= self.shift
+		self.sum = numpy.sum(X, axis=0)
+		self.sumOfSquares = numpy.einsum('ij,ij->j', X, X)
+		self.crossSum = self._crossProducts(X)
+
+
+	def _crossProducts(self, X):
+		"""
+		Sum of the products of the two columns of each pair, over the rows of the centred matrix *X*.
+		"""
+		crossSum = numpy.zeros(len(self.first))
+		step = max(1, self.chunkSize // max(1, X.shape[0]))
+		for start in range(0, len(self.first), step):
+			crossSum[start:start+step] = numpy.einsum('ij,ij->j', X[:, self.first[start:start+step]], X[:, self.second[start:start+step]])
+
+		return crossSum
+
+
+	def removeRows(self, rows):
+		"""
+		Downdate the sums to exclude *rows*, which must have been part of the matrix the correlations were calculated on.
+
+		:param numpy.ndarray rows: The deleted rows, with all the columns of the original matrix
+		:return: ``False`` (and the sums are left untouched) if *rows* hold non-finite values in paired columns, in which case the correlations have to be recalculated from scratch
+		:rtype: bool
+		"""
+		rows = numpy.array(rows[:, self.columns], dtype=float)
+		if not numpy.all(numpy.isfinite(rows)):
+			return False
+
+		rows -= self.shift
+		self.noRows -= rows.shape[0]
+		self.sum -= numpy.sum(rows, axis=0)
+		self.sumOfSquares -= numpy.einsum('ij,ij->j', rows, rows)
+		self.crossSum -= self._crossProducts(rows)
+
+		return True
+
+
+	def correlation(self):
+		"""
+		:return: Pearson's *r* for each pair, ``NaN`` where either column is constant, as :py:func:`numpy.corrcoef`
+		:rtype: numpy.ndarray
+		"""
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			variance = self.sumOfSquares - self.sum**2 / self.noRows
+			covariance = self.crossSum - self.sum[self.first] * self.sum[self.second] / self.noRows
+			r = covariance / numpy.sqrt(variance[self.first] * variance[self.second])
+
+			r[(variance[self.first] <= 0) | (variance[self.second] <= 0)] = numpy.nan
+
+		return numpy.clip(r, -1, 1)
@@ -3,39 +3,102 @@ import pandas
 import math
 
 
-def interpolateSpectrum(spectrum, originalScale, targetScale):
+def interpolateSpectrum(spectrum, originalScale, targetScale, out=None):
 	"""
-	Interpolate spectra onto *targetScale* using python interp1d
+	Linearly interpolate spectra onto *targetScale*, giving the same values as :py:func:`numpy.interp` or :py:class:`scipy.interpolate.interp1d`.
 
-	:param spectrum: the raw spectrum
+	*spectrum* may be a single spectrum or a 2D stack of spectra (one per row), and *originalScale* either a single scale shared by all spectra or a stack of scales matching *spectrum*. Bracketing indices and weights are calculated once for each distinct scale, and all spectra sharing that scale regridded together, so that the whole stack is filled in one pass.
+
+	:param spectrum: the raw spectrum, or stack of spectra
 	:type spectrum: array
-	:param originalScale: the ppm
-	:type originalScale:array
+	:param originalScale: the ppm, or stack of ppm scales, may be in ascending or descending order
+	:type originalScale: array
 	:param targetScale: the scale
 	:type targetScale: array
+	:param out: If not ``None``, write the interpolated spectra into this array, of the shape that would be returned
+	:type out: None or array
 	:returns: interpolatedSpectra
 	:rtype: array
+	:raises ValueError: if *spectrum* is not 1D or 2D, *originalScale* does not match *spectrum*, or *targetScale* extends beyond an original scale
 	"""
 
-	from scipy.interpolate import interp1d
-
+	spectrum = numpy.asarray(spectrum)
 	if spectrum.ndim == 2:
-		noSpectra = spectrum.shape[0]
+		spectra = spectrum
 	elif spectrum.ndim == 1:
-		noSpectra = 1
+		spectra = spectrum[numpy.newaxis, :]
 	else:
 		raise ValueError("Interpolation is only supported for either a single or 2d array of 1D spectra.")
 
-	if noSpectra == 1:
-		interpolatedSpectrum = interp1d(originalScale,spectrum)(targetScale)
+	originalScale = numpy.asarray(originalScale, dtype=float)
+	targetScale = numpy.asarray(targetScale, dtype=float)
+	if originalScale.ndim == 1:
+		originalScale = originalScale[numpy.newaxis, :]
+	if (originalScale.ndim != 2) or (originalScale.shape[1] != spectra.shape[1]) or (originalScale.shape[0] not in [1, spectra.shape[0]]):
+		raise ValueError("originalScale must be a single scale, or one scale per spectrum, of the same length as the spectra.")
 
+	if out is None:
+		interpolatedSpectrum = numpy.empty((spectra.shape[0], targetScale.size))
+	elif spectrum.ndim == 1:
+		interpolatedSpectrum = out[numpy.newaxis, :]
 	else:
-		interpolatedSpectrum = numpy.zeros(shape=(noSpectra, len(targetScale)))
+		interpolatedSpectrum = out
 
-		for i in range(noSpectra):
-			interpolatedSpectrum[i,:] = interp1d(originalScale,spectrum[i,:], assume_sorted=True)(targetScale)
-
-	return interpolatedSpectrum
+	# Group spectra by scale, spectra calibrated by circular shifting commonly share one
+	if originalScale.shape[0] == 1:
+		groups = [(originalScale[0, :], numpy.arange(spectra.shape[0]))]
+	else:
+		groupIndices = dict()
+		for i in range(originalScale.shape[0]):
+			groupIndices.setdefault(originalScale[i, :].tobytes(), []).append(i)
+		groups = [(originalScale[indices[0], :], numpy.array(indices)) for indices in groupIndices.values()]
+
+	for scale, rows in groups:
+		# Brackets and weights, as in numpy.interp
+		order = numpy.argsort(scale, kind='mergesort')
+		sortedScale = scale[order]
+
+		if numpy.any(targetScale < sortedScale[0]):
+			raise ValueError("A value in x_new is below the interpolation range.")
+		if numpy.any(targetScale > sortedScale[-1]):
+			raise ValueError("A value in x_new is above the interpolation range.")
+
+		lo = numpy.clip(numpy.searchsorted(sortedScale, targetScale, side='right') - 1, 0, max(sortedScale.size - 2, 0))
+		hi = numpy.minimum(lo + 1, sortedScale.size - 1)
+		step = sortedScale[hi] - sortedScale[lo]
+		distance = targetScale - sortedScale[lo]
+		exact = targetScale == sortedScale[lo]
+		last = targetScale >= sortedScale[-1]
+		lo = order[lo]
+		hi = order[hi]
+
+		# Regrid a block of spectra at a time to bound temporaries
+		blockSize = max(1, 2**22 // max(1, targetScale.size))
+		for start in range(0, rows.size, blockSize):
+			block = rows[start:start+blockSize, numpy.newaxis]
+			yLo = spectra[block, lo].astype(float)
+			yHi = spectra[block, hi].astype(float)
+
+			with numpy.errstate(divide='ignore', invalid='ignore'):
+				slope = (yHi - yLo) / step
+				values = slope * distance + yLo
+
+				# If we get nan in one direction, try the other
+				retry = numpy.isnan(values)
+				if numpy.any(retry):
+					values[retry] = (slope * (targetScale - scale[hi]) + yHi)[retry]
+					retry = numpy.isnan(values) & (yLo == yHi)
+					values[retry] = yLo[retry]
+
+			values[:, exact] = yLo[:, exact]
+			values[:, last] = spectra[block, order[-1]].astype(float)
+
+			interpolatedSpectrum[block[:, 0], :] = values
+
+	if spectrum.ndim == 1:
+		return interpolatedSpectrum[0, :]
+	else:
+		return interpolatedSpectrum
 
 
 def generateBaseName(sampleMetadata):
@@ -0,0 +1,87 @@
+"""
+Cached masks of samples by :py:class:`~nPYc.enumerations.SampleType` and :py:class:`~nPYc.enumerations.AssayRole`, for :py:attr:`~nPYc.objects.Dataset.roleMasks`.
+"""
+import numpy
+
+from ..enumerations import SampleType, AssayRole
+
+
+class RoleMasks(object):
+	"""
+	Boolean masks of the samples in :py:attr:`~nPYc.objects.Dataset.sampleMetadata` with each combination of *SampleType* and *AssayRole*.
+
+	The *SampleType* and *AssayRole* columns are encoded once as integer codes, one per member of the enum, and the mask for each combination is built from the codes on first use and kept. Index with a (SampleType, AssayRole) tuple, where either may be ``None`` to match any value in that column::
+
+		ssMask = dataset.roleMasks[SampleType.StudySample, AssayRole.Assay]
+		blankMask = dataset.roleMasks[SampleType.ProceduralBlank, None]
+
+	Masks returned are copies, and may be modified freely.
+
+	Masks are not rebuilt when *sampleMetadata* is edited; the :py:class:`~nPYc.objects.Dataset` discards them when its table is assigned or its roles are set, and :py:meth:`matches` only checks the number of samples and which columns are present, without reading any values.
+
+	:param pandas.DataFrame sampleMetadata: Table to encode
+	"""
+
+	_columns = (('SampleType', SampleType), ('AssayRole', AssayRole))
+
+	def __init__(self, sampleMetadata):
+
+		self.noSamples = sampleMetadata.shape[0]
+		self._values = dict()
+		self._codes = dict()
+		self._memberCodes = dict()
+		self._masks = dict()
+
+		for (column, enum) in self._columns:
+			self._memberCodes[column] = {member: code for (code, member) in enumerate(enum)}
+
+			if column not in sampleMetadata.columns:
+				self._values[column] = None
+				self._codes[column] = None
+				continue
+
+			# Copy the values, so the masks do not follow later edits
+			values = numpy.array(sampleMetadata[column].values, dtype=object)
+			codes = numpy.full(values.shape[0], -1, dtype=numpy.int8)
+			for (member, code) in self._memberCodes[column].items():
+				codes[values == member] = code
+
+			self._values[column] = values
+			self._codes[column] = codes
+
+	def matches(self, sampleMetadata):
+		"""
+		``True`` if *sampleMetadata* has the same number of samples, and the same *SampleType* and *AssayRole* columns present, as when the masks were built, without comparing their values.
+		"""
+		if sampleMetadata.shape[0] != self.noSamples:
+			return False
+
+		for (column, enum) in self._columns:
+			if (column in sampleMetadata.columns) == (self._codes[column] is None):
+				return False
+
+		return True
+
+	def __getitem__(self, key):
+		"""
+		Mask of samples matching *key*, a (SampleType, AssayRole) tuple.
+
+		:raises KeyError: if a column needed is not present in *sampleMetadata*
+		"""
+		if key not in self._masks:
+			mask = numpy.ones(self.noSamples, dtype=bool)
+
+			for (value, (column, enum)) in zip(key, self._columns):
+				if value is None:
+					continue
+				elif self._codes[column] is None:
+					raise KeyError(column)
+
+				if value in self._memberCodes[column]:
+					mask &= self._codes[column] == self._memberCodes[column][value]
+				else:
+					mask &= numpy.asarray(self._values[column] == value, dtype=bool)
+
+			self._masks[key] = mask
+
+		return self._masks[key].copy()
@@ -0,0 +1,180 @@
+"""
+Counts of features passing feature selection over grids of thresholds, see :py:class:`ThresholdSweep`.
+"""
+import numpy
+
+
+class ThresholdSweep(object):
+	"""
+	Numbers of features passing feature selection at each combination of a set of thresholds, calculated from per-feature statistics taken once.
+
+	Rather than building a mask over all features for every combination, each feature is binned once against the sorted RSD and correlation to dilution thresholds, and the number passing for the whole grid read off cumulative counts of the bins. Variance ratio and blank thresholds are applied one mask per value.
+
+	With artifactual filtering, each group of linked features passing counts as one, as in :py:meth:`~nPYc.objects.MSDataset.artifactualFilter`. The number of groups is found by admitting the links in order of decreasing correlation threshold, and merging the groups they join with union-find, so that one pass over the links serves every correlation threshold.
+
+	::
+
+		sweep = msData.thresholdSweep()
+		counts = sweep.count(numpy.arange(5, 55, 5), numpy.arange(0.5, 1.01, 0.05), varianceRatio=1.1)
+
+	:param numpy.ndarray correlationToDilution: Correlation to dilution of each feature
+	:param numpy.ndarray rsdSP: RSD of each feature in study reference samples
+	:param rsdSS: RSD of each feature in study samples, needed to apply a *varianceRatio*
+	:type rsdSS: None or numpy.ndarray
+	:param featureMask: Features to consider (``True``), if ``None`` consider all features
+	:type featureMask: None or numpy.ndarray of bool
+	:param blankLevels: Mean intensity of each feature in study samples, and its level in procedural blanks, needed to apply a *blankThreshold*
+	:type blankLevels: None or tuple of numpy.ndarray
+	:param linkage: Pairs of linked features, with the indices of the features in columns 'node1' and 'node2', as :py:attr:`~nPYc.objects.MSDataset.artifactualLinkageMatrix`, needed for artifactual filtering
+	:type linkage: None or pandas.DataFrame
+	"""
+
+	def __init__(self, correlationToDilution, rsdSP, rsdSS=None, featureMask=None, blankLevels=None, linkage=None):
+
+		self.correlationToDilution = numpy.asarray(correlationToDilution, dtype=float)
+		self.rsdSP = numpy.asarray(rsdSP, dtype=float)
+		self.noFeatures = self.rsdSP.shape[0]
+
+		if self.correlationToDilution.shape != self.rsdSP.shape:
+			raise ValueError('correlationToDilution and rsdSP must be the same length.')
+
+		self.rsdSS = None if rsdSS is None else numpy.asarray(rsdSS, dtype=float)
+
+		if featureMask is None:
+			self.featureMask = numpy.ones(self.noFeatures, dtype=bool)
+		else:
+			self.featureMask = numpy.array(featureMask, dtype=bool)
+
+		self.blankLevels = blankLevels
+
+		if linkage is None:
+			self.linkage = None
+		else:
+			self.linkage = (numpy.asarray(linkage['node1'].values, dtype=numpy.intp), numpy.asarray(linkage['node2'].values, dtype=numpy.intp))
+
+
+	def count(self, rsdThreshold, corrThreshold, varianceRatio=None, blankThreshold=None, withArtifactualFiltering=False):
+		"""
+		Number of features passing at each combination of the thresholds given.
+
+		Features pass where ``rsdSP <= rsdThreshold``, ``correlationToDilution >= corrThreshold``, ``rsdSP * varianceRatio <= rsdSS``, and their mean intensity in study samples is at least *blankThreshold* times their level in blanks.
+
+		Each threshold may be a single value or a sequence, and the array returned has an axis for each sequence, in the order *rsdThreshold*, *corrThreshold*, *varianceRatio*, *blankThreshold*.
+
+		:param rsdThreshold: Maximum RSD in study reference samples
+		:type rsdThreshold: float or sequence of float
+		:param corrThreshold: Minimum correlation to dilution
+		:type corrThreshold: float or sequence of float
+		:param varianceRatio: If ``None`` do not compare RSDs in study samples and study reference samples
+		:type varianceRatio: None, float or sequence of float
+		:param blankThreshold: If ``None`` or ``False`` do not compare intensities to blanks
+		:type blankThreshold: None, False, float or sequence of float
+		:param bool withArtifactualFiltering: If ``True`` count each group of linked features passing as one
+		:return: Number of features passing
+		:rtype: numpy.ndarray of int
+		:raises ValueError: if the statistics needed for a threshold were not provided
+		"""
+
+		if varianceRatio is not None and self.rsdSS is None:
+			raise ValueError('rsdSS is required to apply a varianceRatio.')
+		if (blankThreshold is not None and blankThreshold is not False) and self.blankLevels is None:
+			raise ValueError('blankLevels are required to apply a blankThreshold.')
+		if withArtifactualFiltering and self.linkage is None:
+			raise ValueError('linkage is required for artifactual filtering.')
+
+		scalar = [numpy.ndim(rsdThreshold) == 0, numpy.ndim(corrThreshold) == 0, numpy.ndim(varianceRatio) == 0, numpy.ndim(blankThreshold) == 0]
+
+		rsdThresholds = numpy.atleast_1d(numpy.asarray(rsdThreshold, dtype=float))
+		corrThresholds = numpy.atleast_1d(numpy.asarray(corrThreshold, dtype=float))
+		varianceRatios = [None] if varianceRatio is None else numpy.atleast_1d(varianceRatio)
+		blankThresholds = [None] if (blankThreshold is None or blankThreshold is False) else numpy.atleast_1d(blankThreshold)
+
+		# Bin each feature by the position of the lowest RSD threshold, and highest correlation threshold, it passes
+		rsdOrder = numpy.argsort(rsdThresholds, kind='mergesort')
+		corrOrder = numpy.argsort(corrThresholds, kind='mergesort')
+		rsdBins = numpy.searchsorted(rsdThresholds[rsdOrder], self.rsdSP, side='left')
+		corrBins = numpy.searchsorted(corrThresholds[corrOrder], self.correlationToDilution, side='right') - 1
+
+		passing = (rsdBins < rsdThresholds.shape[0]) & (corrBins >= 0) & ~numpy.isnan(self.rsdSP) & ~numpy.isnan(self.correlationToDilution)
+
+		counts = numpy.zeros((rsdThresholds.shape[0], corrThresholds.shape[0], len(varianceRatios), len(blankThresholds)), dtype=int)
+		for (i, ratio) in enumerate(varianceRatios):
+			for (j, threshold) in enumerate(blankThresholds):
+				include = passing & self._mask(ratio, threshold)
+
+				grid = self._countBins(include, rsdBins, corrBins, rsdThresholds.shape[0], corrThresholds.shape[0])
+				if withArtifactualFiltering:
+					grid -= self._countMerges(include, rsdBins, corrBins, rsdThresholds.shape[0], corrThresholds.shape[0])
+
+				counts[numpy.ix_(rsdOrder, corrOrder, [i], [j])] = grid[:, :, numpy.newaxis, numpy.newaxis]
+
+		return counts[tuple(0 if isScalar else slice(None) for isScalar in scalar)]
+
+
+	def _mask(self, varianceRatio, blankThreshold):
+		"""
+		Features passing *varianceRatio* and *blankThreshold*, where given, and :py:attr:`featureMask`.
+		"""
+		mask = self.featureMask.copy()
+
+		if varianceRatio is not None:
+			mask &= (self.rsdSP * varianceRatio) <= self.rsdSS
+
+		if blankThreshold is not None:
+			(sampleMeans, blankLevels) = self.blankLevels
+			mask &= numpy.reshape(sampleMeans >= (blankLevels * blankThreshold), -1)
+
+		return mask
+
+
+	@staticmethod
+	def _countBins(include, rsdBins, corrBins, noRsdThresholds, noCorrThresholds):
+		"""
+		Number of features in *include* passing each pair of sorted RSD and correlation thresholds.
+		"""
+		histogram = numpy.bincount(rsdBins[include] * noCorrThresholds + corrBins[include], minlength=noRsdThresholds * noCorrThresholds)
+		histogram = numpy.reshape(histogram, (noRsdThresholds, noCorrThresholds))
+
+		# A feature passes every RSD threshold above its bin, and every correlation threshold below
+		return numpy.cumsum(numpy.cumsum(histogram, axis=0)[:, ::-1], axis=1)[:, ::-1]
+
+
+	def _countMerges(self, include, rsdBins, corrBins, noRsdThresholds, noCorrThresholds):
+		"""
+		Number of features in *include* joined to another by the linkage, at each pair of sorted RSD and correlation thresholds, counting one feature of each group as unjoined.
+		"""
+		(node1, node2) = self.linkage
+		linked = include[node1] & include[node2]
+		node1 = node1[linked]
+		node2 = node2[linked]
+
+		merges = numpy.zeros((noRsdThresholds, noCorrThresholds), dtype=int)
+		if node1.shape[0] == 0:
+			return merges
+
+		# A link is present once both its features pass
+		linkRsdBins = numpy.maximum(rsdBins[node1], rsdBins[node2])
+		linkCorrBins = numpy.minimum(corrBins[node1], corrBins[node2])
+
+		(nodes, ends) = numpy.unique(numpy.concatenate((node1, node2)), return_inverse=True)
+		ends = numpy.reshape(ends, (2, node1.shape[0]))
+
+		order = numpy.argsort(-linkCorrBins, kind='mergesort')
+		for rsdBin in range(noRsdThresholds):
+			links = order[linkRsdBins[order] <= rsdBin]
+			parent = list(range(nodes.shape[0]))
+
+			for (first, second, corrBin) in zip(ends[0, links].tolist(), ends[1, links].tolist(), linkCorrBins[links].tolist()):
+				while parent[first] != first:
+					parent[first] = parent[parent[first]]
+					first = parent[first]
+				while parent[second] != second:
+					parent[second] = parent[parent[second]]
+					second = parent[second]
+
+				if first != second:
+					parent[first] = second
+					merges[rsdBin, corrBin] += 1
+
+		# A link joins features at every correlation threshold below the one at which it is admitted
+		return numpy.cumsum(merges[:, ::-1], axis=1)[:, ::-1]
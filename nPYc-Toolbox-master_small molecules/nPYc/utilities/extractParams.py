@@ -8,23 +8,44 @@ import re
 import logging
 import os
 import codecs
+import bisect
+import functools
+import itertools
+import json
+import multiprocessing
+import multiprocessing.pool
 import pandas
 import warnings
 from ._conditionalJoin import *
 
-def extractParams(filepath, filetype, pdata=1):
+def extractParams(filepath, filetype, pdata=1, parallelise=False, workers=None, cachePath=None):
 	"""
 	Extract analytical parameters from raw data files for Bruker and Waters .RAW data only.
 
+	For Waters .RAW data, reading can be sped up in two ways, both of which return the same table, and raise the same per-file warnings, as reading serially:
+
+	* When *parallelise* is ``True`` folders are read in a pool of worker threads, overlapping the latency of reading many small files from network storage.
+	* When a *cachePath* is given, the parameters read are kept in a JSON file there, keyed by the path of each .RAW folder and the size and modification time of each file read from it. When called again, only folders that are new, or with files that have changed since, are read.
+
 	:param filepath: Look for data in all the directories under this location.
 	:type searchDirectory: string
 	:param filetype: Search for this type of data
 	:type filetype: string
 	:param int pdata: pdata folder for Bruker data
+	:param bool parallelise: If ``True`` read Waters .RAW folders in parallel
+	:param workers: Number of worker threads to use when *parallelise* is ``True``, if ``None`` use four more than the number of CPU cores, up to 32
+	:type workers: None or int
+	:param cachePath: Path of a file to cache Waters .RAW parameters in, created if it does not exist, if ``None`` do not cache
+	:type cachePath: None or str
 	:return: Analytical parameters, indexed by file name.
 	:rtype: pandas.Dataframe
+	:raises TypeError: if *workers* is not ``None`` or a positive integer
 	"""
 
+	if workers is not None:
+		if not (isinstance(workers, int) and (workers > 0)):
+			raise TypeError('workers must be a positive integer')
+
 	queryItems = dict()
 	# Build our ID cirteria
 	if filetype == 'Bruker':
@@ -57,11 +78,41 @@ def extractParams(filepath, filetype, pdata=1):
 
 	# iterate over the list
 	results = list()
-	for filename in fileList:
-		if filetype == 'Bruker':
+	if filetype == 'Bruker':
+		for filename in fileList:
 			results.append(extractBrukerparams(filename, queryItems, acqTimeRE))
-		elif filetype == 'Waters .raw':
-			results.append(extractWatersRAWParams(filename, queryItems))
+
+	elif filetype == 'Waters .raw':
+		cache = _loadWatersRAWCache(cachePath, queryItems) if cachePath is not None else None
+		readRecord = functools.partial(_readWatersRAWRecord, queryItems=queryItems, cache=cache)
+
+		if parallelise:
+			# Reading is bound by file system latency, so use more threads than CPU cores, unless told otherwise
+			if workers is not None:
+				threads = workers
+			else:
+				threads = min(multiprocessing.cpu_count() + 4, 32)
+
+			with multiprocessing.pool.ThreadPool(processes=threads) as pool:
+				records = pool.map(readRecord, fileList)
+		else:
+			records = map(readRecord, fileList)
+
+		modified = False
+		for (filename, (key, record, cached)) in zip(fileList, records):
+			parameters = dict(record['results'])
+			parameters['File Path'] = filename
+			results.append(parameters)
+
+			for message in record['messages']:
+				warnings.warn(message)
+
+			if cache is not None and not cached:
+				cache[key] = record
+				modified = True
+
+		if modified:
+			_saveWatersRAWCache(cachePath, queryItems, cache)
 
 	resultsDF = pandas.DataFrame(results)
 	resultsDF = resultsDF.apply(lambda x: pandas.to_numeric(x, errors='ignore'))
@@ -82,23 +133,22 @@ def buildFileList(filepath, pattern):
 	"""
 
 	logging.debug('Searching in: ' + filepath)
-	
-	# Read in all folder names
-	child_items = os.listdir(filepath)
-	
+
 	fileList = list()
 
-	# Match against pattern
-	for childItem in child_items:
-		if pattern.match(childItem):
-			logging.debug('Matched: ' + childItem)
-			fileList.append(os.path.join(filepath, childItem))
-		elif os.path.isdir(os.path.join(filepath, childItem)):
-			# search again in this folder.
-			logging.debug('Descending into: ' + childItem)
-			fileList.extend(buildFileList(os.path.join(filepath, childItem), pattern))
-		else:
-			logging.debug('Discarding: ' + childItem)
+	# Read in all folder names, scandir caches the type of each entry so it need not be looked up again
+	with os.scandir(filepath) as childItems:
+		# Match against pattern
+		for childItem in childItems:
+			if pattern.match(childItem.name):
+				logging.debug('Matched: ' + childItem.name)
+				fileList.append(os.path.join(filepath, childItem.name))
+			elif childItem.is_dir():
+				# search again in this folder.
+				logging.debug('Descending into: ' + childItem.name)
+				fileList.extend(buildFileList(os.path.join(filepath, childItem.name), pattern))
+			else:
+				logging.debug('Discarding: ' + childItem.name)
 
 	return fileList
 
@@ -114,6 +164,34 @@ def extractWatersRAWParams(filePath, queryItems):
 	:rtype: dict
 	"""
 
+	(results, messages) = _readWatersRAWParams(filePath, queryItems)
+
+	for message in messages:
+		warnings.warn(message)
+
+	return results
+
+
+@functools.lru_cache(maxsize=None)
+def _watersRAWParamPattern(findthis):
+	"""
+	Compiled regex to extract the value of parameter *findthis* from the line it is found on.
+	"""
+	return re.compile('(' + re.escape(findthis) + ')\W+(.+)\r')
+
+
+def _readWatersRAWParams(filePath, queryItems):
+	"""
+	Read parameters defined in *queryItems* for Waters .RAW data, as :py:func:`extractWatersRAWParams`, but returning warnings instead of raising them, so that folders may be read in worker threads.
+
+	Each file is read once, and each parameter taken from the first line it occurs on, found by searching the whole file rather than line by line.
+
+	:param str filePath: Path to .RAW folder
+	:param dict queryItems: names of parameters to extract values for
+	:returns: Tuple of the dictionary of extracted parameters, and a list of warning messages
+	:rtype: (dict, list)
+	"""
+
 	# Get filename
 	filename = os.path.basename(filePath)
 	results = dict()
@@ -122,40 +200,117 @@ def extractWatersRAWParams(filePath, queryItems):
 	results['File Path'] = filePath
 	results['Sample File Name'] = filename[:-4]
 
+	messages = list()
+
 	for inputFile in queryItems.keys():
 		localPath = os.path.join(filePath, inputFile)
 		try:
-			f = codecs.open(localPath, 'r', encoding='latin-1')
-			contents = f.readlines()
-		
-			logging.debug('Searching file: ' + localPath)
-
-			# Loop over the search terms
-			for findthis in queryItems[inputFile]:
-				logging.debug('Looking for: ' + findthis)
-				indices = [i for i, s in enumerate(contents) if findthis in s]
-				if indices:
-					logging.debug('Found on line: ' + str(indices[0]))
-					foundLine = contents[indices[0]]
-					logging.debug('Line reads: ' + foundLine.rstrip())
-					query = '(' + re.escape(findthis) + ')\W+(.+)\r'
-					logging.debug('Regex is: ' + query)
-					m = re.search(query, foundLine)
-					logging.debug('Found this: ' + m.group(1) + ' and: ' + m.group(2))
-			
-					results[findthis.strip()] = m.group(2).strip()
-				else:
-					results['Warnings'] = conditionalJoin(results['Warnings'] , 'Parameter ' + findthis.strip() + ' not found.')
-					warnings.warn('Parameter ' + findthis + ' not found in file: ' + os.path.join(localPath))
-			
-			f.close()
+			with codecs.open(localPath, 'r', encoding='latin-1') as f:
+				contents = f.read()
 		except IOError:
 			for findthis in queryItems[inputFile]:
 				results['Warnings'] = conditionalJoin(results['Warnings'], 'Unable to open ' + localPath + ' for reading.')
-				warnings.warn('Unable to open ' + localPath + ' for reading.')
+				messages.append('Unable to open ' + localPath + ' for reading.')
+			continue
+
+		logging.debug('Searching file: ' + localPath)
+
+		# Offsets of the end of each line, to look up the line each parameter is found on
+		lines = contents.splitlines(True)
+		lineEnds = list(itertools.accumulate(len(line) for line in lines))
+
+		# Loop over the search terms
+		for findthis in queryItems[inputFile]:
+			logging.debug('Looking for: ' + findthis)
+			position = contents.find(findthis)
+			if position != -1:
+				foundLine = lines[bisect.bisect_right(lineEnds, position)]
+				logging.debug('Line reads: ' + foundLine.rstrip())
+				m = _watersRAWParamPattern(findthis).search(foundLine)
+				logging.debug('Found this: ' + m.group(1) + ' and: ' + m.group(2))
+
+				results[findthis.strip()] = m.group(2).strip()
+			else:
+				results['Warnings'] = conditionalJoin(results['Warnings'] , 'Parameter ' + findthis.strip() + ' not found.')
+				messages.append('Parameter ' + findthis + ' not found in file: ' + os.path.join(localPath))
 
-	return results
+	return (results, messages)
+
+
+def _watersRAWFileStats(filePath, queryItems):
+	"""
+	Size and modification time of each file in *queryItems* under the .RAW folder *filePath*, ``None`` for files that can not be found.
+	"""
+	stats = list()
+	for inputFile in queryItems.keys():
+		try:
+			stat = os.stat(os.path.join(filePath, inputFile))
+			stats.append([stat.st_size, stat.st_mtime_ns])
+		except OSError:
+			stats.append(None)
+
+	return stats
+
+
+def _readWatersRAWRecord(filePath, queryItems, cache=None):
+	"""
+	Read parameters for the .RAW folder *filePath*, reusing the record held for it in *cache* if none of the files queried have changed since.
+
+	:param str filePath: Path to .RAW folder
+	:param dict queryItems: names of parameters to extract values for
+	:param cache: Records from earlier reads, keyed by absolute path
+	:type cache: None or dict
+	:returns: Tuple of the cache key, a record of the 'results', 'messages', and file 'stats', and whether the record was taken from *cache*
+	:rtype: (str, dict, bool)
+	"""
+	key = os.path.abspath(filePath)
+
+	if cache is None:
+		(results, messages) = _readWatersRAWParams(filePath, queryItems)
+		return (key, {'results': results, 'messages': messages}, False)
+
+	stats = _watersRAWFileStats(filePath, queryItems)
+
+	if key in cache and cache[key]['stats'] == stats:
+		return (key, cache[key], True)
+
+	(results, messages) = _readWatersRAWParams(filePath, queryItems)
+
+	return (key, {'results': results, 'messages': messages, 'stats': stats}, False)
+
+
+def _loadWatersRAWCache(cachePath, queryItems):
+	"""
+	Load cached Waters .RAW records from *cachePath*, discarding them if they were read with different *queryItems*, or can not be read.
+
+	:returns: Records, keyed by absolute path of the .RAW folder
+	:rtype: dict
+	"""
+	if not os.path.exists(cachePath):
+		return dict()
+
+	try:
+		with open(cachePath, 'r', encoding='utf-8') as f:
+			contents = json.load(f)
+	except (IOError, ValueError):
+		warnings.warn('Unable to read raw data cache %s, rebuilding it.' % (cachePath))
+		return dict()
+
+	if not isinstance(contents, dict) or contents.get('queryItems') != queryItems:
+		return dict()
+
+	return contents['records']
+
+
+def _saveWatersRAWCache(cachePath, queryItems, cache):
+	"""
+	Write Waters .RAW records to *cachePath*, replacing any previous cache only once written in full.
+	"""
+	temporaryPath = cachePath + '.tmp'
+	with open(temporaryPath, 'w', encoding='utf-8') as f:
+		json.dump({'queryItems': queryItems, 'records': cache}, f)
 
+	os.replace(temporaryPath, cachePath)
 
 
 def extractBrukerparams(path, queryItems, acqTimeRE):
@@ -20,11 +20,20 @@ def rsd(data):
 
 	std = numpy.std(data, axis=0)
 
+	return _rsdFromMoments(numpy.mean(data, axis=0), std)
+
+
+def _rsdFromMoments(mean, std):
+	"""
+	Percentage RSDs from vectors of means and standard deviations, following the conventions of :py:func:`rsd`.
+	"""
+	std = numpy.array(std, dtype=float)
+
 	# If std is zero, note it
 	stdMask = std == 0
 	std[stdMask] = 1
 
-	rsd = numpy.multiply(numpy.divide(std, numpy.mean(data, axis=0)), 100)
+	rsd = numpy.multiply(numpy.divide(std, mean), 100)
 
 	rsd[numpy.isnan(rsd)] = numpy.finfo(numpy.float64).max
 	rsd[stdMask] = 0
@@ -32,6 +41,58 @@ def rsd(data):
 	return rsd
 
 
+def groupStatistics(data, masks, blockSize=2**20):
+	"""
+	Calculate the mean, standard deviation and percentage :term:`relative standard deviation` of each column in *data*, for several groups of rows at once.
+
+	Rows are read a block at a time, and the moments of each group within a block are merged with those of the blocks before it by the pairwise update of Chan *et al.*, so *data* is swept once however many groups there are. Standard deviations are population standard deviations, as :py:func:`numpy.std`, and RSDs follow the conventions of :py:func:`rsd`. Statistics of empty groups are ``NaN``.
+
+	:param numpy.ndarray data: *n* by *m* numpy array of data, with features in columns, and samples in rows
+	:param list masks: *k* boolean vectors of length *n*, each selecting the rows of one group
+	:param int blockSize: Approximate number of values read at a time
+	:return: *k* by *m* arrays of means, standard deviations and RSDs
+	:rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+	"""
+	(noSamples, noFeatures) = data.shape
+	masks = numpy.asarray(masks, dtype=bool).reshape(len(masks), noSamples)
+	noGroups = masks.shape[0]
+
+	counts = numpy.zeros(noGroups)
+	means = numpy.zeros((noGroups, noFeatures))
+	sumSquares = numpy.zeros((noGroups, noFeatures))
+
+	step = max(1, blockSize // max(noFeatures, 1))
+	for start in range(0, noSamples, step):
+		blockMasks = masks[:, start:start + step]
+		if not blockMasks.any():
+			continue
+
+		block = data[start:start + step, :]
+		for group in range(noGroups):
+			blockCount = numpy.count_nonzero(blockMasks[group])
+			if blockCount == 0:
+				continue
+
+			values = block[blockMasks[group], :]
+			blockMean = numpy.mean(values, axis=0)
+			blockSumSquares = numpy.sum(numpy.square(values - blockMean), axis=0)
+
+			total = counts[group] + blockCount
+			delta = blockMean - means[group]
+			means[group] += delta * (blockCount / total)
+			sumSquares[group] += blockSumSquares + numpy.square(delta) * (counts[group] * blockCount / total)
+			counts[group] = total
+
+	empty = counts == 0
+	means[empty, :] = numpy.nan
+	sumSquares[empty, :] = numpy.nan
+	counts[empty] = 1
+
+	stds = numpy.sqrt(sumSquares / counts[:, numpy.newaxis])
+
+	return means, stds, _rsdFromMoments(means, stds)
+
+
 def sequentialPrecision(data):
 	"""
 	Calculate percentage sequential precision for each column in *data*. Sequential precision for feature :math:`x` is defined as:
@@ -82,7 +143,7 @@ def generateLRmask(dataset):
 	LRoutput = dict()
 
 	if not 'Dilution Series' in dataset.sampleMetadata.columns:
-		lrMask = (dataset.sampleMetadata['SampleType'].values == SampleType.StudyPool) & (dataset.sampleMetadata['AssayRole'].values == AssayRole.LinearityReference)
+		lrMask = dataset.roleMasks[SampleType.StudyPool, AssayRole.LinearityReference]
 		lrMask = numpy.logical_and(lrMask, dataset.corrExclusions)
 		LRoutput['All Dilution Samples'] = lrMask
 
@@ -131,13 +192,15 @@ def rsdsBySampleType(dataset, onlyPrecisionReferences=True, useColumn='SampleTyp
 	if not useColumn in dataset.sampleMetadata.columns:
 		raise KeyError("%s is not a column in sampleMetadata." % (useColumn))
 
-	rsds = dict()
+	groups = list()
+	masks = list()
+	if onlyPrecisionReferences:
+		precRefMask = dataset.roleMasks[None, AssayRole.PrecisionReference]
 	sampleTypes = dataset.sampleMetadata[useColumn].unique()
 	for sampleType in sampleTypes:
 
 		if onlyPrecisionReferences:
-			mask = numpy.logical_and(dataset.sampleMetadata[useColumn].values == sampleType,
-									 dataset.sampleMetadata['AssayRole'].values == AssayRole.PrecisionReference)
+			mask = numpy.logical_and(dataset.sampleMetadata[useColumn].values == sampleType, precRefMask)
 		else:
 			mask = dataset.sampleMetadata[useColumn].values == sampleType
 
@@ -146,6 +209,14 @@ def rsdsBySampleType(dataset, onlyPrecisionReferences=True, useColumn='SampleTyp
 		if sum(mask) < 2:
 			continue
 
-		rsds[str(sampleType)] = rsd(dataset.intensityData[mask, :])
+		groups.append(str(sampleType))
+		masks.append(mask)
+
+	# Calculate the RSDs of all groups in one pass over the data
+	(means, stds, groupRSDs) = groupStatistics(dataset.intensityData, masks)
+
+	rsds = dict()
+	for (group, groupRSD) in zip(groups, groupRSDs):
+		rsds[group] = groupRSD
 
 	return rsds
@@ -10,6 +10,7 @@ setup(name='nPYc',
 	packages=find_packages(),
 	install_requires=[
 		'cycler>=0.10.0',
+		'h5py>=3.0',
 		'iPython>=6.3.1',
 		'isaExplorer>=0.1',
 		'isatools>=0.9.3',
@@ -71,6 +72,7 @@ setup(name='nPYc',
 
 		Exports
 		 - Basic tabular csv
+		 - HDF5
 		 - `ISA-TAB <http://isa-tools.org>`_
 
 		The nPYc toolbox is `developed <https://github.com/phenomecentre/npyc-toolbox>`_ by the informatics team at `The National Phenome Centre <http://phenomecentre.org/>`_ at `Imperial College London <http://imperial.ac.uk/>`_.